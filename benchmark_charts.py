@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark the market chart renderer against its time and memory budget
+Renders charts from synthetic data (no network, no posting) and exits non-zero
+if any budget is exceeded
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+
+# Budgets for the shared 1-CPU / 256 MB VM
+COLD_RENDER_BUDGET_MS = 3000     # lazy matplotlib import + template + first PNG
+WARM_RENDER_BUDGET_MS = 250      # p95 of re-renders from the cached template
+PEAK_ALLOC_BUDGET_MB = 16        # tracemalloc peak across warm renders
+RSS_GROWTH_BUDGET_MB = 80        # RSS growth incl. the matplotlib import
+
+def rss_mb():
+    """Current resident set size in MB (Linux), or 0 if unavailable"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+def synthetic_assets(rng, count):
+    """Build random {label: {'price', 'change'}} data"""
+    labels = ['S&P 500', 'Dow Jones', 'Nasdaq', 'BTC', 'ETH', 'BNB', 'SOL', 'XRP'][:count]
+    return {
+        label: {'price': float(rng.uniform(1, 50000)), 'change': float(rng.normal(0, 2))}
+        for label in labels
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the market chart renderer')
+    parser.add_argument('--renders', type=int, default=20, help='Number of warm renders')
+    parser.add_argument('--output-dir', default='.cache/bench_charts', help='Where PNGs are written')
+    args = parser.parse_args()
+
+    rss_start = rss_mb()
+
+    from utils.chart_renderer import MarketChartRenderer, PriceHistoryBuffer
+
+    rng = np.random.default_rng(7)
+    history = PriceHistoryBuffer(capacity=90)
+    renderer = MarketChartRenderer(output_dir=args.output_dir)
+
+    assets = synthetic_assets(rng, 7)
+    for label in assets:
+        history.extend(label, 100 * np.cumprod(1 + rng.normal(0, 0.01, 90)))
+
+    def render_once(i):
+        assets = synthetic_assets(rng, 3 + i % 6)
+        for label in assets:
+            history.append(label, assets[label]['price'])
+        start = time.perf_counter()
+        path = renderer.render(assets, history, '24H US Markets', f'Run {i + 1}')
+        return path, (time.perf_counter() - start) * 1000
+
+    # Timing pass (no tracing overhead)
+    start = time.perf_counter()
+    path = renderer.render(assets, history, '24H US Markets', 'Benchmark')
+    cold_ms = (time.perf_counter() - start) * 1000
+    warm_ms = [render_once(i)[1] for i in range(args.renders)]
+
+    # Allocation pass
+    tracemalloc.start()
+    for i in range(args.renders):
+        path, _ = render_once(i)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    peak_mb = peak / (1024 * 1024)
+    rss_growth = rss_mb() - rss_start
+
+    from PIL import Image
+    with Image.open(path) as image:
+        size = image.size
+
+    warm = np.array(warm_ms)
+    results = [
+        ('Cold render (ms)', cold_ms, COLD_RENDER_BUDGET_MS),
+        ('Warm render p95 (ms)', float(np.percentile(warm, 95)), WARM_RENDER_BUDGET_MS),
+        ('Peak Python allocations (MB)', peak_mb, PEAK_ALLOC_BUDGET_MB),
+        ('RSS growth (MB)', rss_growth, RSS_GROWTH_BUDGET_MB),
+    ]
+
+    print("=" * 60)
+    print(" MARKET CHART RENDERER BENCHMARK")
+    print("=" * 60)
+    print(f"  Warm renders: {args.renders} (median {np.median(warm):.1f}ms)")
+    print(f"  PNG size: {size[0]}x{size[1]}")
+
+    failed = size != (MarketChartRenderer.WIDTH_PX, MarketChartRenderer.HEIGHT_PX)
+    if failed:
+        print(f"  FAIL: expected {MarketChartRenderer.WIDTH_PX}x{MarketChartRenderer.HEIGHT_PX}")
+
+    for name, value, budget in results:
+        status = "OK" if value <= budget else "FAIL"
+        failed = failed or value > budget
+        print(f"  {status:4} {name}: {value:.1f} (budget {budget})")
+
+    print("=" * 60)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Benchmark every post pipeline offline against recorded upstream responses
+bible-api, CoinGecko, alternative.me, NewsAPI, Groq and Google Translate are
+served by local stand-ins (benchmarks/stub_servers.py) with injected latency
+and failures, and yfinance is replayed from its fixture; nothing is posted.
+Each run is a fresh process with cold caches, so peak RSS is per pipeline.
+Results are compared with the stored baseline and the exit code is non-zero
+on a regression
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+from benchmarks.stub_servers import StubUpstreams, ReplayTicker, DEFAULT_LATENCY_MS, record_yfinance
+
+BASELINE_PATH = ROOT / 'benchmarks' / 'baseline.json'
+RESULT_PREFIX = 'BENCH_RESULT '
+
+# Slack before a slower run counts as a regression (timings on a shared VM are noisy)
+ABSOLUTE_SLACK_SECONDS = 0.1
+
+def parse_pairs(pairs, cast):
+    """Parse ['groq=900', ...] into {'groq': 900}"""
+    parsed = {}
+    for pair in pairs or []:
+        name, _, value = pair.partition('=')
+        parsed[name] = cast(value)
+    return parsed
+
+def job_ids():
+    import config
+    return [f"{spec['region']}_{spec['content']}" for spec in config.POST_PIPELINES]
+
+def run_worker(job_id, args):
+    """Run one post pipeline in this process and print its measurements"""
+    random.seed(args.seed)
+    replay = (
+        args.latency.get('yfinance', DEFAULT_LATENCY_MS['yfinance']),
+        args.failure_rate.get('yfinance', 0.0),
+        args.seed
+    )
+    ReplayTicker.install(*replay)
+
+    from post_registry import post_registry
+    from utils.metrics import metrics
+    from utils.logger import flush_logs
+    from utils.process_pool import stage_pool
+
+    # yfinance runs in the stage pool's workers: replay it there too, and
+    # start them before the clock like the scheduler does
+    stage_pool.add_initializer(ReplayTicker.install, *replay)
+    stage_pool.warm_up()
+
+    start = time.perf_counter()
+    posted = post_registry.run(job_id)
+    seconds = time.perf_counter() - start
+
+    stages = {
+        labels['stage']: round(total, 4)
+        for labels, (count, total) in metrics.values('stage_duration_seconds')
+        if labels.get('job') == job_id
+    }
+    calls = {}
+    for labels, count in metrics.values('upstream_requests_total'):
+        calls[labels['upstream']] = calls.get(labels['upstream'], 0) + count
+
+    flush_logs()
+    print(RESULT_PREFIX + json.dumps({
+        'job': job_id,
+        'posted': posted,
+        'seconds': round(seconds, 4),
+        'stages': stages,
+        'calls': calls,
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'pool_peak_rss_mb': round((stage_pool.peak_rss_bytes() or 0) / 1024 / 1024, 1),
+    }), flush=True)
+    stage_pool.shutdown()
+
+def run_job(job_id, args, stubs, seed):
+    """Run a pipeline in a fresh process (own working directory: cold caches and stores)"""
+    env = {
+        **os.environ,
+        **stubs.env(),
+        'DRY_RUN': 'true',
+        'LLM_BACKEND': 'groq',
+        'TRANSLATION_BACKEND': 'google',
+        'LOG_LEVEL': args.log_level,
+        'METRICS_PORT': '0',
+        'METRICS_TEXTFILE': '',
+    }
+    if not args.record:
+        env.update({'GROQ_API_KEY': 'benchmark', 'NEWS_API_KEY': 'benchmark'})
+    for name in ('API_KEY', 'API_SECRET', 'ACCESS_TOKEN', 'ACCESS_TOKEN_SECRET', 'BEARER_TOKEN'):
+        env.setdefault(f"TWITTER_{name}", 'benchmark')
+
+    command = [sys.executable, str(ROOT / 'benchmark_pipelines.py'), '--worker', job_id, '--seed', str(seed)]
+    command += [f"--latency={name}={value}" for name, value in args.latency.items()]
+    command += [f"--failure-rate={name}={value}" for name, value in args.failure_rate.items()]
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        process = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, timeout=args.timeout)
+
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    tail = '\n'.join((process.stdout + process.stderr).strip().splitlines()[-15:])
+    raise RuntimeError(f"{job_id}: worker exited with {process.returncode}\n{tail}")
+
+def summarize(runs):
+    """Median of each measurement over the runs (peak RSS: the max)"""
+    stages = sorted({stage for run in runs for stage in run['stages']})
+    upstreams = sorted({upstream for run in runs for upstream in run['calls']})
+    return {
+        'posted': all(run['posted'] for run in runs),
+        'seconds': round(statistics.median(run['seconds'] for run in runs), 4),
+        'stages': {stage: round(statistics.median(run['stages'].get(stage, 0) for run in runs), 4) for stage in stages},
+        'calls': {upstream: int(statistics.median(run['calls'].get(upstream, 0) for run in runs)) for upstream in upstreams},
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'pool_peak_rss_mb': max(run.get('pool_peak_rss_mb', 0) for run in runs),
+    }
+
+def compare(job_id, result, baseline, tolerance):
+    """Return the regressions of a job against its baseline entry"""
+    regressions = []
+
+    def slower(name, value, base):
+        if value > base * (1 + tolerance) + ABSOLUTE_SLACK_SECONDS:
+            regressions.append(f"{job_id}: {name} {value:.2f}s (baseline {base:.2f}s)")
+
+    slower('job', result['seconds'], baseline['seconds'])
+    for stage, seconds in result['stages'].items():
+        slower(f"stage '{stage}'", seconds, baseline['stages'].get(stage, 0))
+
+    if result['peak_rss_mb'] > baseline['peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"{job_id}: peak RSS {result['peak_rss_mb']:.0f} MB (baseline {baseline['peak_rss_mb']:.0f} MB)")
+    # yfinance and matplotlib live in the stage pool worker: its memory counts too
+    if baseline.get('pool_peak_rss_mb') and result['pool_peak_rss_mb'] > baseline['pool_peak_rss_mb'] * (1 + tolerance):
+        regressions.append(f"{job_id}: stage pool worker peak RSS {result['pool_peak_rss_mb']:.0f} MB (baseline {baseline['pool_peak_rss_mb']:.0f} MB)")
+
+    for upstream, count in result['calls'].items():
+        if count > baseline['calls'].get(upstream, 0):
+            regressions.append(f"{job_id}: {count} {upstream} calls (baseline {baseline['calls'].get(upstream, 0)})")
+
+    if baseline['posted'] and not result['posted']:
+        regressions.append(f"{job_id}: no longer posts")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the post pipelines against recorded upstreams')
+    parser.add_argument('--jobs', nargs='*', help='Post job ids (default: all)')
+    parser.add_argument('--runs', type=int, default=3, help='Runs per pipeline (medians are compared)')
+    parser.add_argument('--latency', action='append', metavar='UPSTREAM=MS', help=f"Injected latency per upstream (defaults: {DEFAULT_LATENCY_MS})")
+    parser.add_argument('--failure-rate', action='append', metavar='UPSTREAM=RATE', help='Share of calls to an upstream that fail (0-1)')
+    parser.add_argument('--no-latency', action='store_true', help='Inject no latency at all')
+    parser.add_argument('--seed', type=int, default=7, help='Seed for injected failures')
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help='Baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown / RSS growth over the baseline')
+    parser.add_argument('--record', action='store_true', help='Record fresh fixtures from the real upstreams (needs network and keys)')
+    parser.add_argument('--timeout', type=int, default=300, help='Seconds a pipeline run may take')
+    parser.add_argument('--log-level', default='WARNING', help="Pipelines' LOG_LEVEL")
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    args.latency = parse_pairs(args.latency, float)
+    args.failure_rate = parse_pairs(args.failure_rate, float)
+    if args.no_latency:
+        args.latency = {name: 0 for name in DEFAULT_LATENCY_MS}
+
+    if args.worker:
+        run_worker(args.worker, args)
+        return
+
+    jobs = args.jobs or job_ids()
+    settings = {
+        'latency_ms': {**DEFAULT_LATENCY_MS, **args.latency},
+        'failure_rate': args.failure_rate,
+        'seed': args.seed,
+    }
+
+    stubs = StubUpstreams(latency_ms=args.latency, failure_rate=args.failure_rate, seed=args.seed, record=args.record)
+    stubs.start()
+    results = {}
+    served = {}
+    errors = []
+    try:
+        if args.record:
+            import config
+            record_yfinance({**config.US_MARKET_TICKERS, **config.CHINESE_MARKET_TICKERS})
+
+        for job_id in jobs:
+            stubs.reset()
+            runs = []
+            for run in range(1 if args.record else args.runs):
+                try:
+                    runs.append(run_job(job_id, args, stubs, args.seed + run))
+                except Exception as e:
+                    errors.append(str(e))
+                    break
+            if runs:
+                results[job_id] = summarize(runs)
+                served[job_id] = dict(stubs.calls)
+    finally:
+        stubs.stop()
+
+    if args.record:
+        stubs.save()
+        print(f"Recorded fixtures for {len(results)} pipelines in {stubs.fixtures_dir}")
+        sys.exit(1 if errors else 0)
+
+    print("=" * 78)
+    print(" POST PIPELINE BENCHMARK")
+    print("=" * 78)
+    print(f"  Runs per pipeline: {args.runs}  Latency (ms): {settings['latency_ms']}")
+    if args.failure_rate:
+        print(f"  Failure rates: {args.failure_rate}")
+
+    for job_id, result in results.items():
+        print(f"\n  {job_id}: {result['seconds']:.2f}s, peak RSS {result['peak_rss_mb']:.0f} MB (stage pool worker {result['pool_peak_rss_mb']:.0f} MB){'' if result['posted'] else ' (NOT POSTED)'}")
+        for stage, seconds in sorted(result['stages'].items(), key=lambda item: -item[1]):
+            print(f"    {stage:<14} {seconds:6.2f}s")
+        print(f"    calls: {', '.join(f'{upstream}={count}' for upstream, count in sorted(result['calls'].items())) or 'none'}")
+        print(f"    served by stand-ins: {', '.join(f'{name}={count}' for name, count in sorted(served[job_id].items())) or 'none'}")
+
+    failed = bool(errors)
+    for error in errors:
+        print(f"\n  ERROR {error}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'jobs': results}, f, indent=1, sort_keys=True)
+            f.write('\n')
+        print(f"\n  Baseline saved to {baseline_path}")
+    elif baseline_path.exists():
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        print()
+        if baseline['settings'] != settings:
+            print("  Baseline was taken with other latency/failure settings, not compared")
+        else:
+            regressions = []
+            for job_id, result in results.items():
+                if job_id in baseline['jobs']:
+                    regressions += compare(job_id, result, baseline['jobs'][job_id], args.tolerance)
+            for regression in regressions:
+                print(f"  FAIL {regression}")
+            if not regressions:
+                print(f"  OK   No regressions against {baseline_path.name} (tolerance {args.tolerance:.0%})")
+            failed = failed or bool(regressions)
+
+    print("=" * 78)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
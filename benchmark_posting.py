@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Load test TwitterClient.post_thread against the local mock X API
+Drives many threads concurrently over several accounts through the real
+client (tweepy, rate-limit ledger, pacing) pointed at
+benchmarks/mock_x_server.py, then checks what the mock received: every
+thread chained in order, replies paced by THREAD_REPLY_DELAY_SECONDS, and no
+posting to an account X rate limited until its reset. Exits non-zero if a
+check fails
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Pacing measured on the mock may run this much short of the configured delay
+PACING_SLACK_SECONDS = 0.05
+# Requests reaching the mock this soon after a 429 were already on their way
+IN_FLIGHT_SECONDS = 0.1
+
+def configure(args, workdir):
+    """Set the bot's config for the run (before config is imported)"""
+    accounts = [f"load{index}" for index in range(1, args.accounts)]
+    os.environ.update({
+        'DRY_RUN': 'false',
+        'LOG_LEVEL': args.log_level,
+        'SCHEDULER_DB_PATH': str(Path(workdir) / 'scheduler.sqlite'),
+        'MAX_TWEETS_PER_DAY': str(args.daily_budget),
+        'MAX_TWEETS_PER_MONTH': str(args.daily_budget * 30),
+        'THREAD_REPLY_DELAY_SECONDS': str(args.reply_delay),
+        'TWITTER_ACCOUNTS': ','.join(accounts),
+        'METRICS_PORT': '0',
+        'METRICS_TEXTFILE': '',
+    })
+    for account, prefix in [('default', 'TWITTER_')] + [(name, f"TWITTER_{name.upper()}_") for name in accounts]:
+        for name in ('API_KEY', 'API_SECRET', 'ACCESS_TOKEN_SECRET', 'BEARER_TOKEN'):
+            os.environ[prefix + name] = f"{account}-{name.lower()}"
+        # The mock tells accounts apart by access token
+        os.environ[prefix + 'ACCESS_TOKEN'] = account
+    return ['default'] + accounts
+
+def sample_image(workdir):
+    """A small PNG to attach to main tweets"""
+    from PIL import Image
+    path = Path(workdir) / 'load.png'
+    Image.new('RGB', (1200, 675), (20, 40, 80)).save(path)
+    return path
+
+def percentile(values, q):
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test post_thread against a local mock X API')
+    parser.add_argument('--threads', type=int, default=24, help='Threads to post')
+    parser.add_argument('--tweets', type=int, default=4, help='Tweets per thread')
+    parser.add_argument('--accounts', type=int, default=3, help='Accounts the threads are spread over')
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads posted at once')
+    parser.add_argument('--reply-delay', type=float, default=0.2, help='THREAD_REPLY_DELAY_SECONDS for the run')
+    parser.add_argument('--media', action='store_true', help='Attach an image to every main tweet')
+    parser.add_argument('--latency-ms', type=float, default=50, help='Mock X response latency')
+    parser.add_argument('--limit', type=int, default=300, help='Mock X: tweets per account per window')
+    parser.add_argument('--window', type=int, default=900, help='Mock X: rate-limit window (seconds)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Mock X: share of requests answered 429 anyway')
+    parser.add_argument('--daily-budget', type=int, default=100000, help='MAX_TWEETS_PER_DAY per account for the run')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='x-load-')
+    accounts = configure(args, workdir)
+
+    import config
+    from benchmarks.mock_x_server import MockXServer
+
+    mock = MockXServer(latency_ms=args.latency_ms, limit=args.limit, window=args.window, throttle_rate=args.throttle_rate, seed=args.seed)
+    # Clients are pointed at the mock when they are created
+    config.X_API_URL = mock.start()
+
+    from utils.twitter_client import twitter_pool
+    from utils.metrics import metrics
+    from utils.logger import flush_logs
+
+    image_path = sample_image(workdir) if args.media else None
+    run_id = int(time.time())
+
+    def post(index):
+        account = accounts[index % len(accounts)]
+        tweets = [f"Load test {run_id} thread {index} tweet {position + 1}/{args.tweets}" for position in range(args.tweets)]
+        posted = []
+
+        def progress(ids):
+            posted[:] = ids
+
+        start = time.perf_counter()
+        ok = twitter_pool.client(account).post_thread(tweets, image_path=image_path, on_progress=progress)
+        return account, tweets, posted, ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(post, range(args.threads)))
+    wall = time.perf_counter() - start
+    flush_logs()
+    mock.stop()
+
+    # What X (the mock) saw
+    chain_errors = 0
+    gaps = []
+    for account, tweets, posted, ok, _ in results:
+        if not posted:
+            continue
+        chain = mock.thread_of(posted[-1])
+        if [tweet['text'] for tweet in chain] != tweets[:len(posted)] or any(tweet['account'] != account for tweet in chain):
+            chain_errors += 1
+        # The pause follows every reply but the last, so reply-to-reply gaps are paced
+        replies = chain[1:]
+        gaps += [later['created_at'] - earlier['created_at'] for earlier, later in zip(replies, replies[1:])]
+    paced_too_fast = sum(1 for gap in gaps if gap < args.reply_delay - PACING_SLACK_SECONDS)
+
+    # After a 429 an account must be left alone until its reset
+    first_limited = {}
+    for account, limited_at in mock.rate_limited:
+        first_limited.setdefault(account, limited_at)
+    posted_while_held = sum(
+        1 for tweet in mock.tweets
+        if tweet['account'] in first_limited
+        and first_limited[tweet['account']] + IN_FLIGHT_SECONDS < tweet['received_at'] < first_limited[tweet['account']] + args.window
+    )
+
+    succeeded = [result for result in results if result[3]]
+    latencies = [result[4] for result in succeeded]
+    create_calls = sum(count for labels, count in metrics.values('upstream_requests_total') if labels.get('operation') == 'create_tweet')
+    create_latency = [total / count for labels, (count, total) in metrics.values('upstream_request_seconds') if labels.get('operation') == 'create_tweet' and count]
+
+    print("=" * 70)
+    print(" X POSTING LOAD TEST (mock X API)")
+    print("=" * 70)
+    print(f"  Threads: {args.threads} x {args.tweets} tweets over {len(accounts)} accounts, {args.concurrency} at a time")
+    print(f"  Mock: {args.latency_ms:.0f}ms latency, {args.limit} tweets/{args.window}s per account, throttle rate {args.throttle_rate}")
+    print(f"  Wall time: {wall:.2f}s")
+    print(f"  Tweets accepted: {len(mock.tweets)} ({len(mock.tweets) / wall:.1f}/s), create_tweet calls: {create_calls:.0f}")
+    print(f"  Requests to the mock: {', '.join(f'{path}={count}' for path, count in sorted(mock.requests.items()))}")
+    if create_latency:
+        print(f"  create_tweet latency (client): {statistics.mean(create_latency) * 1000:.0f}ms mean")
+    if latencies:
+        print(f"  Thread latency: p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s, max {max(latencies):.2f}s")
+    print(f"  Threads posted: {len(succeeded)}/{len(results)}, 429s from X: {len(mock.rate_limited)} ({len(first_limited)} accounts held)")
+    if gaps:
+        print(f"  Reply spacing: min {min(gaps):.3f}s (configured {args.reply_delay}s)")
+
+    checks = [
+        ('Threads chained in order on the right account', chain_errors == 0, f"{chain_errors} broken"),
+        ('Replies paced by THREAD_REPLY_DELAY_SECONDS', paced_too_fast == 0, f"{paced_too_fast} gaps too short"),
+        ('No tweets to an account held after a 429', posted_while_held == 0, f"{posted_while_held} posted"),
+    ]
+    if not args.throttle_rate and args.threads * args.tweets <= args.limit * len(accounts) and args.threads * args.tweets <= args.daily_budget:
+        checks.append(('Every thread posted (no rate limiting expected)', len(succeeded) == len(results), f"{len(results) - len(succeeded)} failed"))
+
+    failed = False
+    for name, ok, detail in checks:
+        print(f"  {'OK' if ok else 'FAIL':4} {name}{'' if ok else f' ({detail})'}")
+        failed = failed or not ok
+    print("=" * 70)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
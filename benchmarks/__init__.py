@@ -0,0 +1 @@
+# Offline benchmarks (stand-in upstreams and recorded fixtures)
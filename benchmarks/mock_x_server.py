@@ -0,0 +1,230 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from urllib.parse import urlsplit, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.tweet_length import fits
+
+# First tweet / media id handed out (X ids are 19-digit snowflakes)
+FIRST_ID = 1850000000000000000
+
+
+class MockXServer:
+    """Local stand-in for the parts of X API v2 / v1.1 the bot uses
+
+    POST /2/tweets (text, reply, media) and POST /1.1/media/upload.json, with
+    X's checks: tweet length, duplicate text per account, reply targets and
+    media ids that must exist. Each account (the OAuth token) gets `limit`
+    tweets per `window` seconds; past it, and on a seeded share of requests
+    (throttle_rate), the answer is 429 with X's x-rate-limit-* headers.
+    Point the bot at it with X_API_URL. Everything it accepted is kept in
+    `tweets` (and served at GET /mock/state) to check threads afterwards.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0, limit=300, window=900, throttle_rate=0.0, seed=0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.limit = limit
+        self.window = window
+        self.throttle_rate = throttle_rate
+        self.tweets = []
+        self.requests = {}  # endpoint -> count
+        self.rate_limited = []  # (account, time) of every 429 sent
+        self._by_id = {}
+        self._texts = set()  # (account, text) already posted
+        self._windows = {}  # account -> [window start, tweets in window]
+        self._media = set()
+        self._next_id = FIRST_ID
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        """Start serving (on a free port if port is 0); returns the base URL"""
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                mock._handle(self)
+
+            def do_POST(self):
+                mock._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='mock-x', daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self._server.server_address[1]}"
+
+    def thread_of(self, tweet_id):
+        """The reply chain ending at a tweet, root first"""
+        chain = []
+        tweet = self._by_id.get(tweet_id)
+        while tweet is not None:
+            chain.append(tweet)
+            tweet = self._by_id.get(tweet['in_reply_to'])
+        return chain[::-1]
+
+    def _new_id(self):
+        self._next_id += 1
+        return str(self._next_id)
+
+    @staticmethod
+    def _account(handler):
+        """The posting account: the OAuth 1.0a access token of the request"""
+        match = re.search(r'oauth_token="([^"]*)"', handler.headers.get('Authorization', ''))
+        return unquote(match.group(1)) if match else 'app'
+
+    def _rate_limit(self, account):
+        """
+        Count a request against the account's window
+
+        Returns:
+            (allowed, rate-limit headers)
+        """
+        now = time.time()
+        window = self._windows.get(account)
+        if window is None or now >= window[0] + self.window:
+            window = self._windows[account] = [now, 0]
+
+        throttled = self._random.random() < self.throttle_rate
+        allowed = window[1] < self.limit and not throttled
+        if allowed:
+            window[1] += 1
+        else:
+            self.rate_limited.append((account, now))
+
+        headers = {
+            'x-rate-limit-limit': str(self.limit),
+            'x-rate-limit-remaining': str(max(self.limit - window[1], 0)),
+            'x-rate-limit-reset': str(int(window[0] + self.window)),
+        }
+        return allowed, headers
+
+    def _handle(self, handler):
+        received_at = time.time()
+        path = urlsplit(handler.path).path
+        length = int(handler.headers.get('Content-Length') or 0)
+        body = handler.rfile.read(length) if length else b''
+
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+        time.sleep(self.latency_ms / 1000)
+
+        if handler.command == 'GET' and path == '/mock/state':
+            with self._lock:
+                state = {'tweets': self.tweets, 'requests': self.requests, 'rate_limited': len(self.rate_limited)}
+            self._send(handler, 200, state)
+        elif handler.command == 'POST' and path == '/2/tweets':
+            self._create_tweet(handler, json.loads(body or b'{}'), received_at)
+        elif handler.command == 'POST' and path == '/1.1/media/upload.json':
+            self._upload_media(handler, body)
+        else:
+            self._send(handler, 404, {'title': 'Not Found Error', 'detail': f"No mock for {handler.command} {path}", 'status': 404})
+
+    def _create_tweet(self, handler, payload, received_at):
+        account = self._account(handler)
+        text = payload.get('text', '')
+        reply_to = (payload.get('reply') or {}).get('in_reply_to_tweet_id')
+        media_ids = (payload.get('media') or {}).get('media_ids') or []
+
+        with self._lock:
+            allowed, headers = self._rate_limit(account)
+            if not allowed:
+                error = (429, {'title': 'Too Many Requests', 'detail': 'Too Many Requests', 'type': 'about:blank', 'status': 429})
+            elif not fits(text):
+                error = (400, {'title': 'Invalid Request', 'detail': 'Tweet text is too long.', 'status': 400})
+            elif (account, text) in self._texts:
+                error = (403, {'title': 'Forbidden', 'detail': 'You are not allowed to create a Tweet with duplicate content.', 'status': 403})
+            elif reply_to is not None and reply_to not in self._by_id:
+                error = (400, {'title': 'Invalid Request', 'detail': f"Reply target {reply_to} does not exist.", 'status': 400})
+            elif any(media_id not in self._media for media_id in media_ids):
+                error = (400, {'title': 'Invalid Request', 'detail': 'Unknown media id.', 'status': 400})
+            else:
+                error = None
+                tweet = {
+                    'id': self._new_id(),
+                    'account': account,
+                    'text': text,
+                    'in_reply_to': reply_to,
+                    'media_ids': media_ids,
+                    'received_at': received_at,
+                    'created_at': time.time(),
+                }
+                self.tweets.append(tweet)
+                self._by_id[tweet['id']] = tweet
+                self._texts.add((account, text))
+
+        if error:
+            self._send(handler, *error, headers=headers)
+        else:
+            self._send(handler, 201, {'data': {'id': tweet['id'], 'text': text, 'edit_history_tweet_ids': [tweet['id']]}}, headers=headers)
+
+    def _upload_media(self, handler, body):
+        if not body or 'multipart/form-data' not in handler.headers.get('Content-Type', ''):
+            self._send(handler, 400, {'errors': [{'code': 38, 'message': 'media parameter is missing.'}]})
+            return
+
+        with self._lock:
+            media_id = self._new_id()
+            self._media.add(media_id)
+        self._send(handler, 200, {
+            'media_id': int(media_id),
+            'media_id_string': media_id,
+            'size': len(body),
+            'expires_after_secs': 86400,
+            'image': {'image_type': 'image/png', 'w': 1200, 'h': 675},
+        })
+
+    @staticmethod
+    def _send(handler, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        try:
+            handler.send_response(status)
+            handler.send_header('Content-Type', 'application/json; charset=utf-8')
+            handler.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a local mock of the X API (point the bot at it with X_API_URL)')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every response')
+    parser.add_argument('--limit', type=int, default=300, help='Tweets per account per window before 429s')
+    parser.add_argument('--window', type=int, default=900, help='Rate-limit window (seconds)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered with a 429 anyway')
+    args = parser.parse_args()
+
+    mock = MockXServer(port=args.port, latency_ms=args.latency_ms, limit=args.limit, window=args.window, throttle_rate=args.throttle_rate)
+    print(f"Mock X API on {mock.start()} (X_API_URL={mock.url}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        mock.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+import json
+import time
+import random
+import hashlib
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = Path(__file__).parent / 'fixtures'
+
+# HTTP upstreams: (config setting pointing the bot at it, real endpoint, status sent for an injected failure)
+UPSTREAMS = {
+    'bible_api': ('BIBLE_API_URL', 'https://bible-api.com', 503),
+    'alternative_me': ('FEAR_GREED_API_URL', 'https://api.alternative.me/fng/', 503),
+    'coingecko': ('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3', 429),
+    'newsapi': ('NEWS_API_URL', 'https://newsapi.org/v2', 503),
+    'groq': ('GROQ_BASE_URL', 'https://api.groq.com', 503),
+    'google': ('GOOGLE_TRANSLATE_URL', 'https://translate.google.com/m', 429),
+}
+
+# Typical latency of each upstream from a Fly.io VM (ms), injected by default
+DEFAULT_LATENCY_MS = {
+    'bible_api': 150,
+    'alternative_me': 120,
+    'coingecko': 200,
+    'newsapi': 250,
+    'groq': 900,
+    'google': 200,
+    'yfinance': 300,
+}
+
+
+def load_fixture(name, fixtures_dir=FIXTURES_DIR):
+    with open(Path(fixtures_dir) / f"{name}.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pick(recorded, key):
+    """The recording for a key, else a stable pick among the recordings (e.g. another verse)"""
+    if key in recorded:
+        return recorded[key]
+    keys = sorted(recorded)
+    return recorded[keys[int(hashlib.sha256(key.encode('utf-8')).hexdigest(), 16) % len(keys)]]
+
+
+def request_key(name, rest, query, body):
+    """Fixture key of a request: what makes one response differ from another"""
+    if name == 'bible_api':
+        return unquote(rest.strip('/'))
+    if name in ('newsapi', 'google'):
+        return query.get('q', [''])[0]
+    if name == 'groq':
+        return hashlib.sha256(json.dumps(body.get('messages'), sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return rest.strip('/') or 'index'
+
+
+def groq_stream(completion):
+    """Replay a recorded chat completion as Groq's server-sent event stream"""
+    content = completion['choices'][0]['message']['content']
+    chunk = {key: completion[key] for key in ('id', 'created', 'model')}
+    chunk['object'] = 'chat.completion.chunk'
+    # ~4 characters per token, as the API streams it
+    for start in range(0, len(content), 16):
+        piece = {**chunk, 'choices': [{'index': 0, 'delta': {'content': content[start:start + 16]}, 'finish_reason': None}]}
+        yield f"data: {json.dumps(piece)}\n\n"
+    yield f"data: {json.dumps({**chunk, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]})}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+class StubUpstreams:
+    """Local stand-ins for the bot's HTTP upstreams, replaying recorded responses
+
+    One server on 127.0.0.1 answers for every upstream under /<upstream>/...;
+    env() gives the config settings that point the bot at it. Each response is
+    delayed by the upstream's latency and a seeded share fails with its error
+    status. With record=True requests are forwarded to the real endpoints and
+    the responses saved as the new fixtures on save().
+    """
+
+    def __init__(self, latency_ms=None, failure_rate=None, seed=0, record=False, fixtures_dir=FIXTURES_DIR):
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+        self.failure_rate = failure_rate or {}
+        self.record = record
+        self.fixtures_dir = Path(fixtures_dir)
+        self.fixtures = {name: ({} if record else load_fixture(name, fixtures_dir)) for name in UPSTREAMS}
+        self.calls = {}
+        self.failures = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+
+    def start(self):
+        """Start serving on a free port; returns the base URL"""
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stubs._handle(self)
+
+            def do_POST(self):
+                stubs._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='stub-upstreams', daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def env(self):
+        """Config settings (environment variables) that send the bot's calls here"""
+        return {
+            setting: f"{self.url}/{name}" + ('/' if real_url.endswith('/') else '')
+            for name, (setting, real_url, _) in UPSTREAMS.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self.calls = {}
+            self.failures = {}
+
+    def save(self):
+        """Write what was recorded as the fixtures"""
+        for name, recorded in self.fixtures.items():
+            if recorded:
+                with open(self.fixtures_dir / f"{name}.json", 'w', encoding='utf-8') as f:
+                    json.dump(recorded, f, indent=1, ensure_ascii=False)
+                    f.write('\n')
+
+    def _handle(self, handler):
+        url = urlsplit(handler.path)
+        name, _, rest = url.path.lstrip('/').partition('/')
+        if name not in UPSTREAMS:
+            handler.send_error(404)
+            return
+
+        length = int(handler.headers.get('Content-Length') or 0)
+        raw_body = handler.rfile.read(length) if length else b''
+        body = json.loads(raw_body) if raw_body and 'json' in (handler.headers.get('Content-Type') or '') else {}
+        query = parse_qs(url.query)
+        key = request_key(name, '/' + rest, query, body)
+
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            failed = self._random.random() < self.failure_rate.get(name, 0)
+            if failed:
+                self.failures[name] = self.failures.get(name, 0) + 1
+
+        if not self.record:
+            time.sleep(self.latency_ms.get(name, 0) / 1000)
+
+        if failed:
+            self._send(handler, UPSTREAMS[name][2], 'application/json', json.dumps({'error': 'injected failure'}))
+            return
+
+        if self.record:
+            recorded = self._forward(handler, name, rest, url.query, body)
+        else:
+            recorded = pick(self.fixtures[name], key)
+
+        if name == 'groq' and body.get('stream') and recorded['status'] == 200:
+            self._send(handler, 200, 'text/event-stream', ''.join(groq_stream(recorded['body'])))
+            return
+
+        content = recorded['body']
+        if isinstance(content, str):
+            self._send(handler, recorded['status'], 'text/html; charset=utf-8', content)
+        else:
+            self._send(handler, recorded['status'], 'application/json', json.dumps(content))
+
+    def _forward(self, handler, name, rest, query, body):
+        """Fetch from the real upstream and record the response under its key"""
+        import requests
+
+        _, real_url, _ = UPSTREAMS[name]
+        url = real_url.rstrip('/') + ('/' + rest if rest else ('/' if real_url.endswith('/') else ''))
+        headers = {key: value for key, value in handler.headers.items() if key.lower() in ('authorization', 'content-type', 'accept')}
+        if body.get('stream'):
+            # Recorded whole; replayed as a stream
+            body = {**body, 'stream': False}
+            headers['Accept'] = 'application/json'
+
+        if handler.command == 'POST':
+            response = requests.post(url, params=query or None, json=body, headers=headers, timeout=60)
+        else:
+            response = requests.get(url, params=query or None, headers=headers, timeout=60)
+
+        is_json = 'json' in response.headers.get('Content-Type', '')
+        recorded = {'status': response.status_code, 'body': response.json() if is_json else response.text}
+        if response.ok:
+            with self._lock:
+                self.fixtures[name][request_key(name, '/' + rest, parse_qs(query), body)] = recorded
+        return recorded
+
+    @staticmethod
+    def _send(handler, status, content_type, text):
+        payload = text.encode('utf-8')
+        try:
+            handler.send_response(status)
+            handler.send_header('Content-Type', content_type)
+            handler.send_header('Content-Length', str(len(payload)))
+            if status == 429:
+                handler.send_header('Retry-After', '1')
+            handler.end_headers()
+            handler.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client hung up early (e.g. a stream closed after enough tweets)
+
+
+class ReplayTicker:
+    """Stand-in for yfinance.Ticker serving recorded daily closes
+
+    yfinance has no endpoint setting, so it is replayed at the library
+    instead: install() swaps it in for yfinance.Ticker. The recorded closes
+    are laid on the business days ending today, so the delta fetcher sees
+    fresh data.
+    """
+
+    closes = {}
+    latency_ms = 0
+    failure_rate = 0.0
+    calls = 0
+    _random = random.Random(0)
+    _lock = threading.Lock()
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    @classmethod
+    def install(cls, latency_ms=0, failure_rate=0.0, seed=0, fixtures_dir=FIXTURES_DIR):
+        import yfinance
+
+        cls.closes = load_fixture('yfinance', fixtures_dir)
+        cls.latency_ms = latency_ms
+        cls.failure_rate = failure_rate
+        cls._random = random.Random(seed)
+        yfinance.Ticker = cls
+
+    def history(self, period=None, start=None, **kwargs):
+        import pandas as pd
+
+        with self._lock:
+            ReplayTicker.calls += 1
+            failed = self._random.random() < self.failure_rate
+        time.sleep(self.latency_ms / 1000)
+        if failed:
+            raise ConnectionError(f"{self.ticker}: injected failure")
+
+        closes = pick(self.closes, self.ticker)
+        end = pd.Timestamp.now(tz='America/New_York').normalize()
+        frame = pd.DataFrame({'Close': closes}, index=pd.bdate_range(end=end, periods=len(closes), tz='America/New_York'))
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start, tz='America/New_York')]
+        return frame
+
+
+def record_yfinance(tickers, fixtures_dir=FIXTURES_DIR):
+    """Record the last 3 months of daily closes for the tickers from Yahoo Finance"""
+    import yfinance
+
+    closes = {}
+    for ticker in tickers:
+        history = yfinance.Ticker(ticker).history(period='3mo')
+        closes[ticker] = [round(float(close), 4) for close in history['Close']]
+    with open(Path(fixtures_dir) / 'yfinance.json', 'w', encoding='utf-8') as f:
+        json.dump(closes, f, indent=1)
+        f.write('\n')
@@ -11,14 +11,34 @@ TWITTER_ACCESS_TOKEN = os.getenv('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.getenv('TWITTER_ACCESS_TOKEN_SECRET')
 TWITTER_BEARER_TOKEN = os.getenv('TWITTER_BEARER_TOKEN')
 
+# X accounts posts can go to. 'default' uses the TWITTER_* credentials above;
+# each extra name in TWITTER_ACCOUNTS (e.g. "zh,eu") reads TWITTER_<NAME>_API_KEY,
+# TWITTER_<NAME>_API_SECRET, TWITTER_<NAME>_ACCESS_TOKEN, ... Posts pick their
+# accounts with 'accounts' in REGIONS / POST_PIPELINES.
+TWITTER_ACCOUNTS = {
+    name: {
+        'api_key': os.getenv(f'{prefix}API_KEY'),
+        'api_secret': os.getenv(f'{prefix}API_SECRET'),
+        'access_token': os.getenv(f'{prefix}ACCESS_TOKEN'),
+        'access_token_secret': os.getenv(f'{prefix}ACCESS_TOKEN_SECRET'),
+        'bearer_token': os.getenv(f'{prefix}BEARER_TOKEN'),
+    }
+    for name, prefix in [('default', 'TWITTER_')] + [
+        (name.strip(), f"TWITTER_{name.strip().upper()}_") for name in os.getenv('TWITTER_ACCOUNTS', '').split(',') if name.strip()
+    ]
+}
+
 # Optional API Keys
 NEWS_API_KEY = os.getenv('NEWS_API_KEY')
 COINGECKO_API_KEY = os.getenv('COINGECKO_API_KEY')
+GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
 
 # Bot Configuration
 ENABLE_CHINESE_POSTS = os.getenv('ENABLE_CHINESE_POSTS', 'true').lower() == 'true'
 DRY_RUN = os.getenv('DRY_RUN', 'false').lower() == 'true'
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+# Log output: 'text' lines or 'json' (one object per line with job/region/stage fields)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
 
 # Timezone Configuration
 TEXAS_TZ = pytz.timezone('America/Chicago')
@@ -31,15 +51,177 @@ SCHEDULE_CONFIG = {
     'world_news': {'hour': 9, 'minute': 0},
 }
 
-# Twitter API Rate Limits (Free Tier: 500 tweets/month)
-MAX_TWEETS_PER_DAY = 50
+# Regions: timezone, thread language, AI replies per thread and the X accounts
+# (TWITTER_ACCOUNTS) posts go to; one generated thread fans out to every account
+# (English 3-tweet threads in Texas, Chinese 2-tweet threads in Beijing)
+REGIONS = {
+    'texas': {'timezone': TEXAS_TZ, 'language': 'en', 'replies': 2, 'accounts': ['default']},
+    'beijing': {'timezone': BEIJING_TZ, 'language': 'zh', 'replies': 1, 'accounts': ['default']},
+}
+
+# Post pipelines, one per (region, content type), compiled by post_registry.py.
+# 'sources' name shared data stages (fetched once for every post that uses
+# them) and are handed to the content type's formatter in this order. The
+# posting time comes from SCHEDULE_CONFIG unless a spec sets 'hour'/'minute';
+# any other key ('language', 'replies', ...) overrides the region default.
+POST_PIPELINES = [
+    {'region': 'texas', 'content': 'bible_verse', 'sources': ['verse']},
+    {'region': 'texas', 'content': 'combined_markets', 'sources': ['sentiment', 'us_markets', 'us_crypto'],
+     'title': 'US Markets Update', 'chart': 'us', 'context': "Analyze these market movements and provide insights"},
+    {'region': 'texas', 'content': 'world_news', 'sources': ['us_news'],
+     'context': "Provide deeper insights and context about this news story"},
+    {'region': 'beijing', 'content': 'bible_verse', 'sources': ['verse']},
+    {'region': 'beijing', 'content': 'combined_markets', 'sources': ['sentiment', 'cn_markets', 'cn_crypto'],
+     'title': '中国市场更新', 'chart': 'cn', 'context': "Analyze these market movements"},
+    {'region': 'beijing', 'content': 'world_news', 'sources': ['cn_news'],
+     'context': "Provide context about this news story"},
+]
+
+# Worker threads shared by the post pipelines (fetch/format/generate/translate/post stages)
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '4'))
+
+# Job runtime: seconds a post job may run before it is cancelled (between
+# pipeline stages), how long to wait for it to stop after that, how late a
+# missed run may still start, and worker threads per region
+JOB_TIMEOUT_SECONDS = int(os.getenv('JOB_TIMEOUT_SECONDS', '300'))
+JOB_CANCEL_GRACE_SECONDS = int(os.getenv('JOB_CANCEL_GRACE_SECONDS', '30'))
+JOB_MISFIRE_GRACE_SECONDS = int(os.getenv('JOB_MISFIRE_GRACE_SECONDS', '900'))
+JOB_WORKERS_PER_REGION = int(os.getenv('JOB_WORKERS_PER_REGION', '2'))
+
+# Low-memory mode (256 MB VMs): each post job runs in its own short-lived
+# Python process (utils/job_process.py), so pandas, yfinance, matplotlib and
+# the X / AI clients are loaded only while a job runs and freed when it exits.
+# The scheduler itself stays small; each job pays ~2-3s of imports.
+LOW_MEMORY = os.getenv('LOW_MEMORY', 'false').lower() == 'true'
+
+# Stage pool (utils/process_pool.py): worker processes for the CPU-heavy parts
+# of stages (yfinance/pandas parsing, chart rendering), 0 = run them inline.
+# A task past the timeout gets its worker killed and replaced; each worker is
+# replaced after MAX_TASKS tasks. Off by default in LOW_MEMORY mode (one more process).
+STAGE_PROCESS_WORKERS = int(os.getenv('STAGE_PROCESS_WORKERS', '0' if LOW_MEMORY else '1'))
+STAGE_PROCESS_TIMEOUT_SECONDS = float(os.getenv('STAGE_PROCESS_TIMEOUT_SECONDS', '60'))
+STAGE_PROCESS_MAX_TASKS = int(os.getenv('STAGE_PROCESS_MAX_TASKS', '50'))
+
+# Daily plan (daily_plan.py): once a day (Texas time) fetch, generate and
+# translate every post's next run in batches and save it ready to post under
+# DAILY_PLAN_DIR. At post time, market data older than
+# DAILY_PLAN_MARKET_MAX_AGE_MINUTES is fetched again (and its post rebuilt);
+# the verse, sentiment and news are used as planned.
+DAILY_PLAN = os.getenv('DAILY_PLAN', 'false').lower() == 'true'
+DAILY_PLAN_HOUR = int(os.getenv('DAILY_PLAN_HOUR', '6'))
+DAILY_PLAN_MINUTE = int(os.getenv('DAILY_PLAN_MINUTE', '30'))
+DAILY_PLAN_DIR = os.getenv('DAILY_PLAN_DIR', 'data/plans')
+DAILY_PLAN_MARKET_MAX_AGE_MINUTES = int(os.getenv('DAILY_PLAN_MARKET_MAX_AGE_MINUTES', '120'))
+
+# Scheduler state: SQLite job store + run ledger (keep it on a persistent volume).
+# After a restart, posts missed within CATCHUP_GRACE_MINUTES are run once.
+SCHEDULER_DB_PATH = os.getenv('SCHEDULER_DB_PATH', 'data/scheduler.sqlite')
+CATCHUP_GRACE_MINUTES = int(os.getenv('CATCHUP_GRACE_MINUTES', '60'))
+
+# Seconds a SIGINT/SIGTERM shutdown may take to stop jobs and checkpoint
+# (keep it under kill_timeout in fly.toml)
+SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv('SHUTDOWN_TIMEOUT_SECONDS', '4'))
+
+# Metrics (Prometheus text format): HTTP endpoint port (0 = off) and/or a
+# textfile for node_exporter, rewritten after every job
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_TEXTFILE = os.getenv('METRICS_TEXTFILE', '')
+
+# Profiling (off by default): job ids to profile, comma-separated, or 'all'
+# (a post can also set 'profile' in POST_PIPELINES). 'cprofile' is exact;
+# 'sample' reads the job's stacks every PROFILE_SAMPLE_INTERVAL_MS, cheaper.
+# Reports go to PROFILE_DIR as <job>-<YYYYmmdd-HHMMSS>[.prof|-cprofile.txt|-samples.txt|-alloc.txt]
+PROFILE_JOBS = [job_id.strip() for job_id in os.getenv('PROFILE_JOBS', '').split(',') if job_id.strip()]
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'cprofile').lower()
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '10'))
+PROFILE_TRACEMALLOC = os.getenv('PROFILE_TRACEMALLOC', 'true').lower() == 'true'
+PROFILE_TRACEMALLOC_FRAMES = int(os.getenv('PROFILE_TRACEMALLOC_FRAMES', '1'))
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', '40'))
+
+# Twitter API Rate Limits (Free Tier: 500 tweets/month), per account
+MAX_TWEETS_PER_DAY = int(os.getenv('MAX_TWEETS_PER_DAY', '50'))
+MAX_TWEETS_PER_MONTH = int(os.getenv('MAX_TWEETS_PER_MONTH', '500'))
 TWEET_CHAR_LIMIT = 280
+THREAD_REPLY_DELAY_SECONDS = float(os.getenv('THREAD_REPLY_DELAY_SECONDS', '2'))  # Pause between replies in a thread
 
-# API Endpoints
-BIBLE_API_URL = "https://bible-api.com"
-NEWS_API_URL = "https://newsapi.org/v2"
-COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
+# Send X API calls here instead of api.twitter.com / upload.twitter.com
+# (e.g. the local mock: python -m benchmarks.mock_x_server)
+X_API_URL = os.getenv('X_API_URL', '')
 
-# Top crypto assets for combined markets posts
+# Groq response cache: identical prompts (same model and parameters) within
+# this window are served locally instead of calling Groq again. 0 disables it.
+LLM_CACHE_TTL_MINUTES = int(os.getenv('LLM_CACHE_TTL_MINUTES', '1440'))
+
+# Stream Groq completions: each numbered tweet is taken as soon as its line is
+# complete and the stream is closed once enough valid tweets are in
+AI_STREAMING = os.getenv('AI_STREAMING', 'true').lower() == 'true'
+
+# Times a generated tweet over the limit is regenerated on its own (shorter)
+# before it is dropped from the thread
+AI_REWRITE_ATTEMPTS = int(os.getenv('AI_REWRITE_ATTEMPTS', '2'))
+
+# LLM backend for thread generation: 'auto' (Groq if GROQ_API_KEY is set, else a
+# local model if available, else templates), 'groq', 'local', 'template' or 'none'
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'auto')
+
+# Local model (llama-cpp-python + a GGUF file), loaded once at startup
+LOCAL_LLM_MODEL_PATH = os.getenv('LOCAL_LLM_MODEL_PATH', 'models/qwen2.5-1.5b-instruct-q4_k_m.gguf')
+LOCAL_LLM_CONTEXT = int(os.getenv('LOCAL_LLM_CONTEXT', '2048'))
+LOCAL_LLM_THREADS = int(os.getenv('LOCAL_LLM_THREADS', '2'))
+
+# Pending LLM requests allowed before new ones are rejected, and seconds a caller waits
+LLM_QUEUE_SIZE = int(os.getenv('LLM_QUEUE_SIZE', '12'))
+LLM_REQUEST_TIMEOUT = int(os.getenv('LLM_REQUEST_TIMEOUT', '120'))
+
+# Translation backend: 'auto' (local OPUS-MT model if transformers, torch and
+# sentencepiece are installed, else Google), 'opus' or 'google'.
+# Google is always the fallback when the local model fails.
+TRANSLATION_BACKEND = os.getenv('TRANSLATION_BACKEND', 'auto')
+OPUS_MT_MODEL = os.getenv('OPUS_MT_MODEL', 'Helsinki-NLP/opus-mt-en-zh')  # Hub name or local directory
+OPUS_MT_TARGET_TOKEN = os.getenv('OPUS_MT_TARGET_TOKEN', '>>cmn_Hans<<')  # Simplified Chinese output
+LOCAL_TRANSLATION_THREADS = int(os.getenv('LOCAL_TRANSLATION_THREADS', '2'))
+TRANSLATION_BATCH_SIZE = int(os.getenv('TRANSLATION_BATCH_SIZE', '16'))
+TRANSLATION_QUEUE_SIZE = int(os.getenv('TRANSLATION_QUEUE_SIZE', '32'))
+TRANSLATION_TIMEOUT = int(os.getenv('TRANSLATION_TIMEOUT', '60'))
+
+# API Endpoints (overridable, e.g. to point at the benchmark stand-ins in benchmarks/)
+BIBLE_API_URL = os.getenv('BIBLE_API_URL', 'https://bible-api.com')
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://newsapi.org/v2')
+COINGECKO_API_URL = os.getenv('COINGECKO_API_URL', 'https://api.coingecko.com/api/v3')
+FEAR_GREED_API_URL = os.getenv('FEAR_GREED_API_URL', 'https://api.alternative.me/fng/')
+GROQ_BASE_URL = os.getenv('GROQ_BASE_URL', '')  # Empty: the Groq SDK default
+GOOGLE_TRANSLATE_URL = os.getenv('GOOGLE_TRANSLATE_URL', '')  # Empty: deep-translator's default
+
+# Traditional market tickers for combined markets posts (Yahoo Finance ticker: display name)
+US_MARKET_TICKERS = {
+    '^GSPC': 'S&P 500',
+    '^DJI': 'Dow Jones',
+    '^IXIC': 'Nasdaq',
+}
+CHINESE_MARKET_TICKERS = {
+    '000001.SS': 'Shanghai',
+    '^HSI': 'Hang Seng',
+    'BABA': 'Alibaba',
+}
+
+# Top crypto assets for combined markets posts (CoinGecko ids, in display order)
 TOP_CRYPTO_ASSETS = ['bitcoin', 'ethereum', 'binancecoin', 'solana']
+US_CRYPTO_COUNT = 4
+CHINESE_CRYPTO_COUNT = 3
+
+# One CoinGecko /coins/markets call fetches the top-N coins by market cap (plus
+# any TOP_CRYPTO_ASSETS outside them); posts slice their assets out of that
+# snapshot, kept per Texas date so the US and Beijing posts of a day share it
+CRYPTO_SNAPSHOT_SIZE = int(os.getenv('CRYPTO_SNAPSHOT_SIZE', '50'))
+CRYPTO_SNAPSHOT_MAX_AGE_MINUTES = int(os.getenv('CRYPTO_SNAPSHOT_MAX_AGE_MINUTES', '1440'))
+
+# Market chart images attached to the combined markets threads
+ENABLE_MARKET_CHARTS = os.getenv('ENABLE_MARKET_CHARTS', 'true').lower() == 'true'
+CHART_OUTPUT_DIR = os.getenv('CHART_OUTPUT_DIR', '.cache/charts')
+
+# Local price history store (one append-only file per ticker/coin)
+PRICE_HISTORY_DIR = os.getenv('PRICE_HISTORY_DIR', 'data/prices')
+PRICE_HISTORY_SEED_PERIOD = '3mo'  # yfinance period fetched the first time a ticker is seen
+PRICE_HISTORY_MAX_RECORDS = 2000   # bars kept per symbol after compaction
 
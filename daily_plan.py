@@ -0,0 +1,137 @@
+import time
+from datetime import datetime
+from apscheduler.triggers.cron import CronTrigger
+import config
+from utils.logger import setup_logger
+from utils.pipeline import Pipeline
+from utils.run_ledger import run_ledger
+from utils.plan_store import plan_store
+from post_registry import post_registry
+
+logger = setup_logger(__name__)
+
+# Job id of the daily plan in the scheduler and run ledger
+DAILY_PLAN_JOB = 'daily_plan'
+
+class DailyPlanner:
+    """Prepare every post's next run in one batched pass (DAILY_PLAN)
+
+    Each source is fetched once, the strings the Chinese main tweets need are
+    translated in one call, every reply prompt goes to the LLM backend as one
+    batch (duplicate prompts sent once) and
+    the Chinese replies are translated in one more call. Each thread is built
+    from those batch results (not the LLM response cache, which may be off or
+    expired) and saved with them to plan_store, ready to post as it is.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.job_id = DAILY_PLAN_JOB
+        self.hour = config.DAILY_PLAN_HOUR
+        self.minute = config.DAILY_PLAN_MINUTE
+        self.trigger = CronTrigger(hour=self.hour, minute=self.minute, timezone=config.TEXAS_TZ)
+
+    @property
+    def name(self):
+        """Job name, e.g. 'Daily Plan (6:30 AM)'"""
+        return f"Daily Plan ({self.hour % 12 or 12}:{self.minute:02d} {'AM' if self.hour < 12 else 'PM'})"
+
+    def _due(self, now):
+        """(post, run date) of every post's next run not posted yet"""
+        due = []
+        for post in self.registry.posts.values():
+            next_run = post.trigger.get_next_fire_time(None, now.astimezone(post.trigger.timezone))
+            run_date = next_run.date().isoformat()
+            if not run_ledger.is_completed(post.job_id, run_date):
+                due.append((post, run_date))
+        return due
+
+    def run(self, now=None):
+        """
+        Plan the next run of every post
+
+        Returns:
+            True if every due post was planned
+        """
+        from utils.ai_thread_generator import ai_thread_generator
+        from utils.translator import translator
+
+        start = time.perf_counter()
+        due = self._due(now or datetime.now(config.TEXAS_TZ))
+        if not due:
+            logger.info("Daily plan: nothing to plan")
+            return True
+
+        # Every source once, concurrently
+        fetch = Pipeline(self.job_id)
+        for name in dict.fromkeys(name for post, _ in due for name in post.sources):
+            fetch.add(name, self.registry.sources[name])
+        values = fetch.run()
+        fetched_at = time.time()
+
+        def inputs(post):
+            return [values[name] for name in post.sources]
+
+        planned = {}
+        ready = []
+        failed = []
+
+        # Main tweets, with every string they translate in one call
+        with translator.prefetched([text for post, _ in due for text in post.post_type.translations(post.options, *inputs(post))]):
+            for post, run_date in due:
+                try:
+                    planned[post.job_id] = {'main': post.post_type.main(post.options, *inputs(post))}
+                except Exception as e:
+                    logger.error("Daily plan: error formatting %s: %s", post.job_id, e)
+                    failed.append(post.job_id)
+        due = [(post, run_date) for post, run_date in due if post.job_id in planned]
+
+        def reply_inputs(post):
+            return [planned[post.job_id]['main']] if post.post_type.replies_from_main else inputs(post)
+
+        # Every reply prompt as one batch
+        requests = {post.job_id: post.post_type.reply_request(post.options, *reply_inputs(post)) for post, _ in due}
+        batch = list(dict.fromkeys(request for request in requests.values() if request))
+        threads = dict(zip(batch, ai_thread_generator.generate_batch(batch)))
+
+        # Chinese replies translated in one call, then served from memory
+        chinese = [
+            tweet for post, _ in due if post.options['language'] == 'zh'
+            for tweet in threads.get(requests[post.job_id], [])
+        ]
+        with translator.prefetched(chinese):
+            for post, run_date in due:
+                try:
+                    plan = planned[post.job_id]
+                    request = requests[post.job_id]
+                    if request:
+                        replies = ai_thread_generator.batch_thread(threads.get(request, []), post.options['language'])
+                    else:
+                        replies = post.post_type.replies(post.options, *reply_inputs(post))
+                    plan['replies'] = replies[:post.options['replies']]
+                    chart = post.post_type.chart(post.options, *inputs(post)) if post.options.get('chart') else None
+                    plan.update({
+                        'job_id': post.job_id,
+                        'run_date': run_date,
+                        'chart': plan_store.save_chart(post.job_id, run_date, chart) if chart else None,
+                        'sources': {name: values[name] for name in post.sources},
+                        'fetched_at': fetched_at,
+                        'planned_at': time.time(),
+                    })
+                    plan_store.save(post.job_id, run_date, plan)
+                    ready.append(post.job_id)
+                    logger.info("Daily plan: %s ready for %s", post.job_id, run_date)
+                except Exception as e:
+                    logger.error("Daily plan: error planning %s: %s", post.job_id, e)
+                    failed.append(post.job_id)
+
+        plan_store.prune()
+        logger.info(
+            "Daily plan: %s post(s) planned in %.1fs (%s reply prompts in one batch)%s",
+            len(ready), time.perf_counter() - start, len(batch),
+            f"; {', '.join(failed)} will be built at post time" if failed else ''
+        )
+        return not failed
+
+# Global daily planner instance
+daily_planner = DailyPlanner(post_registry)
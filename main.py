@@ -27,8 +27,17 @@ def validate_config():
         if not getattr(config, var):
             missing.append(var)
     
+    # Extra X accounts (TWITTER_ACCOUNTS) need the same credentials
+    for account, credentials in config.TWITTER_ACCOUNTS.items():
+        if account == 'default':
+            continue
+        for var in required_vars:
+            key = var[len('TWITTER_'):].lower()
+            if not credentials.get(key):
+                missing.append(f"TWITTER_{account.upper()}_{key.upper()}")
+    
     if missing:
-        logger.error(f"Missing required environment variables: {', '.join(missing)}")
+        logger.error("Missing required environment variables: %s", ', '.join(missing))
         logger.error("Please copy .env.example to .env and fill in your credentials")
         return False
     
@@ -47,35 +56,46 @@ def test_modules():
         logger.info("Testing Bible Verse module...")
         verse_text, reference = bible_module.get_verse()
         english = bible_module.format_tweet(verse_text, reference)
-        logger.info(f"✓ Bible Verse module working")
-        logger.info(f"  Preview: {english[:100]}...")
+        logger.info("✓ Bible Verse module working")
+        logger.info("  Preview: %s...", english[:100])
     except Exception as e:
-        logger.error(f"✗ Bible Verse module failed: {e}")
+        logger.error("✗ Bible Verse module failed: %s", e)
     
     # Test Combined Markets
     try:
         logger.info("Testing Combined Markets module...")
         english, chinese = combined_markets_module.generate_post()
-        logger.info(f"✓ Combined Markets module working")
-        logger.info(f"  English preview: {english[:100]}...")
+        logger.info("✓ Combined Markets module working")
+        logger.info("  English preview: %s...", english[:100])
         if config.ENABLE_CHINESE_POSTS:
-            logger.info(f"  Chinese preview: {chinese[:100]}...")
+            logger.info("  Chinese preview: %s...", chinese[:100])
     except Exception as e:
-        logger.error(f"✗ Combined Markets module failed: {e}")
+        logger.error("✗ Combined Markets module failed: %s", e)
     
     # Test World News
     try:
         logger.info("Testing World News module...")
         english, chinese = news_module.generate_post()
-        logger.info(f"✓ World News module working")
-        logger.info(f"  English preview: {english[:100]}...")
+        logger.info("✓ World News module working")
+        logger.info("  English preview: %s...", english[:100])
         if config.ENABLE_CHINESE_POSTS:
-            logger.info(f"  Chinese preview: {chinese[:100]}...")
+            logger.info("  Chinese preview: %s...", chinese[:100])
     except Exception as e:
-        logger.error(f"✗ World News module failed: {e}")
+        logger.error("✗ World News module failed: %s", e)
     
     logger.info("Module testing complete!")
 
+def plan_day():
+    """Build the daily plan now (posted by the scheduler when DAILY_PLAN is on)"""
+    from daily_plan import daily_planner
+    from utils.process_pool import stage_pool
+    
+    try:
+        if not daily_planner.run():
+            sys.exit(1)
+    finally:
+        stage_pool.shutdown()
+
 def run_bot():
     """Main entry point to run the bot"""
     logger.info("=" * 60)
@@ -88,11 +108,11 @@ def run_bot():
         logger.error("Configuration validation failed. Exiting...")
         sys.exit(1)
     
-    logger.info(f"✓ Configuration validated")
-    logger.info(f"✓ Texas timezone: {config.TEXAS_TZ}")
-    logger.info(f"✓ Beijing timezone: {config.BEIJING_TZ}")
-    logger.info(f"✓ Chinese posts enabled: {config.ENABLE_CHINESE_POSTS}")
-    logger.info(f"✓ Dry run mode: {config.DRY_RUN}")
+    logger.info("✓ Configuration validated")
+    logger.info("✓ Texas timezone: %s", config.TEXAS_TZ)
+    logger.info("✓ Beijing timezone: %s", config.BEIJING_TZ)
+    logger.info("✓ Chinese posts enabled: %s", config.ENABLE_CHINESE_POSTS)
+    logger.info("✓ Dry run mode: %s", config.DRY_RUN)
     logger.info("")
     
     # Start the scheduler
@@ -101,7 +121,7 @@ def run_bot():
     except KeyboardInterrupt:
         logger.info("Bot stopped by user. Goodbye!")
     except Exception as e:
-        logger.error(f"Bot error: {e}")
+        logger.error("Bot error: %s", e)
         sys.exit(1)
 
 def main():
@@ -119,6 +139,11 @@ def main():
         action='store_true',
         help='Run in dry-run mode (no actual posts)'
     )
+    parser.add_argument(
+        '--plan',
+        action='store_true',
+        help="Prepare the next run of every post now (daily plan) and exit"
+    )
     
     args = parser.parse_args()
     
@@ -128,6 +153,8 @@ def main():
     
     if args.test:
         test_modules()
+    elif args.plan:
+        plan_day()
     else:
         run_bot()
 
@@ -1,9 +1,14 @@
 import requests
 import random
 import os
+from datetime import datetime
 from dotenv import load_dotenv
 from utils.logger import setup_logger
 from utils.translator import translator
+from utils.cache import cache
+from utils.metrics import metrics
+from utils.tweet_length import weighted_length, fits, truncate
+import config
 
 # Load environment variables
 load_dotenv()
@@ -43,7 +48,7 @@ class BibleVerseModule:
     
     def __init__(self):
         # bible-api.com configuration (free, KJV translation)
-        self.api_url = "https://bible-api.com"
+        self.api_url = config.BIBLE_API_URL
     
     def get_random_reference(self):
         """Generate a random Bible verse reference"""
@@ -67,8 +72,9 @@ class BibleVerseModule:
             url = f"{self.api_url}/{reference}"
             params = {"translation": "kjv"}
             
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            with metrics.track('bible_api', 'get_verse'):
+                response = requests.get(url, params=params, timeout=10)
+                response.raise_for_status()
             
             data = response.json()
             verse_text = data['text'].strip()
@@ -76,21 +82,21 @@ class BibleVerseModule:
             
             # If verse is too short or empty, try again with fallback
             if len(verse_text) < 20:
-                logger.warning(f"Verse too short ({len(verse_text)} chars), using fallback")
+                logger.warning("Verse too short (%s chars), using fallback", len(verse_text))
                 reference = random.choice(FALLBACK_VERSES)
                 return self.get_verse(reference)
             
             # If verse is too long, use fallback
             if len(verse_text) > 500:
-                logger.warning(f"Verse too long ({len(verse_text)} chars), using fallback")
+                logger.warning("Verse too long (%s chars), using fallback", len(verse_text))
                 reference = random.choice(FALLBACK_VERSES)
                 return self.get_verse(reference)
             
-            logger.info(f"Fetched verse: {verse_reference} ({len(verse_text)} chars)")
+            logger.info("Fetched verse: %s (%s chars)", verse_reference, len(verse_text))
             return verse_text, verse_reference
         
         except Exception as e:
-            logger.warning(f"Error fetching verse ({reference}): {e}. Using fallback.")
+            logger.warning("Error fetching verse (%s): %s. Using fallback.", reference, e)
             # Try fallback verse
             if reference not in FALLBACK_VERSES:
                 try:
@@ -102,6 +108,18 @@ class BibleVerseModule:
             # Ultimate fallback
             return "For God so loved the world, that he gave his only begotten Son, that whosoever believeth in him should not perish, but have everlasting life.", "John 3:16"
     
+    def get_daily_verse(self):
+        """Get today's verse (by Texas date), shared by the Texas and Beijing posts"""
+        key = f"daily_verse_{datetime.now(config.TEXAS_TZ).strftime('%Y-%m-%d')}"
+        
+        cached = cache.get(key, max_age_minutes=24 * 60)
+        if cached:
+            return cached[0], cached[1]
+        
+        verse_text, reference = self.get_verse()
+        cache.set(key, [verse_text, reference])
+        return verse_text, reference
+    
     def format_tweet(self, verse_text, reference):
         """Format verse as a simple tweet (just scripture and reference)"""
         # Clean up the verse text
@@ -111,29 +129,34 @@ class BibleVerseModule:
         tweet = f"\"{verse_text}\"\n\n{reference} (KJV)"
         
         # Ensure it fits Twitter's character limit
-        if len(tweet) > 270:
+        if not fits(tweet, 270):
             # Truncate verse text if needed
-            max_verse_length = 270 - len(f"\"\"\n\n{reference} (KJV)")
-            verse_text = verse_text[:max_verse_length-3] + "..."
+            max_verse_length = 270 - weighted_length(f"\"\"\n\n{reference} (KJV)")
+            verse_text = truncate(verse_text, max_verse_length)
             tweet = f"\"{verse_text}\"\n\n{reference} (KJV)"
         
         return tweet
     
+    def format_chinese_tweet(self, verse_text, reference):
+        """Translate a verse and format it as a Chinese tweet"""
+        chinese_verse, chinese_reference = translator.translate_batch([verse_text, reference])
+        chinese_tweet = f"\"{chinese_verse}\"\n\n{chinese_reference} (KJV)"
+        
+        # Ensure Chinese tweet fits limit
+        if not fits(chinese_tweet):
+            max_length = config.TWEET_CHAR_LIMIT - weighted_length(f"\"\"\n\n{chinese_reference} (KJV)")
+            chinese_verse = truncate(chinese_verse, max_length)
+            chinese_tweet = f"\"{chinese_verse}\"\n\n{chinese_reference} (KJV)"
+        
+        return chinese_tweet
+    
     def generate_post(self):
         """Generate both English and Chinese posts"""
         verse_text, reference = self.get_verse()
         english_tweet = self.format_tweet(verse_text, reference)
         
         # Translate to Chinese (simple format)
-        chinese_verse = translator.translate(verse_text)
-        chinese_reference = translator.translate(reference)
-        chinese_tweet = f"\"{chinese_verse}\"\n\n{chinese_reference} (KJV)"
-        
-        # Ensure Chinese tweet fits limit
-        if len(chinese_tweet) > 280:
-            max_length = 280 - len(f"\"\"\n\n{chinese_reference} (KJV)")
-            chinese_verse = chinese_verse[:max_length-3] + "..."
-            chinese_tweet = f"\"{chinese_verse}\"\n\n{chinese_reference} (KJV)"
+        chinese_tweet = self.format_chinese_tweet(verse_text, reference)
         
         return english_tweet, chinese_tweet
 
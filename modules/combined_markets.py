@@ -1,77 +1,102 @@
 import requests
-import yfinance as yf
+from datetime import datetime
+import numpy as np
 from utils.logger import setup_logger
 from utils.translator import translator
+from utils.cache import cache
+from utils.metrics import metrics
+from utils.chart_renderer import PriceHistoryBuffer, render_chart
+from utils.process_pool import stage_pool
+from utils.price_store import price_store
+from utils.delta_fetcher import delta_fetcher
+from utils.market_snapshot import MarketSnapshot
+from utils.tweet_length import fits, truncate
 import config
 
 logger = setup_logger(__name__)
 
+# Ticker symbols for CoinGecko ids (used when falling back to stored prices)
+CRYPTO_SYMBOLS = {
+    'bitcoin': 'BTC',
+    'ethereum': 'ETH',
+    'binancecoin': 'BNB',
+    'solana': 'SOL'
+}
+
 class CombinedMarketsModule:
     """Generate combined 24H traditional finance + crypto market updates"""
     
     def __init__(self):
-        self.fear_greed_url = "https://api.alternative.me/fng/"
+        self.fear_greed_url = config.FEAR_GREED_API_URL
         self.coingecko_url = config.COINGECKO_API_URL
         
         # US market tickers for Texas timezone
-        self.us_tickers = {
-            '^GSPC': 'S&P 500',
-            '^DJI': 'Dow Jones',
-            '^IXIC': 'Nasdaq'
-        }
+        self.us_tickers = config.US_MARKET_TICKERS
         
         # Chinese market tickers for Beijing timezone
-        self.chinese_tickers = {
-            '000001.SS': 'Shanghai',
-            '^HSI': 'Hang Seng',
-            'BABA': 'Alibaba'
-        }
+        self.chinese_tickers = config.CHINESE_MARKET_TICKERS
         
         # Top crypto assets
-        self.top_cryptos = ['bitcoin', 'ethereum', 'binancecoin', 'solana']
+        self.top_cryptos = config.TOP_CRYPTO_ASSETS
+        
+        # Price history for charts (fed by every fetch) and the latest data per region
+        self.price_history = PriceHistoryBuffer()
+        self.latest = {}
     
     def get_fear_greed_index(self):
         """Get Fear & Greed Index as market sentiment"""
         try:
-            response = requests.get(self.fear_greed_url, timeout=10)
-            response.raise_for_status()
+            with metrics.track('alternative_me', 'fear_greed'):
+                response = requests.get(self.fear_greed_url, timeout=10)
+                response.raise_for_status()
             
             data = response.json()
             value = int(data['data'][0]['value'])
             classification = data['data'][0]['value_classification']
             
-            logger.info(f"Fear & Greed Index: {value} ({classification})")
+            logger.info("Fear & Greed Index: %s (%s)", value, classification)
             return value, classification
         
         except Exception as e:
-            logger.error(f"Error fetching Fear & Greed Index: {e}")
+            logger.error("Error fetching Fear & Greed Index: %s", e)
             return 50, "Neutral"
     
+    def _get_markets(self, tickers, region):
+        """Refresh a set of tickers and quote them from the local price store
+        
+        Failed fetches fall back to the last stored value. Changes for all
+        tickers are computed in one pass over a (tickers x 2) array of closes.
+        """
+        for ticker, name in tickers.items():
+            try:
+                delta_fetcher.fetch(ticker)
+            except Exception as e:
+                logger.warning("Failed to get %s: %s (using last stored value)", name, e)
+        
+        closes = np.full((len(tickers), 2), np.nan)
+        for row, (ticker, name) in enumerate(tickers.items()):
+            series = price_store.closes(ticker, limit=self.price_history.capacity)
+            closes[row, 2 - series[-2:].size:] = series[-2:]
+            self.price_history.set_series(name, series)
+        
+        snapshot = MarketSnapshot.from_closes(list(tickers.values()), closes)
+        if len(snapshot):
+            logger.info("[%s] %s", region, snapshot.render_lines(with_price=True).replace('\n', '; '))
+        
+        results = snapshot.to_dict()
+        for ticker, name in tickers.items():
+            change_7d = price_store.change(ticker, days=7)
+            if name in results and change_7d is not None:
+                results[name]['change_7d'] = change_7d
+        
+        return results
+    
     def get_us_markets(self):
         """Fetch top US market assets for Texas timezone"""
         try:
-            results = {}
+            results = self._get_markets(self.us_tickers, 'US')
             
-            for ticker, name in self.us_tickers.items():
-                try:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period='2d')
-                    
-                    if len(hist) >= 2:
-                        today_close = hist['Close'].iloc[-1]
-                        yesterday_close = hist['Close'].iloc[-2]
-                        change_pct = ((today_close - yesterday_close) / yesterday_close) * 100
-                        
-                        results[name] = {
-                            'price': today_close,
-                            'change': change_pct
-                        }
-                        logger.info(f"[US] {name}: ${today_close:.2f} ({change_pct:+.1f}%)")
-                
-                except Exception as e:
-                    logger.warning(f"Failed to get {name}: {e}")
-            
-            # Fallback if no data
+            # Fallback if no data fetched or stored yet
             if not results:
                 logger.warning("No US market data, using fallback")
                 results = {
@@ -83,7 +108,7 @@ class CombinedMarketsModule:
             return results
         
         except Exception as e:
-            logger.error(f"Error fetching US markets: {e}")
+            logger.error("Error fetching US markets: %s", e)
             return {
                 'S&P 500': {'price': 5800, 'change': 0.5},
                 'Dow Jones': {'price': 43000, 'change': 0.3},
@@ -93,28 +118,9 @@ class CombinedMarketsModule:
     def get_chinese_markets(self):
         """Fetch top Chinese market assets for Beijing timezone"""
         try:
-            results = {}
-            
-            for ticker, name in self.chinese_tickers.items():
-                try:
-                    stock = yf.Ticker(ticker)
-                    hist = stock.history(period='2d')
-                    
-                    if len(hist) >= 2:
-                        today_close = hist['Close'].iloc[-1]
-                        yesterday_close = hist['Close'].iloc[-2]
-                        change_pct = ((today_close - yesterday_close) / yesterday_close) * 100
-                        
-                        results[name] = {
-                            'price': today_close,
-                            'change': change_pct
-                        }
-                        logger.info(f"[CN] {name}: ${today_close:.2f} ({change_pct:+.1f}%)")
-                
-                except Exception as e:
-                    logger.warning(f"Failed to get {name}: {e}")
+            results = self._get_markets(self.chinese_tickers, 'CN')
             
-            # Fallback if no data
+            # Fallback if no data fetched or stored yet
             if not results:
                 logger.warning("No Chinese market data, using fallback")
                 results = {
@@ -126,49 +132,108 @@ class CombinedMarketsModule:
             return results
         
         except Exception as e:
-            logger.error(f"Error fetching Chinese markets: {e}")
+            logger.error("Error fetching Chinese markets: %s", e)
             return {
                 'Shanghai': {'price': 3200, 'change': 0.4},
                 'Hang Seng': {'price': 20500, 'change': 0.6},
                 'Alibaba': {'price': 95, 'change': 1.2}
             }
     
-    def get_crypto_markets(self, limit=4):
-        """Fetch top cryptocurrencies"""
-        try:
-            ids = ','.join(self.top_cryptos[:limit])
-            url = f"{self.coingecko_url}/coins/markets"
-            params = {
-                'vs_currency': 'usd',
-                'ids': ids,
-                'order': 'market_cap_desc',
-                'per_page': limit,
-                'page': 1,
-                'sparkline': False,
-                'price_change_percentage': '24h'
-            }
-            
+    def _fetch_coins(self, **params):
+        """One CoinGecko /coins/markets call, as {'id', 'symbol', 'price', 'change'} dicts"""
+        url = f"{self.coingecko_url}/coins/markets"
+        params = {
+            'vs_currency': 'usd',
+            'order': 'market_cap_desc',
+            'page': 1,
+            'sparkline': False,
+            'price_change_percentage': '24h',
+            **params
+        }
+        
+        with metrics.track('coingecko', 'markets'):
             response = requests.get(url, params=params, timeout=10)
             response.raise_for_status()
+        
+        return [
+            {
+                'id': crypto['id'],
+                'symbol': crypto.get('symbol', 'N/A').upper(),
+                'price': crypto.get('current_price'),
+                'change': crypto.get('price_change_percentage_24h')
+            }
+            for crypto in response.json()
+        ]
+    
+    def get_crypto_snapshot(self):
+        """Fetch the top CRYPTO_SNAPSHOT_SIZE coins by market cap in one call
+        
+        Configured assets outside the top N are requested by id in one more
+        call. The snapshot is cached under the Texas date (for up to
+        CRYPTO_SNAPSHOT_MAX_AGE_MINUTES), so the US and Beijing posts of a day
+        slice from the same upstream response.
+        
+        Returns:
+            List of {'id', 'symbol', 'price', 'change'} dicts in market cap order
+        """
+        key = f"crypto_snapshot_{datetime.now(config.TEXAS_TZ).strftime('%Y-%m-%d')}"
+        coins = cache.get(key, max_age_minutes=config.CRYPTO_SNAPSHOT_MAX_AGE_MINUTES)
+        if coins is not None:
+            return coins
+        
+        coins = self._fetch_coins(per_page=config.CRYPTO_SNAPSHOT_SIZE)
+        
+        fetched = {coin['id'] for coin in coins}
+        missing = [coin_id for coin_id in self.top_cryptos if coin_id not in fetched]
+        if missing:
+            coins += self._fetch_coins(ids=','.join(missing), per_page=len(missing))
+        
+        for coin in coins:
+            if coin['price'] is not None:
+                price_store.append_price(coin['id'], coin['price'])
+        
+        cache.set(key, coins)
+        logger.info("Fetched crypto snapshot (%s coins)", len(coins))
+        return coins
+    
+    def get_crypto_markets(self, limit=4):
+        """Get the configured top cryptocurrencies from the crypto snapshot"""
+        try:
+            by_id = {coin['id']: coin for coin in self.get_crypto_snapshot()}
+            for coin_id in self.top_cryptos:
+                if coin_id not in by_id:
+                    logger.warning("Crypto asset '%s' is not on CoinGecko, leaving it out", coin_id)
+            coins = [by_id[coin_id] for coin_id in self.top_cryptos if coin_id in by_id][:limit]
             
-            data = response.json()
+            snapshot = MarketSnapshot(
+                [coin['symbol'] for coin in coins],
+                [coin['price'] for coin in coins],
+                [coin['change'] for coin in coins]
+            )
             
-            results = {}
-            for crypto in data[:limit]:
-                symbol = crypto.get('symbol', 'N/A').upper()
-                price = crypto.get('current_price', 0)
-                change = crypto.get('price_change_percentage_24h', 0)
-                
-                results[symbol] = {
-                    'price': price,
-                    'change': change
-                }
-                logger.info(f"{symbol}: ${price:,.2f} ({change:+.1f}%)")
+            for coin, symbol in zip(coins, snapshot.labels):
+                self.price_history.set_series(symbol, price_store.closes(coin['id'], limit=self.price_history.capacity))
             
-            return results
+            logger.info("[CRYPTO] %s", snapshot.render_lines(with_price=True).replace('\n', '; '))
+            return snapshot.to_dict()
         
         except Exception as e:
-            logger.error(f"Error fetching crypto data: {e}")
+            logger.error("Error fetching crypto data: %s", e)
+            
+            # Last-known-good prices from the local store
+            results = {}
+            for coin_id in self.top_cryptos[:limit]:
+                last = price_store.last(coin_id)
+                if last:
+                    symbol = CRYPTO_SYMBOLS.get(coin_id, coin_id.upper())
+                    results[symbol] = {
+                        'price': last[1],
+                        'change': price_store.change(coin_id, days=1) or 0.0
+                    }
+            if results:
+                logger.warning("Using last stored prices for %s cryptos", len(results))
+                return results
+            
             return {
                 'BTC': {'price': 68000, 'change': 2.0},
                 'ETH': {'price': 3500, 'change': 1.5},
@@ -176,72 +241,46 @@ class CombinedMarketsModule:
                 'SOL': {'price': 180, 'change': 0.8}
             }
     
-    def format_price(self, price):
-        """Format price based on magnitude"""
-        if price >= 1000:
-            return f"${price:,.0f}"
-        elif price >= 1:
-            return f"${price:,.2f}"
-        else:
-            return f"${price:.4f}"
-    
-    def get_trend_symbol(self, change):
-        """Get trend symbol based on change"""
-        if change >= 0:
-            return "+"
-        else:
-            return "-"
+    def _as_snapshot(self, markets):
+        """Accept either a MarketSnapshot or a {name: {'price', 'change'}} dict"""
+        if isinstance(markets, MarketSnapshot):
+            return markets
+        return MarketSnapshot.from_quotes(markets)
     
     def format_tweet(self, traditional_markets, crypto_markets, sentiment_value, sentiment_name, language='en', title='Markets Update'):
-        """Format combined markets as a tweet"""
+        """Format combined markets as a tweet
+        
+        Markets may be given as MarketSnapshot objects or as {name: {'price', 'change'}} dicts.
+        """
+        traditional = self._as_snapshot(traditional_markets)
+        crypto = self._as_snapshot(crypto_markets)
+        
         if language == 'en':
-            tweet = f"24H {title}\n\n"
-            tweet += f"Sentiment: {sentiment_name} ({sentiment_value}/100)\n\n"
-            
-            # Traditional Markets
-            tweet += "US MARKETS:\n"
-            for name, data in traditional_markets.items():
-                change = data['change']
-                trend = self.get_trend_symbol(change)
-                tweet += f"{trend} {name}: {change:+.1f}%\n"
-            
-            # Crypto Markets
-            tweet += "\nCRYPTO:\n"
-            for symbol, data in crypto_markets.items():
-                change = data['change']
-                trend = self.get_trend_symbol(change)
-                price = self.format_price(data['price'])
-                tweet += f"{trend} {symbol}: {price} ({change:+.1f}%)\n"
-            
-            tweet += "\n#Markets #Finance #Crypto"
+            sections = [
+                f"24H {title}",
+                f"Sentiment: {sentiment_name} ({sentiment_value}/100)",
+                "US MARKETS:\n" + traditional.render_lines(),
+                "CRYPTO:\n" + crypto.render_lines(with_price=True),
+                "#Markets #Finance #Crypto"
+            ]
         
         else:  # Chinese
             sentiment_cn = translator.translate(sentiment_name)
-            tweet = f"24小时{title}\n\n"
-            tweet += f"市场情绪: {sentiment_cn} ({sentiment_value}/100)\n\n"
-            
-            # Chinese Markets
-            tweet += "中国市场:\n"
-            for name, data in traditional_markets.items():
-                change = data['change']
-                trend = self.get_trend_symbol(change)
+            sections = [
+                f"24小时{title}",
+                f"市场情绪: {sentiment_cn} ({sentiment_value}/100)",
                 # Don't translate Chinese market names
-                tweet += f"{trend} {name}: {change:+.1f}%\n"
-            
-            # Crypto Markets
-            tweet += "\n加密货币:\n"
-            for symbol, data in crypto_markets.items():
-                change = data['change']
-                trend = self.get_trend_symbol(change)
-                price = self.format_price(data['price'])
-                tweet += f"{trend} {symbol}: {price} ({change:+.1f}%)\n"
-            
-            tweet += "\n#市场 #金融 #加密货币"
+                "中国市场:\n" + traditional.render_lines(),
+                "加密货币:\n" + crypto.render_lines(with_price=True),
+                "#市场 #金融 #加密货币"
+            ]
+        
+        tweet = "\n\n".join(sections)
         
         # Ensure it fits character limit
-        if len(tweet) > 280:
-            tweet = tweet[:277] + "..."
-            logger.warning(f"Combined markets tweet truncated to 280 chars")
+        if not fits(tweet):
+            tweet = truncate(tweet)
+            logger.warning("Combined markets tweet truncated to 280 chars")
         
         return tweet
     
@@ -249,7 +288,7 @@ class CombinedMarketsModule:
         """Generate US market post for Texas timezone (English)"""
         sentiment_value, sentiment_name = self.get_fear_greed_index()
         us_markets = self.get_us_markets()
-        crypto_markets = self.get_crypto_markets(limit=4)  # Top 4 cryptos for US
+        crypto_markets = self.get_crypto_markets(limit=config.US_CRYPTO_COUNT)
         
         tweet = self.format_tweet(
             us_markets, 
@@ -259,6 +298,7 @@ class CombinedMarketsModule:
             language='en',
             title='US Markets Update'
         )
+        self.latest['us'] = (us_markets, crypto_markets)
         
         return tweet
     
@@ -266,7 +306,7 @@ class CombinedMarketsModule:
         """Generate Chinese market post for Beijing timezone (Chinese)"""
         sentiment_value, sentiment_name = self.get_fear_greed_index()
         chinese_markets = self.get_chinese_markets()
-        crypto_markets = self.get_crypto_markets(limit=3)  # Top 3 cryptos for Chinese
+        crypto_markets = self.get_crypto_markets(limit=config.CHINESE_CRYPTO_COUNT)
         
         tweet = self.format_tweet(
             chinese_markets, 
@@ -276,9 +316,49 @@ class CombinedMarketsModule:
             language='zh',
             title='中国市场更新'
         )
+        self.latest['cn'] = (chinese_markets, crypto_markets)
         
         return tweet
     
+    def render_chart(self, region, traditional_markets, crypto_markets):
+        """Render a chart PNG for a region ('us' or 'cn') from the given market data
+        
+        Returns:
+            Path to the PNG, or None if charts are disabled or rendering failed
+        """
+        if not config.ENABLE_MARKET_CHARTS:
+            return None
+        
+        assets = {**traditional_markets, **crypto_markets}
+        # Chart labels stay in English: the default fonts have no CJK glyphs
+        title = '24H US Markets' if region == 'us' else '24H China Markets'
+        
+        # Rendered in the stage pool (matplotlib stays out of this process)
+        try:
+            return stage_pool.call(
+                render_chart,
+                assets,
+                self.price_history,
+                title,
+                subtitle=datetime.now().strftime('%B %d, %Y'),
+                filename=f"markets_{region}.png"
+            )
+        except Exception as e:
+            logger.error("Error rendering chart: %s", e)
+            return None
+    
+    def generate_chart(self, region='us'):
+        """Render a chart PNG from the latest fetched data for a region ('us' or 'cn')
+        
+        Returns:
+            Path to the PNG, or None if charts are disabled or no data was fetched yet
+        """
+        if region not in self.latest:
+            return None
+        
+        traditional_markets, crypto_markets = self.latest[region]
+        return self.render_chart(region, traditional_markets, crypto_markets)
+    
     def generate_post(self):
         """Generate both US and Chinese market posts (for backward compatibility)"""
         english = self.generate_us_post()
@@ -1,7 +1,10 @@
 import requests
 from datetime import datetime, timedelta
 from utils.logger import setup_logger
+from utils.metrics import metrics
 from utils.translator import translator
+from utils.tweet_length import weighted_length, fits, truncate
+import config
 import os
 
 logger = setup_logger(__name__)
@@ -11,7 +14,7 @@ class WorldNewsModule:
     
     def __init__(self):
         self.api_key = os.getenv('NEWS_API_KEY', '')
-        self.base_url = "https://newsapi.org/v2/everything"
+        self.base_url = f"{config.NEWS_API_URL}/everything"
         
         # AI breakthrough search terms for US/Global audience (Texas)
         self.us_ai_terms = [
@@ -55,7 +58,8 @@ class WorldNewsModule:
                     'from': (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
                 }
                 
-                response = requests.get(self.base_url, params=params, timeout=10)
+                with metrics.track('newsapi', 'everything'):
+                    response = requests.get(self.base_url, params=params, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -66,7 +70,7 @@ class WorldNewsModule:
                         filtered = [a for a in articles if self._is_ai_breakthrough(a)]
                         if filtered:
                             article = filtered[0]
-                            logger.info(f"[US] Fetched AI news: {article['title'][:50]}")
+                            logger.info("[US] Fetched AI news: %s", article['title'][:50])
                             return {
                                 'title': article['title'][:150],
                                 'source': article.get('source', {}).get('name', 'Tech News')
@@ -77,7 +81,7 @@ class WorldNewsModule:
             return self._get_mock_us_ai_news()
             
         except Exception as e:
-            logger.error(f"Error fetching US AI news: {e}")
+            logger.error("Error fetching US AI news: %s", e)
             return self._get_mock_us_ai_news()
     
     def fetch_chinese_ai_news(self):
@@ -98,7 +102,8 @@ class WorldNewsModule:
                     'from': (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
                 }
                 
-                response = requests.get(self.base_url, params=params, timeout=10)
+                with metrics.track('newsapi', 'everything'):
+                    response = requests.get(self.base_url, params=params, timeout=10)
                 
                 if response.status_code == 200:
                     data = response.json()
@@ -109,7 +114,7 @@ class WorldNewsModule:
                         filtered = [a for a in articles if self._is_ai_breakthrough(a)]
                         if filtered:
                             article = filtered[0]
-                            logger.info(f"[CN] Fetched AI news: {article['title'][:50]}")
+                            logger.info("[CN] Fetched AI news: %s", article['title'][:50])
                             return {
                                 'title': article['title'][:150],
                                 'source': article.get('source', {}).get('name', 'Tech News')
@@ -120,7 +125,7 @@ class WorldNewsModule:
             return self._get_mock_chinese_ai_news()
             
         except Exception as e:
-            logger.error(f"Error fetching Chinese AI news: {e}")
+            logger.error("Error fetching Chinese AI news: %s", e)
             return self._get_mock_chinese_ai_news()
     
     def _is_ai_breakthrough(self, article):
@@ -169,32 +174,26 @@ class WorldNewsModule:
             'source': 'South China Morning Post'
         }
     
-    def generate_post(self):
-        """Generate AI breakthrough articles (US for English, Chinese for Chinese)"""
-        
-        # Fetch US/Global AI news for English (Texas timezone)
-        us_ai_news = self.fetch_us_ai_news()
-        
-        # Fetch Chinese AI news for Chinese (Beijing timezone)
-        chinese_ai_news = self.fetch_chinese_ai_news()
-        
-        # Format English tweet (US AI breakthrough)
+    def format_us_tweet(self, us_ai_news):
+        """Format the English tweet for a US/Global AI article"""
         english_tweet = f"🚀 AI Breakthrough\n\n"
         english_tweet += f"{us_ai_news['title']}\n\n"
         english_tweet += f"Source: {us_ai_news['source']}\n\n"
         english_tweet += "#AI #ArtificialIntelligence #Innovation"
         
         # Ensure it fits
-        if len(english_tweet) > 280:
-            max_title = 280 - len(f"🚀 AI Breakthrough\n\n\n\nSource: {us_ai_news['source']}\n\n#AI #ArtificialIntelligence #Innovation")
+        if not fits(english_tweet):
+            max_title = config.TWEET_CHAR_LIMIT - weighted_length(f"🚀 AI Breakthrough\n\n\n\nSource: {us_ai_news['source']}\n\n#AI #ArtificialIntelligence #Innovation")
             english_tweet = f"🚀 AI Breakthrough\n\n"
-            english_tweet += f"{us_ai_news['title'][:max_title]}...\n\n"
+            english_tweet += f"{truncate(us_ai_news['title'], max_title)}\n\n"
             english_tweet += f"Source: {us_ai_news['source']}\n\n"
             english_tweet += "#AI #ArtificialIntelligence #Innovation"
         
-        # Format Chinese tweet (Chinese AI breakthrough, translated)
-        title_cn = translator.translate(chinese_ai_news['title'])
-        source_cn = translator.translate(chinese_ai_news['source'])
+        return english_tweet
+    
+    def format_chinese_tweet(self, chinese_ai_news):
+        """Translate and format the Chinese tweet for a Chinese AI article"""
+        title_cn, source_cn = translator.translate_batch([chinese_ai_news['title'], chinese_ai_news['source']])
         
         chinese_tweet = f"🚀 人工智能突破\n\n"
         chinese_tweet += f"{title_cn}\n\n"
@@ -202,14 +201,26 @@ class WorldNewsModule:
         chinese_tweet += "#人工智能 #AI #创新"
         
         # Ensure it fits
-        if len(chinese_tweet) > 280:
-            max_title = 280 - len(f"🚀 人工智能突破\n\n\n\n来源: {source_cn}\n\n#人工智能 #AI #创新")
+        if not fits(chinese_tweet):
+            max_title = config.TWEET_CHAR_LIMIT - weighted_length(f"🚀 人工智能突破\n\n\n\n来源: {source_cn}\n\n#人工智能 #AI #创新")
             chinese_tweet = f"🚀 人工智能突破\n\n"
-            chinese_tweet += f"{title_cn[:max_title]}...\n\n"
+            chinese_tweet += f"{truncate(title_cn, max_title)}\n\n"
             chinese_tweet += f"来源: {source_cn}\n\n"
             chinese_tweet += "#人工智能 #AI #创新"
         
-        return english_tweet, chinese_tweet
+        return chinese_tweet
+    
+    def generate_us_post(self):
+        """Generate the English AI news post for Texas timezone"""
+        return self.format_us_tweet(self.fetch_us_ai_news())
+    
+    def generate_chinese_post(self):
+        """Generate the Chinese AI news post for Beijing timezone"""
+        return self.format_chinese_tweet(self.fetch_chinese_ai_news())
+    
+    def generate_post(self):
+        """Generate AI breakthrough articles (US for English, Chinese for Chinese)"""
+        return self.generate_us_post(), self.generate_chinese_post()
 
 # Global instance
 news_module = WorldNewsModule()
@@ -0,0 +1,374 @@
+import os
+import time
+import threading
+from datetime import datetime
+from apscheduler.triggers.cron import CronTrigger
+import config
+from utils.logger import setup_logger
+from utils.pipeline import Pipeline
+from utils.cache import cache
+from utils.plan_store import plan_store
+
+logger = setup_logger(__name__)
+
+# The content modules and the X / AI clients pull in pandas, yfinance,
+# matplotlib, tweepy, groq and deep_translator, so they are imported on first
+# use: a scheduler running jobs in subprocesses (LOW_MEMORY) never loads them.
+def _bible():
+    from modules.bible_verse import bible_module
+    return bible_module
+
+def _markets():
+    from modules.combined_markets import combined_markets_module
+    return combined_markets_module
+
+def _news():
+    from modules.world_news import news_module
+    return news_module
+
+def _ai():
+    from utils.ai_thread_generator import ai_thread_generator
+    return ai_thread_generator
+
+def _x():
+    from utils.twitter_client import twitter_pool
+    return twitter_pool
+
+# Jobs run in this process unless LOW_MEMORY: import everything now, so the
+# first post's stages (e.g. replies loading groq / deep_translator) don't pay for it
+if not config.LOW_MEMORY:
+    for _load in (_bible, _markets, _news, _ai, _x):
+        _load()
+
+
+class SharedSource:
+    """A data stage shared by every post pipeline that names it
+
+    The first post to need it fetches it; posts running at the same time wait
+    for that fetch, and later ones reuse the result while it is fresh. Results
+    are kept in the file cache under the run date (by Texas date, like the
+    daily verse), so a Beijing post ~11 hours after the Texas one, or a job
+    in its own process (LOW_MEMORY), reuses them too.
+    """
+
+    def __init__(self, name, func, max_age_minutes=0):
+        self.name = name
+        self.func = func
+        self.max_age_minutes = max_age_minutes
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            key = f"source_{self.name}_{datetime.now(config.TEXAS_TZ).strftime('%Y-%m-%d')}"
+            if self.max_age_minutes:
+                cached = cache.get(key, max_age_minutes=self.max_age_minutes)
+                if cached is not None:
+                    logger.info("Reusing shared source '%s'", self.name)
+                    return cached
+
+            value = self.func()
+            # Empty results (failed fetches) are not kept for later posts
+            if self.max_age_minutes and value:
+                cache.set(key, value)
+            return value
+
+
+# Minutes in a day: sources that change daily are reused for the whole run date
+DAY_MINUTES = 24 * 60
+
+# Data stages post pipelines can name in 'sources': (fetch, minutes a result
+# may be reused, minutes a daily plan built on it stays postable; None: all day)
+SOURCES = {
+    'verse': (lambda: _bible().get_daily_verse(), DAY_MINUTES, None),
+    'sentiment': (lambda: _markets().get_fear_greed_index(), DAY_MINUTES, None),
+    'us_markets': (lambda: _markets().get_us_markets(), 5, config.DAILY_PLAN_MARKET_MAX_AGE_MINUTES),
+    'cn_markets': (lambda: _markets().get_chinese_markets(), 5, config.DAILY_PLAN_MARKET_MAX_AGE_MINUTES),
+    'us_crypto': (lambda: _markets().get_crypto_markets(limit=config.US_CRYPTO_COUNT), 5, config.DAILY_PLAN_MARKET_MAX_AGE_MINUTES),
+    'cn_crypto': (lambda: _markets().get_crypto_markets(limit=config.CHINESE_CRYPTO_COUNT), 5, config.DAILY_PLAN_MARKET_MAX_AGE_MINUTES),
+    'us_news': (lambda: _news().fetch_us_ai_news(), 60, None),
+    'cn_news': (lambda: _news().fetch_chinese_ai_news(), 60, None),
+}
+
+
+class PostType:
+    """How a content type turns its sources into a thread
+
+    main() formats the main tweet from the sources and chart() optionally
+    renders an image for it. replies() gets the AI follow-ups, from the main
+    tweet when replies_from_main is set and otherwise straight from the
+    sources, so generation doesn't wait for formatting (or translation).
+
+    For the daily plan, translations() lists the strings main() translates and
+    reply_request() the generate_batch() request behind replies(), so a whole
+    day's posts are translated and generated in batches.
+    """
+
+    replies_from_main = False
+
+    def main(self, options, *sources):
+        raise NotImplementedError
+
+    def replies(self, options, *inputs):
+        raise NotImplementedError
+
+    def chart(self, options, *sources):
+        return None
+
+    def translations(self, options, *sources):
+        return []
+
+    def reply_request(self, options, *inputs):
+        return None
+
+
+class BibleVersePost(PostType):
+    """Today's verse (shared by every region), translated for Chinese posts"""
+
+    def main(self, options, verse):
+        if options['language'] == 'zh':
+            return _bible().format_chinese_tweet(*verse)
+        return _bible().format_tweet(*verse)
+
+    def replies(self, options, verse):
+        return _ai().generate_bible_thread(*verse, language=options['language'])
+
+    def translations(self, options, verse):
+        return list(verse) if options['language'] == 'zh' else []
+
+    def reply_request(self, options, verse):
+        return _ai().bible_request(*verse, language=options['language'])
+
+
+class CombinedMarketsPost(PostType):
+    """Market sentiment, traditional markets and crypto, with a chart"""
+
+    replies_from_main = True
+
+    def main(self, options, sentiment, markets, crypto):
+        return _markets().format_tweet(
+            markets, crypto, *sentiment, language=options['language'], title=options.get('title', 'Markets Update')
+        )
+
+    def replies(self, options, main):
+        return _ai().generate_financial_thread(main, options['context'], language=options['language'])
+
+    def chart(self, options, sentiment, markets, crypto):
+        return _markets().render_chart(options['chart'], markets, crypto)
+
+    def translations(self, options, sentiment, markets, crypto):
+        return [sentiment[1]] if options['language'] == 'zh' else []
+
+    def reply_request(self, options, main):
+        return _ai().thread_request('financial', main, options['context'], language=options['language'])
+
+
+class WorldNewsPost(PostType):
+    """An AI news story; the headline is translated for Chinese posts"""
+
+    def main(self, options, article):
+        if options['language'] == 'zh':
+            return _news().format_chinese_tweet(article)
+        return _news().format_us_tweet(article)
+
+    def replies(self, options, article):
+        # Generated from the English article (then translated), so Chinese
+        # replies don't wait for the headline translation
+        return _ai().generate_news_thread(
+            _news().format_us_tweet(article), options['context'], language=options['language']
+        )
+
+    def translations(self, options, article):
+        return [article['title'], article['source']] if options['language'] == 'zh' else []
+
+    def reply_request(self, options, article):
+        return _ai().thread_request('news', _news().format_us_tweet(article), options['context'], language=options['language'])
+
+
+# Content types post pipelines can name in 'content' (or 'formatter')
+POST_TYPES = {
+    'bible_verse': BibleVersePost(),
+    'combined_markets': CombinedMarketsPost(),
+    'world_news': WorldNewsPost(),
+}
+
+
+class PostPipeline:
+    """One (region, content type) post, compiled from its spec"""
+
+    STAGES = ('main', 'chart', 'replies', 'post')
+
+    def __init__(self, spec):
+        self.region = spec['region']
+        self.content = spec['content']
+        self.job_id = f"{self.region}_{self.content}"
+
+        # Region defaults, then the spec's own settings
+        self.options = {**config.REGIONS[self.region], **spec}
+        self.sources = list(spec['sources'])
+        self.post_type = POST_TYPES[spec.get('formatter', self.content)]
+
+        unknown = [source for source in self.sources if source not in SOURCES or source in self.STAGES]
+        if unknown:
+            raise ValueError(f"Post '{self.job_id}' uses unknown sources: {unknown}")
+        unknown = [account for account in self.options['accounts'] if account not in config.TWITTER_ACCOUNTS]
+        if unknown:
+            raise ValueError(f"Post '{self.job_id}' goes to unknown X accounts: {unknown}")
+
+        schedule = {**config.SCHEDULE_CONFIG[self.content], **{key: spec[key] for key in ('hour', 'minute') if key in spec}}
+        self.hour = schedule['hour']
+        self.minute = schedule['minute']
+        self.trigger = CronTrigger(hour=self.hour, minute=self.minute, timezone=self.options['timezone'])
+
+    @property
+    def title(self):
+        return self.content.replace('_', ' ').title()
+
+    @property
+    def name(self):
+        """Job name, e.g. 'Texas - Bible Verse (7:00 AM)'"""
+        return f"{self.region.title()} - {self.title} ({self.hour % 12 or 12}:{self.minute:02d} {'AM' if self.hour < 12 else 'PM'})"
+
+    @property
+    def tweets_per_post(self):
+        """Tweets per run on each account"""
+        return 1 + self.options['replies']
+
+    def build(self, sources):
+        """
+        Build this post's stage graph on the shared source stages
+
+        Args:
+            sources: {source name: SharedSource}
+
+        Returns:
+            Pipeline whose 'post' result is True once the thread is posted
+        """
+        options = self.options
+        post_type = self.post_type
+        names = self.sources
+
+        pipeline = Pipeline(self.job_id)
+        for name in names:
+            pipeline.add(name, sources[name])
+
+        pipeline.add('main', lambda **data: post_type.main(options, *[data[name] for name in names]), deps=names)
+
+        if options.get('chart'):
+            pipeline.add('chart', lambda **data: post_type.chart(options, *[data[name] for name in names]), deps=names)
+
+        if post_type.replies_from_main:
+            pipeline.add('replies', lambda main: post_type.replies(options, main)[:options['replies']], deps=['main'])
+        else:
+            pipeline.add('replies', lambda **data: post_type.replies(options, *[data[name] for name in names])[:options['replies']], deps=names)
+
+        post_deps = ['main', 'replies'] + (['chart'] if 'chart' in pipeline.stages else [])
+        pipeline.add('post', self.post_thread, deps=post_deps)
+        return pipeline
+
+    def build_from_plan(self, plan):
+        """
+        A pipeline posting a daily plan as it was saved
+
+        Returns:
+            Pipeline whose 'post' result is True once the thread is posted
+        """
+        pipeline = Pipeline(self.job_id)
+        pipeline.add('post', lambda: self.post_thread(plan['main'], plan['replies'], plan.get('chart')))
+        return pipeline
+
+    def post_thread(self, main, replies, chart=None):
+        """Post the thread (generated once) to every subscribed account"""
+        return _x().post_thread(
+            [main] + replies, language=self.options['language'], image_path=chart, accounts=self.options['accounts']
+        )
+
+    def stale_sources(self, plan, now=None):
+        """Sources of a daily plan too old to post (a missing chart counts as stale data)"""
+        age_minutes = ((now or time.time()) - plan['fetched_at']) / 60
+        stale = [name for name in self.sources if SOURCES[name][2] is not None and age_minutes > SOURCES[name][2]]
+        if plan.get('chart') and not os.path.exists(plan['chart']):
+            stale = stale or list(self.sources)
+        return stale
+
+
+class PostRegistry:
+    """Every scheduled post, compiled once from config.POST_PIPELINES
+
+    Posts naming the same source share one SharedSource, so e.g. the daily
+    verse and the Fear & Greed index are fetched once a day for both regions
+    (the two crypto sources share the morning's CoinGecko snapshot). Adding a
+    region or content type is a config change.
+    """
+
+    def __init__(self, specs):
+        self.posts = {}
+        self.sources = {}
+
+        for spec in specs:
+            post = PostPipeline(spec)
+            if post.job_id in self.posts:
+                raise ValueError(f"Duplicate post pipeline: {post.job_id}")
+            self.posts[post.job_id] = post
+
+            for name in post.sources:
+                if name not in self.sources:
+                    func, max_age_minutes, _ = SOURCES[name]
+                    self.sources[name] = SharedSource(name, func, max_age_minutes)
+
+        logger.info("Compiled %s post pipelines on %s shared sources", len(self.posts), len(self.sources))
+
+    def run(self, job_id, run_date=None):
+        """
+        Build and run a post's pipeline
+
+        With DAILY_PLAN, a plan saved for the run date is posted as it is; if
+        its market data has gone stale, that data is fetched again and the
+        post rebuilt on it and the plan's other sources.
+
+        Returns:
+            True if the thread was posted
+        """
+        post = self.posts[job_id]
+        label = post.region.upper()
+        logger.info("[%s] Posting %s...", label, post.title)
+        try:
+            plan = plan_store.load(job_id, run_date) if config.DAILY_PLAN and run_date else None
+            pipeline = None
+            sources = self.sources
+            if plan:
+                stale = post.stale_sources(plan)
+                if not stale:
+                    logger.info("[%s] Posting the daily plan", label)
+                    pipeline = post.build_from_plan(plan)
+                else:
+                    logger.info("[%s] Daily plan data is stale (%s), refreshing it", label, ', '.join(stale))
+                    sources = {**self.sources, **{
+                        name: (lambda value=plan['sources'][name]: value) for name in post.sources if name not in stale
+                    }}
+
+            pipeline = pipeline or post.build(sources)
+            if not pipeline.run()['post']:
+                raise RuntimeError("thread was not posted")
+
+            logger.info("[%s] %s posted successfully", label, post.title)
+            return True
+        except Exception as e:
+            logger.error("[%s] Error posting %s: %s", label, post.title, e)
+            return False
+
+    def resume(self, job_id, checkpoint):
+        """
+        Finish a thread stopped halfway from its run ledger checkpoint
+
+        Returns:
+            True if the rest of the thread was posted
+        """
+        return _x().post_thread(
+            checkpoint['tweets'],
+            language=checkpoint['language'],
+            image_path=checkpoint.get('image_path'),
+            accounts=checkpoint.get('accounts') or {'default': checkpoint['tweet_ids']}
+        )
+
+# Global post registry instance
+post_registry = PostRegistry(config.POST_PIPELINES)
@@ -56,16 +56,7 @@ try:
     english_main = bible_module.format_tweet(verse_text, reference)
     
     # Translate the SAME verse to Chinese (don't generate a new one)
-    from utils.translator import translator
-    chinese_verse = translator.translate(verse_text)
-    chinese_reference = translator.translate(reference)
-    chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
-    
-    # Ensure Chinese tweet fits limit
-    if len(chinese_main) > 280:
-        max_length = 280 - len(f'"\n\n{chinese_reference} (KJV)')
-        chinese_verse = chinese_verse[:max_length-3] + "..."
-        chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
+    chinese_main = bible_module.format_chinese_tweet(verse_text, reference)
     
     print(f"Verse: {reference}")
     print(f"Text: {verse_text[:100]}...")
@@ -1,219 +1,239 @@
-from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
-from datetime import datetime
+import time
+import signal
+import asyncio
+import resource
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from datetime import datetime, timedelta
+from functools import partial
 import config
-from utils.logger import setup_logger
-from utils.twitter_client import twitter_client
-from utils.ai_thread_generator import ai_thread_generator
-from modules.bible_verse import bible_module
-from modules.combined_markets import combined_markets_module
-from modules.world_news import news_module
+from utils.logger import setup_logger, flush_logs
+from utils.job_runtime import job_runtime
+from utils.job_process import run_in_subprocess
+from utils.process_pool import stage_pool
+from utils.run_ledger import run_ledger
+from utils.metrics import metrics
+from utils.profiling import profile_mode, profiled
+from post_registry import post_registry
+from daily_plan import daily_planner
 
 logger = setup_logger(__name__)
 
+async def run_post_job(job_id, run_date=None):
+    """Job store entry point for post jobs (module level so it can be stored by reference)"""
+    return await bot_scheduler.run_job(job_id, run_date)
+
 class BotScheduler:
-    """Manage all scheduled posts for the bot (3 content types, 2 timezones)"""
+    """Manage all scheduled posts for the bot (the post pipelines in post_registry.py)"""
     
     def __init__(self):
-        self.scheduler = BlockingScheduler(timezone=str(config.TEXAS_TZ))
+        # Jobs are coroutines on one event loop; the blocking work runs in
+        # per-region worker pools (utils/job_runtime.py) with a deadline.
+        # Jobs persist in SQLite next to the run ledger (utils/run_ledger.py).
+        self.scheduler = AsyncIOScheduler(
+            timezone=str(config.TEXAS_TZ),
+            jobstores={'default': SQLAlchemyJobStore(url=f"sqlite:///{config.SCHEDULER_DB_PATH}")},
+            job_defaults={
+                'coalesce': True,  # Run a backlog of missed runs once
+                'max_instances': 1,  # Never overlap runs of the same post
+                'misfire_grace_time': config.JOB_MISFIRE_GRACE_SECONDS
+            }
+        )
+        self.post_jobs = {}  # job_id -> (post function, region, trigger)
+        self.job_names = {}  # job_id -> display name
+        self._active = set()  # (job_id, run_date) running in this process
+        self._tasks = set()  # run_job tasks in flight
+        self._stopping = None  # asyncio.Event set on SIGINT/SIGTERM
         self.setup_schedules()
     
     # ========================================================================
-    # TEXAS TIME ZONE (ENGLISH POSTS - 3-tweet threads)
+    # SCHEDULER SETUP
     # ========================================================================
     
-    def post_bible_verse_texas(self):
-        """Post Bible verse - Texas time (English 3-tweet thread)"""
-        logger.info("[TEXAS] Posting Bible verse...")
-        try:
-            # Generate verse
-            verse_text, reference = bible_module.get_verse()
-            english_main = bible_module.format_tweet(verse_text, reference)
-            
-            # Generate AI thread (2 replies)
-            english_replies = ai_thread_generator.generate_bible_thread(verse_text, reference)
-            english_replies = english_replies[:2]  # Only 2 replies for 3-tweet thread
-            
-            # Post English thread (main + 2 replies)
-            english_thread = [english_main] + english_replies
-            twitter_client.post_thread(english_thread, language='en')
-            
-            logger.info("[TEXAS] Bible verse posted successfully")
-        except Exception as e:
-            logger.error(f"[TEXAS] Error posting Bible verse: {e}")
+    def _add_post_job(self, func, trigger, job_id, name, region):
+        """Register a post job to run through the job runtime in its region's worker pool"""
+        self.post_jobs[job_id] = (func, region, trigger)
+        self.job_names[job_id] = name
     
-    def post_combined_markets_texas(self):
-        """Post combined markets - Texas time (English 3-tweet thread)"""
-        logger.info("[TEXAS] Posting combined markets...")
-        try:
-            # Generate combined markets post
-            english, _ = combined_markets_module.generate_post()
-            
-            # Generate AI thread (2 replies)
-            market_context = "Analyze these market movements and provide insights"
-            english_replies = ai_thread_generator.generate_financial_thread(english, market_context)
-            english_replies = english_replies[:2]  # Only 2 replies for 3-tweet thread
-            
-            # Post English thread (main + 2 replies)
-            english_thread = [english] + english_replies
-            twitter_client.post_thread(english_thread, language='en')
-            
-            logger.info("[TEXAS] Combined markets posted successfully")
-        except Exception as e:
-            logger.error(f"[TEXAS] Error posting combined markets: {e}")
-    
-    def post_world_news_texas(self):
-        """Post world news - Texas time (English 3-tweet thread)"""
-        logger.info("[TEXAS] Posting world news...")
-        try:
-            # Generate news post
-            english, _ = news_module.generate_post()
-            
-            # Generate AI thread (2 replies)
-            news_context = "Provide deeper insights and context about this news story"
-            english_replies = ai_thread_generator.generate_news_thread(english, news_context)
-            english_replies = english_replies[:2]  # Only 2 replies for 3-tweet thread
-            
-            # Post English thread (main + 2 replies)
-            english_thread = [english] + english_replies
-            twitter_client.post_thread(english_thread, language='en')
-            
-            logger.info("[TEXAS] World news posted successfully")
-        except Exception as e:
-            logger.error(f"[TEXAS] Error posting world news: {e}")
-    
-    # ========================================================================
-    # BEIJING TIME ZONE (CHINESE POSTS - 2-tweet threads)
-    # ========================================================================
-    
-    def post_bible_verse_beijing(self):
-        """Post Bible verse - Beijing time (Chinese 2-tweet thread)"""
-        logger.info("[BEIJING] Posting Bible verse...")
-        try:
-            # Generate verse (use the same verse for Chinese)
-            verse_text, reference = bible_module.get_verse()
-            english_main = bible_module.format_tweet(verse_text, reference)
-            
-            # Translate to Chinese
-            from utils.translator import translator
-            chinese_verse = translator.translate(verse_text)
-            chinese_reference = translator.translate(reference)
-            chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
-            
-            # Ensure Chinese tweet fits limit
-            if len(chinese_main) > 280:
-                max_length = 280 - len(f'"\n\n{chinese_reference} (KJV)')
-                chinese_verse = chinese_verse[:max_length-3] + "..."
-                chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
-            
-            # Generate AI thread (1 reply for Chinese)
-            chinese_replies = ai_thread_generator.generate_bible_thread(verse_text, reference, language='zh')
-            chinese_replies = chinese_replies[:1]  # Only 1 reply for 2-tweet thread
-            
-            # Post Chinese thread (main + 1 reply)
-            chinese_thread = [chinese_main] + chinese_replies
-            twitter_client.post_thread(chinese_thread, language='zh')
-            
-            logger.info("[BEIJING] Bible verse posted successfully")
-        except Exception as e:
-            logger.error(f"[BEIJING] Error posting Bible verse: {e}")
+    def _sync_jobs(self):
+        """
+        Put every post job in the job store, keeping the ones already there
+        
+        A job stored with the same trigger keeps its persisted next_run_time,
+        so a run missed while the bot was down is still due when the
+        scheduler resumes and APScheduler's misfire handling runs it (once,
+        within JOB_MISFIRE_GRACE_SECONDS). New jobs and jobs whose time
+        changed are (re)added from now.
+        """
+        for job_id, (func, region, trigger) in self.post_jobs.items():
+            stored = self.scheduler.get_job(job_id)
+            if stored is not None and repr(stored.trigger) == repr(trigger):
+                continue
+            self.scheduler.add_job(
+                run_post_job,
+                trigger,
+                args=[job_id],
+                id=job_id,
+                name=self.job_names[job_id],
+                replace_existing=True
+            )
     
-    def post_combined_markets_beijing(self):
-        """Post combined markets - Beijing time (Chinese 2-tweet thread)"""
-        logger.info("[BEIJING] Posting combined markets...")
+    async def run_job(self, job_id, run_date=None):
+        """
+        Run a post job at most once per day
+        
+        Args:
+            job_id: Post job id
+            run_date: Day (YYYY-MM-DD, in the job's timezone) the run is for; default today
+        
+        Returns:
+            True if the thread was posted, False if it failed, None if skipped
+        """
+        func, region, trigger = self.post_jobs[job_id]
+        post = post_registry.posts.get(job_id)  # None for the daily plan
+        # Opt-in: PROFILE_JOBS or the post's 'profile' flag (utils/profiling.py)
+        mode = profile_mode(job_id, post.options.get('profile') if post else None)
+        run_date = run_date or datetime.now(trigger.timezone).date().isoformat()
+        key = (job_id, run_date)
+        
+        if run_ledger.is_completed(job_id, run_date) or key in self._active:
+            logger.info("[%s] Already posted (or posting) for %s, skipping", job_id, run_date)
+            return None
+        if self.stopping:
+            logger.info("[%s] Shutting down, not starting", job_id)
+            return None
+        
+        # A thread stopped halfway (shutdown or deadline) is finished, not reposted
+        checkpoint = run_ledger.checkpoint(job_id, run_date)
+        if checkpoint:
+            logger.info("[%s] Resuming thread for %s from checkpoint", job_id, run_date)
+            func = partial(post_registry.resume, job_id, checkpoint)
+        elif post:
+            # The daily plan (if any) is looked up by run date
+            func = partial(func, run_date=run_date)
+        
+        if config.LOW_MEMORY:
+            # The job's imports live and die with its own process (utils/job_process.py)
+            if checkpoint:
+                func = partial(run_in_subprocess, 'post_registry:post_registry.resume', job_id, checkpoint, profile=mode)
+            elif post:
+                func = partial(run_in_subprocess, 'post_registry:post_registry.run', job_id, run_date, profile=mode)
+            else:
+                func = partial(run_in_subprocess, 'daily_plan:daily_planner.run', profile=mode)
+        elif mode:
+            func = profiled(job_id, func, mode)
+        
+        self._active.add(key)
+        self._tasks.add(asyncio.current_task())
+        run_ledger.start(job_id, run_date)
+        start = time.perf_counter()
+        status = self._stopped_status()
         try:
-            # Generate combined markets post (get Chinese version)
-            _, chinese = combined_markets_module.generate_post()
-            
-            # Generate AI thread (1 reply for Chinese)
-            market_context = "Analyze these market movements"
-            chinese_replies = ai_thread_generator.generate_financial_thread(chinese, market_context, language='zh')
-            chinese_replies = chinese_replies[:1]  # Only 1 reply for 2-tweet thread
-            
-            # Post Chinese thread (main + 1 reply)
-            chinese_thread = [chinese] + chinese_replies
-            twitter_client.post_thread(chinese_thread, language='zh')
-            
-            logger.info("[BEIJING] Combined markets posted successfully")
-        except Exception as e:
-            logger.error(f"[BEIJING] Error posting combined markets: {e}")
+            posted = await job_runtime.run(
+                job_id, func, region,
+                on_checkpoint=lambda state: run_ledger.save_checkpoint(job_id, run_date, state)
+            )
+            status = 'completed' if posted else self._stopped_status()
+            run_ledger.finish(job_id, run_date, status)
+            return bool(posted)
+        except asyncio.CancelledError:
+            status = self._stopped_status()
+            run_ledger.finish(job_id, run_date, status, error='cancelled')
+            raise
+        finally:
+            self._active.discard(key)
+            self._tasks.discard(asyncio.current_task())
+            metrics.observe('job_duration_seconds', time.perf_counter() - start, job=job_id, region=region)
+            metrics.inc('job_runs_total', job=job_id, region=region, status=status)
+            # ru_maxrss is in KB on Linux
+            metrics.set('process_peak_rss_bytes', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+            pool_peak = stage_pool.peak_rss_bytes()
+            if pool_peak:
+                metrics.set('stage_pool_peak_rss_bytes', pool_peak)
+            metrics.flush()
     
-    def post_world_news_beijing(self):
-        """Post world news - Beijing time (Chinese 2-tweet thread)"""
-        logger.info("[BEIJING] Posting world news...")
-        try:
-            # Generate news post (get Chinese version)
-            _, chinese = news_module.generate_post()
-            
-            # Generate AI thread (1 reply for Chinese)
-            news_context = "Provide context about this news story"
-            chinese_replies = ai_thread_generator.generate_news_thread(chinese, news_context, language='zh')
-            chinese_replies = chinese_replies[:1]  # Only 1 reply for 2-tweet thread
-            
-            # Post Chinese thread (main + 1 reply)
-            chinese_thread = [chinese] + chinese_replies
-            twitter_client.post_thread(chinese_thread, language='zh')
-            
-            logger.info("[BEIJING] World news posted successfully")
-        except Exception as e:
-            logger.error(f"[BEIJING] Error posting world news: {e}")
+    @property
+    def stopping(self):
+        return self._stopping is not None and self._stopping.is_set()
     
-    # ========================================================================
-    # SCHEDULER SETUP
-    # ========================================================================
+    def _stopped_status(self):
+        return 'interrupted' if self.stopping else 'failed'
     
-    def setup_schedules(self):
-        """Set up all scheduled jobs"""
+    def catch_up(self, now=None):
+        """
+        Queue posts whose last scheduled time was missed (e.g. during a restart)
         
-        logger.info("Setting up Texas timezone schedules (English 3-tweet threads)...")
+        Only slots within CATCHUP_GRACE_MINUTES are caught up, and never one the
+        ledger shows as completed. Threads left half-posted in the last day are
+        always resumed.
         
-        # Texas Time Zone - 7:00 AM, 8:00 AM, 9:00 AM
-        self.scheduler.add_job(
-            self.post_bible_verse_texas,
-            CronTrigger(hour=7, minute=0, timezone=config.TEXAS_TZ),
-            id='texas_bible_verse',
-            name='Texas - Bible Verse (7:00 AM)'
-        )
-        
-        self.scheduler.add_job(
-            self.post_combined_markets_texas,
-            CronTrigger(hour=8, minute=0, timezone=config.TEXAS_TZ),
-            id='texas_combined_markets',
-            name='Texas - Combined Markets (8:00 AM)'
-        )
+        Returns:
+            List of job ids queued
+        """
+        queued = []
+        for job_id, run_date in run_ledger.unfinished(since=time.time() - 86400):
+            if job_id not in self.post_jobs:
+                continue
+            logger.warning("[%s] Thread for %s was left unfinished, resuming now", job_id, run_date)
+            self._queue_catch_up(job_id, run_date)
+            queued.append(job_id)
         
-        self.scheduler.add_job(
-            self.post_world_news_texas,
-            CronTrigger(hour=9, minute=0, timezone=config.TEXAS_TZ),
-            id='texas_world_news',
-            name='Texas - World News (9:00 AM)'
-        )
-        
-        logger.info("Setting up Beijing timezone schedules (Chinese 2-tweet threads)...")
-        
-        # Beijing Time Zone - 7:00 AM, 8:00 AM, 9:00 AM
-        self.scheduler.add_job(
-            self.post_bible_verse_beijing,
-            CronTrigger(hour=7, minute=0, timezone=config.BEIJING_TZ),
-            id='beijing_bible_verse',
-            name='Beijing - Bible Verse (7:00 AM)'
-        )
+        for job_id, (func, region, trigger) in self.post_jobs.items():
+            if job_id in queued:
+                continue
+            current = (now or datetime.now(trigger.timezone)).astimezone(trigger.timezone)
+            slot = trigger.get_next_fire_time(None, current - timedelta(minutes=config.CATCHUP_GRACE_MINUTES))
+            if slot is None or slot >= current:
+                continue
+            
+            run_date = slot.date().isoformat()
+            if run_ledger.is_completed(job_id, run_date):
+                continue
+            
+            logger.warning("[%s] Missed the %s post, catching up now", job_id, slot.strftime('%Y-%m-%d %H:%M %Z'))
+            self._queue_catch_up(job_id, run_date)
+            queued.append(job_id)
         
+        return queued
+    
+    def _remove_stale_jobs(self):
+        """Drop stored jobs whose post pipeline was removed from the config"""
+        for job in self.scheduler.get_jobs():
+            if job.args and job.args[0] not in self.post_jobs:
+                logger.warning("Removing job '%s': no such post pipeline", job.id)
+                job.remove()
+    
+    def _queue_catch_up(self, job_id, run_date):
         self.scheduler.add_job(
-            self.post_combined_markets_beijing,
-            CronTrigger(hour=8, minute=0, timezone=config.BEIJING_TZ),
-            id='beijing_combined_markets',
-            name='Beijing - Combined Markets (8:00 AM)'
+            run_post_job,
+            args=[job_id, run_date],
+            id=f"{job_id}_catchup",
+            name=f"Catch-up: {job_id} ({run_date})",
+            replace_existing=True
         )
+    
+    def setup_schedules(self):
+        """Schedule every post pipeline compiled from config.POST_PIPELINES (and the daily plan)"""
+        for job_id, post in post_registry.posts.items():
+            self._add_post_job(
+                partial(post_registry.run, job_id),
+                post.trigger,
+                job_id=job_id,
+                name=post.name,
+                region=post.region
+            )
         
-        self.scheduler.add_job(
-            self.post_world_news_beijing,
-            CronTrigger(hour=9, minute=0, timezone=config.BEIJING_TZ),
-            id='beijing_world_news',
-            name='Beijing - World News (9:00 AM)'
-        )
+        if config.DAILY_PLAN:
+            # Prepares the posts above ahead of time (daily_plan.py)
+            self._add_post_job(
+                daily_planner.run,
+                daily_planner.trigger,
+                job_id=daily_planner.job_id,
+                name=daily_planner.name,
+                region='texas'
+            )
         
-        logger.info(f"Scheduled {len(self.scheduler.get_jobs())} jobs")
+        logger.info("Scheduled %s jobs", len(self.post_jobs))
     
     def print_schedule(self):
         """Print all scheduled jobs"""
@@ -221,19 +241,28 @@ class BotScheduler:
         logger.info("SCHEDULED JOBS")
         logger.info("=" * 70)
         
-        jobs = self.scheduler.get_jobs()
-        for job in jobs:
-            logger.info(f"  • {job.name}")
-            logger.info(f"    ID: {job.id}")
+        for job_id, name in self.job_names.items():
+            logger.info("  • %s", name)
+            logger.info("    ID: %s", job_id)
             logger.info("")
         
+        tweets_per_region = {}
+        tweets_per_account = {}
+        for post in post_registry.posts.values():
+            tweets_per_region[post.region] = tweets_per_region.get(post.region, 0) + post.tweets_per_post
+            for account in post.options['accounts']:
+                tweets_per_account[account] = tweets_per_account.get(account, 0) + post.tweets_per_post
+        
         logger.info("=" * 70)
         logger.info("DAILY TWEET COUNT:")
-        logger.info("  Texas (English 3-tweet threads): 9 tweets/day")
-        logger.info("  Beijing (Chinese 2-tweet threads): 6 tweets/day")
-        logger.info("  TOTAL: 15 tweets/day = 450 tweets/month")
-        logger.info("  FREE TIER LIMIT: 500 tweets/month")
-        logger.info("  STATUS: Within limits! ✓")
+        for region, count in tweets_per_region.items():
+            logger.info("  %s (%s threads): %s tweets/day", region.title(), config.REGIONS[region]['language'], count)
+        logger.info("  FREE TIER LIMIT: %s tweets/month per account", config.MAX_TWEETS_PER_MONTH)
+        for account, total in tweets_per_account.items():
+            if total * 30 <= config.MAX_TWEETS_PER_MONTH:
+                logger.info("  %s: %s tweets/day = %s tweets/month - within limits! ✓", account, total, total * 30)
+            else:
+                logger.warning("  %s: %s tweets/day = %s tweets/month - over the limit!", account, total, total * 30)
         logger.info("=" * 70)
     
     def start(self):
@@ -241,13 +270,83 @@ class BotScheduler:
         logger.info("Starting bot scheduler...")
         self.print_schedule()
         
+        # Load the LLM and translation models now rather than in the first job
+        # (in LOW_MEMORY mode each job process loads its own)
+        if not config.LOW_MEMORY:
+            from utils.ai_thread_generator import ai_thread_generator
+            from utils.translator import translator
+            ai_thread_generator.warm_up()
+            translator.warm_up()
+        stage_pool.warm_up()
+        metrics.serve()
+        
         try:
-            self.scheduler.start()
+            asyncio.run(self._serve())
         except (KeyboardInterrupt, SystemExit):
             logger.info("Scheduler stopped by user")
         except Exception as e:
-            logger.error(f"Scheduler error: {e}")
+            logger.error("Scheduler error: %s", e)
             raise
+        finally:
+            job_runtime.cancel_all()
+            job_runtime.shutdown()
+            stage_pool.shutdown()
+            metrics.flush()
+            flush_logs()
+    
+    def request_shutdown(self, reason='shutdown'):
+        """Begin a graceful shutdown (signal handler)"""
+        if self._stopping is None or self._stopping.is_set():
+            return
+        logger.warning("Received %s, shutting down", reason)
+        self._stopping.set()
+    
+    async def _serve(self):
+        """Run the scheduler on the event loop until SIGINT/SIGTERM"""
+        loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown, sig.name)
+            except (NotImplementedError, RuntimeError):
+                pass  # No loop signal handlers here (e.g. Windows); KeyboardInterrupt still stops the bot
+        
+        # Paused until the stored jobs are reconciled with the config
+        self.scheduler.start(paused=True)
+        self._sync_jobs()
+        self._remove_stale_jobs()
+        self.catch_up()
+        self.scheduler.resume()
+        try:
+            await self._stopping.wait()
+        finally:
+            await self._drain()
+    
+    async def _drain(self):
+        """
+        Stop within SHUTDOWN_TIMEOUT_SECONDS (under fly.toml's kill_timeout)
+        
+        No new jobs start; running jobs are cancelled, which cuts post_thread's
+        pause short and stops it between tweets. Every posted tweet is already
+        checkpointed in the run ledger, so the next process resumes the thread.
+        """
+        deadline = time.monotonic() + config.SHUTDOWN_TIMEOUT_SECONDS
+        self.scheduler.shutdown(wait=False)
+        job_runtime.cancel_all()
+        
+        tasks = set(self._tasks)
+        if tasks:
+            logger.info("Waiting up to %ss for %s running job(s) to stop", config.SHUTDOWN_TIMEOUT_SECONDS, len(tasks))
+            done, pending = await asyncio.wait(tasks, timeout=max(0.0, deadline - time.monotonic() - 0.5))
+            for task in pending:
+                task.cancel()
+            if pending:
+                # Record the interrupted runs before the loop closes
+                await asyncio.wait(pending, timeout=0.5)
+                logger.warning("%s job(s) still blocked at shutdown, marked interrupted", len(pending))
+        
+        metrics.flush()
+        flush_logs()
 
 # Global scheduler instance
 bot_scheduler = BotScheduler()
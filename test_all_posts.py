@@ -114,15 +114,7 @@ def test_all_posts(auto_confirm=False):
         verse_text, reference = bible_module.get_verse()
         
         # Translate to Chinese
-        from utils.translator import translator
-        chinese_verse = translator.translate(verse_text)
-        chinese_reference = translator.translate(reference)
-        chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
-        
-        if len(chinese_main) > 280:
-            max_length = 280 - len(f'"\n\n{chinese_reference} (KJV)')
-            chinese_verse = chinese_verse[:max_length-3] + "..."
-            chinese_main = f'"{chinese_verse}"\n\n{chinese_reference} (KJV)'
+        chinese_main = bible_module.format_chinese_tweet(verse_text, reference)
         
         chinese_replies = ai_thread_generator.generate_bible_thread(verse_text, reference, language='zh')
         chinese_replies = chinese_replies[:1]
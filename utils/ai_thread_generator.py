@@ -1,43 +1,251 @@
-import os
-from groq import Groq
+import json
+import hashlib
 from utils.logger import setup_logger
+from utils.cache import cache
+from utils.llm_backend import create_backend
+from utils.request_queue import RequestQueue
+from utils.metrics import metrics
+from utils.tweet_length import weighted_length, fits, char_budget
+import config
 
 logger = setup_logger(__name__)
 
+# Data context of each kind of follow-up thread, formatted with the post's data
+THREAD_CONTEXTS = {
+    'financial': "Market data: {}\n\nProvide insights about market trends, what's driving the changes, and what investors should watch.",
+    'crypto': "Crypto data: {}\n\nProvide insights about crypto market movements, trends, and important factors.",
+    'news': "News items: {}\n\nProvide deeper insights or explanations about these news items and their significance.",
+}
+
 class AIThreadGenerator:
-    """Generate engaging X/Twitter threads using Groq AI"""
+    """Generate engaging X/Twitter threads using the configured LLM backend (Groq, local model or templates)"""
     
     def __init__(self):
-        self.api_key = os.getenv('GROQ_API_KEY', '')
+        try:
+            self.backend = create_backend()
+        except Exception as e:
+            logger.error("Failed to create LLM backend '%s': %s (using templates)", config.LLM_BACKEND, e)
+            self.backend = create_backend('template')
         
-        if self.api_key:
-            self.client = Groq(api_key=self.api_key)
+        if self.backend:
+            self.model = self.backend.model
+            self.queue = RequestQueue(
+                'llm',
+                workers=self.backend.concurrency,
+                maxsize=config.LLM_QUEUE_SIZE,
+                timeout=config.LLM_REQUEST_TIMEOUT
+            )
             self.enabled = True
-            logger.info("AI Thread Generator initialized with Groq API")
+            logger.info("AI Thread Generator initialized with %s backend (%s)", self.backend.name, self.model)
         else:
-            self.client = None
+            self.model = None
+            self.queue = None
             self.enabled = False
-            logger.warning("No GROQ_API_KEY found - AI threads disabled")
+            logger.warning("LLM_BACKEND is 'none' - AI threads disabled")
+    
+    def warm_up(self):
+        """Start loading the backend's model in the background (queued ahead of any request)"""
+        if self.enabled:
+            self.queue.submit(self.backend.warm_up)
     
-    def generate_thread(self, main_tweet, data_context, max_tweets=2):
+    def _cache_key(self, model, messages, params):
+        """Content hash of everything that determines a completion"""
+        payload = json.dumps(
+            {'model': model, 'messages': messages, 'params': params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return "llm_" + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _parse_tweet_line(self, line):
+        """Return the tweet from a numbered line ("1. ..."), else None
+        
+        Length is not checked here; overlong tweets are regenerated by _fit_tweets.
         """
-        Generate a thread from a main tweet
+        line = line.strip()
+        # Remove numbering like "1.", "2.", etc.
+        if line and any(line.startswith(f"{i}.") for i in range(1, 10)):
+            tweet = line.split('.', 1)[1].strip()
+            if tweet:
+                return tweet
+        return None
+    
+    def _parse_tweets(self, content):
+        """Extract all numbered tweets from a completion"""
+        return [tweet for tweet in map(self._parse_tweet_line, content.split('\n')) if tweet]
+    
+    def _stream_tweets(self, messages, max_tweets, **params):
+        """Stream a completion, taking each numbered tweet as soon as its line ends
         
-        Args:
-            main_tweet: The main tweet content
-            data_context: Additional data/context about the topic
-            max_tweets: Maximum number of follow-up tweets (default: 2)
+        The stream is closed (ending generation) once max_tweets tweets are in.
+        """
+        stream = self.backend.stream(messages, **params)
+        
+        tweets = []
+        buffer = ''
+        try:
+            for piece in stream:
+                buffer += piece
+                
+                # Everything before the last newline is a complete line
+                *lines, buffer = buffer.split('\n')
+                for line in lines:
+                    tweet = self._parse_tweet_line(line)
+                    if tweet:
+                        tweets.append(tweet)
+                        if len(tweets) >= max_tweets:
+                            logger.info("Got %s tweets, stopping LLM stream early", max_tweets)
+                            return tweets
+            
+            # The final line has no trailing newline
+            tweet = self._parse_tweet_line(buffer)
+            if tweet:
+                tweets.append(tweet)
+            return tweets[:max_tweets]
+        
+        finally:
+            stream.close()
+    
+    def _complete(self, messages, **params):
+        """Run a single completion, serving repeats of the same request from the response cache
         
         Returns:
-            List of follow-up tweets (main tweet not included) or empty list if disabled
+            The stripped completion text
         """
-        if not self.enabled:
-            logger.debug("AI threads disabled, returning empty list")
-            return []
+        key = self._cache_key(self.model, messages, params)
+        
+        if config.LLM_CACHE_TTL_MINUTES > 0:
+            cached = cache.get(key, max_age_minutes=config.LLM_CACHE_TTL_MINUTES)
+            if cached is not None:
+                return cached
+        
+        with metrics.track(self.backend.name, 'complete'):
+            content = self.queue.call(self.backend.complete, messages, **params)
+        
+        if config.LLM_CACHE_TTL_MINUTES > 0:
+            cache.set(key, content)
+        
+        return content
+    
+    def _shorten_tweet(self, tweet, budget):
+        """Ask the model to rewrite a single tweet in at most `budget` characters
         
+        Returns:
+            The rewritten tweet (the original tweet if the call fails)
+        """
         try:
-            # Create prompt for Groq
-            prompt = f"""You are a social media expert creating engaging Twitter/X threads.
+            return self._complete(
+                messages=[
+                    {"role": "system", "content": "You are a concise editor. Shorten tweets without changing their meaning. No emojis or hashtags."},
+                    {"role": "user", "content": f"Rewrite this tweet in at most {budget} characters. Return ONLY the rewritten tweet.\n\n{tweet}"}
+                ],
+                temperature=0.3,
+                max_tokens=200
+            ).strip('"')
+        except Exception as e:
+            logger.error("Error shortening tweet: %s", e)
+            return tweet
+    
+    def _fit_tweets(self, tweets):
+        """Validate tweets against X's weighted limit, regenerating only the ones that don't fit
+        
+        A tweet still over the limit after AI_REWRITE_ATTEMPTS rewrites is dropped.
+        """
+        fitted = []
+        for tweet in tweets:
+            budget = char_budget('en')
+            for attempt in range(config.AI_REWRITE_ATTEMPTS):
+                length = weighted_length(tweet)
+                if length <= config.TWEET_CHAR_LIMIT:
+                    break
+                logger.info("Tweet is %s chars, regenerating it (attempt %s)", length, attempt + 1)
+                # Ask for less each time by how far the last attempt overshot
+                budget = min(budget, budget * config.TWEET_CHAR_LIMIT // length)
+                tweet = self._shorten_tweet(tweet, budget)
+            
+            if fits(tweet):
+                fitted.append(tweet)
+            else:
+                logger.warning("Dropping tweet over %s chars after %s rewrites", config.TWEET_CHAR_LIMIT, config.AI_REWRITE_ATTEMPTS)
+        
+        return fitted
+    
+    def _translate_tweets(self, tweets):
+        """Translate tweets to Chinese within X's weighted limit
+        
+        CJK characters count double on X, so a translation that doesn't fit has
+        its English source regenerated shorter (by the translation's overshoot)
+        and translated again, instead of being truncated.
+        """
+        from utils.translator import translator
+        
+        translated_tweets = []
+        for tweet, translated in zip(tweets, translator.translate_batch(tweets)):
+            for attempt in range(config.AI_REWRITE_ATTEMPTS):
+                length = weighted_length(translated)
+                if length <= config.TWEET_CHAR_LIMIT:
+                    break
+                logger.info("Translated tweet is %s weighted chars, regenerating source (attempt %s)", length, attempt + 1)
+                budget = int(len(tweet) * config.TWEET_CHAR_LIMIT / length * 0.9)
+                tweet = self._shorten_tweet(tweet, budget)
+                translated = translator.translate(tweet)
+            
+            if fits(translated):
+                translated_tweets.append(translated)
+            else:
+                logger.warning("Dropping translated tweet over %s weighted chars", config.TWEET_CHAR_LIMIT)
+        
+        return translated_tweets
+    
+    def _generate_tweets(self, messages, max_tweets, **params):
+        """Get up to max_tweets numbered tweets for a prompt, each within X's limit
+        
+        Repeats of the same request are served from the response cache; otherwise
+        the completion is streamed (AI_STREAMING) or fetched in one response, and
+        any tweet over the limit is regenerated on its own.
+        
+        Returns:
+            List of tweets
+        """
+        key = self._cache_key(self.model, messages, params)
+        
+        if config.LLM_CACHE_TTL_MINUTES > 0:
+            cached = cache.get(key, max_age_minutes=config.LLM_CACHE_TTL_MINUTES)
+            if cached is not None:
+                logger.info("Using cached LLM response")
+                return self._parse_tweets(cached)[:max_tweets]
+        
+        with metrics.track(self.backend.name, 'stream' if config.AI_STREAMING else 'complete'):
+            if config.AI_STREAMING:
+                tweets = self.queue.call(self._stream_tweets, messages, max_tweets, **params)
+            else:
+                tweets = self._parse_tweets(self.queue.call(self.backend.complete, messages, **params))[:max_tweets]
+        
+        return self._store_tweets(key, self._fit_tweets(tweets))
+    
+    def _store_tweets(self, key, tweets):
+        """Cache validated tweets under a request's key (as a numbered completion)"""
+        if config.LLM_CACHE_TTL_MINUTES > 0 and tweets:
+            cache.set(key, "\n".join(f"{i}. {tweet}" for i, tweet in enumerate(tweets, 1)))
+        return tweets
+    
+    def _length_rule(self, language):
+        """The per-tweet length the prompt asks for
+        
+        Chinese threads are generated in English and translated, and CJK
+        characters count double on X, so their English source gets the
+        Chinese budget (char_budget('zh')): the translation then fits without
+        the regenerate-and-translate-again round trips in _translate_tweets.
+        """
+        budget = char_budget(language)
+        if language == 'zh':
+            return f"at most {budget} characters each; they will be translated to Chinese"
+        return f"at most {budget} characters each"
+    
+    def _thread_request(self, main_tweet, data_context, max_tweets, language='en'):
+        """Build the (messages, params) of a follow-up thread request"""
+        length_rule = self._length_rule(language)
+        prompt = f"""You are a social media expert creating engaging Twitter/X threads.
 
 MAIN TWEET:
 {main_tweet}
@@ -47,47 +255,147 @@ CONTEXT/DATA:
 
 Create {max_tweets} follow-up tweets that:
 1. Provide interesting insights or explanations
-2. Are concise and engaging (under 280 characters each)
+2. Are concise and engaging ({length_rule})
 3. Use clear, simple language
 4. Don't use emojis
 5. Add value to the main tweet
 
 Format: Return ONLY the follow-up tweets, one per line, numbered 1., 2., etc.
 Do NOT include the main tweet or any hashtags."""
+        
+        messages = [
+            {"role": "system", "content": "You are a concise social media expert. Create engaging, informative tweets without emojis."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {'temperature': 0.7, 'max_tokens': 500, 'top_p': 0.9}
+    
+    def _bible_request(self, verse_text, reference, language='en'):
+        """Build the (messages, params) of a Bible verse thread request"""
+        length_rule = self._length_rule(language)
+        prompt = f"""You are a Christian faith leader sharing Bible insights.
 
-            # Call Groq API
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",  # Latest Llama model
-                messages=[
-                    {"role": "system", "content": "You are a concise social media expert. Create engaging, informative tweets without emojis."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=500,
-                top_p=0.9
-            )
-            
-            # Parse response
-            content = response.choices[0].message.content.strip()
-            
-            # Extract tweets
-            follow_up_tweets = []
-            for line in content.split('\n'):
-                line = line.strip()
-                # Remove numbering like "1.", "2.", etc.
-                if line and any(line.startswith(f"{i}.") for i in range(1, 10)):
-                    tweet = line.split('.', 1)[1].strip()
-                    if tweet and len(tweet) <= 280:
-                        follow_up_tweets.append(tweet)
-            
-            # Limit to max_tweets
-            follow_up_tweets = follow_up_tweets[:max_tweets]
+BIBLE VERSE:
+"{verse_text}"
+- {reference}
+
+Create 2-3 follow-up tweets ({length_rule}) that provide:
+1. Historical context (who wrote it, why, when)
+2. Practical modern application
+3. An inspiring closing thought
+
+Be encouraging, accessible, and avoid clichés. No emojis.
+
+Format: Return ONLY the tweets, numbered 1., 2., 3."""
+        
+        messages = [
+            {"role": "system", "content": "You are a thoughtful Bible teacher providing clear, practical insights."},
+            {"role": "user", "content": prompt}
+        ]
+        return messages, {'temperature': 0.7, 'max_tokens': 600, 'top_p': 0.9}
+    
+    def generate_batch(self, requests):
+        """
+        Generate several English threads as one batch
+        
+        Uncached prompts go to the backend as a single queued job (sent
+        concurrently to Groq, back to back on a local model) and the results
+        are cached, so later generate_thread / generate_bible_thread calls for
+        the same prompts are served locally.
+        
+        Args:
+            requests: List of ('thread', main_tweet, data_context, max_tweets, language)
+                or ('bible', verse_text, reference, language) tuples (the
+                language sets the length asked for; results are in English)
+        
+        Returns:
+            List of follow-up tweet lists, in request order
+        """
+        if not self.enabled or not requests:
+            return [[] for _ in requests]
+        
+        built = []
+        for request in requests:
+            if request[0] == 'bible':
+                built.append((*self._bible_request(*request[1:]), 3))
+            else:
+                built.append((*self._thread_request(*request[1:]), request[3]))
+        
+        results = [None] * len(built)
+        pending = []
+        for index, (messages, params, max_tweets) in enumerate(built):
+            cached = None
+            if config.LLM_CACHE_TTL_MINUTES > 0:
+                cached = cache.get(self._cache_key(self.model, messages, params), max_age_minutes=config.LLM_CACHE_TTL_MINUTES)
+            if cached is not None:
+                results[index] = self._parse_tweets(cached)[:max_tweets]
+            else:
+                pending.append(index)
+        
+        try:
+            if pending:
+                with metrics.track(self.backend.name, 'complete_batch'):
+                    completions = self.queue.call(self.backend.complete_batch, [built[index][:2] for index in pending])
+                for index, content in zip(pending, completions):
+                    messages, params, max_tweets = built[index]
+                    tweets = self._fit_tweets(self._parse_tweets(content)[:max_tweets])
+                    results[index] = self._store_tweets(self._cache_key(self.model, messages, params), tweets)
+                logger.info("Generated batch of %s threads (%s cached)", len(pending), len(built) - len(pending))
+        except Exception as e:
+            logger.error("Error generating thread batch: %s", e)
+        
+        return [tweets or [] for tweets in results]
+    
+    def thread_request(self, kind, main_tweet, data, language='en'):
+        """
+        The generate_batch() request behind generate_<kind>_thread(main_tweet, data, language)
+        
+        For Chinese posts the English result is translated (batch_thread()).
+        """
+        return ('thread', main_tweet, THREAD_CONTEXTS[kind].format(data), 2, language)
+    
+    def bible_request(self, verse_text, reference, language='en'):
+        """The generate_batch() request behind generate_bible_thread(verse_text, reference, language)"""
+        return ('bible', verse_text, reference, language)
+    
+    def batch_thread(self, tweets, language='en'):
+        """
+        A generate_batch() result as generate_<kind>_thread(..., language) returns it
+        
+        Args:
+            tweets: Follow-up tweets of one request from generate_batch()
+            language: 'en' for English, 'zh' for Chinese (translated)
+        """
+        if language == 'zh' and tweets:
+            return self._translate_tweets(tweets)
+        return tweets
+    
+    def generate_thread(self, main_tweet, data_context, max_tweets=2, language='en'):
+        """
+        Generate a thread from a main tweet (in English)
+        
+        Args:
+            main_tweet: The main tweet content
+            data_context: Additional data/context about the topic
+            max_tweets: Maximum number of follow-up tweets (default: 2)
+            language: Language the thread will be posted in (sets the length budget)
+        
+        Returns:
+            List of follow-up tweets (main tweet not included) or empty list if disabled
+        """
+        if not self.enabled:
+            logger.debug("AI threads disabled, returning empty list")
+            return []
+        
+        try:
+            # Call the LLM backend (or reuse an identical earlier request)
+            messages, params = self._thread_request(main_tweet, data_context, max_tweets, language)
+            follow_up_tweets = self._generate_tweets(messages, max_tweets, **params)
             
-            logger.info(f"Generated {len(follow_up_tweets)} follow-up tweets")
+            logger.info("Generated %s follow-up tweets", len(follow_up_tweets))
             return follow_up_tweets
         
         except Exception as e:
-            logger.error(f"Error generating AI thread: {e}")
+            logger.error("Error generating AI thread: %s", e)
             return []
     
     def generate_financial_thread(self, main_tweet, market_data, language='en'):
@@ -98,55 +406,34 @@ Do NOT include the main tweet or any hashtags."""
             market_data: Market data context
             language: 'en' for English, 'zh' for Chinese
         """
-        context = f"Market data: {market_data}\n\nProvide insights about market trends, what's driving the changes, and what investors should watch."
-        tweets = self.generate_thread(main_tweet, context, max_tweets=2)
+        context = THREAD_CONTEXTS['financial'].format(market_data)
+        tweets = self.generate_thread(main_tweet, context, max_tweets=2, language=language)
         
         # Translate to Chinese if needed
         if language == 'zh' and tweets:
-            from utils.translator import translator
-            translated_tweets = []
-            for tweet in tweets:
-                translated = translator.translate(tweet)
-                if len(translated) > 280:
-                    translated = translated[:277] + "..."
-                translated_tweets.append(translated)
-            return translated_tweets
+            return self._translate_tweets(tweets)
         
         return tweets
     
     def generate_crypto_thread(self, main_tweet, crypto_data, language='en'):
         """Generate a thread for crypto market updates"""
-        context = f"Crypto data: {crypto_data}\n\nProvide insights about crypto market movements, trends, and important factors."
-        tweets = self.generate_thread(main_tweet, context, max_tweets=2)
+        context = THREAD_CONTEXTS['crypto'].format(crypto_data)
+        tweets = self.generate_thread(main_tweet, context, max_tweets=2, language=language)
         
         # Translate to Chinese if needed
         if language == 'zh' and tweets:
-            from utils.translator import translator
-            translated_tweets = []
-            for tweet in tweets:
-                translated = translator.translate(tweet)
-                if len(translated) > 280:
-                    translated = translated[:277] + "..."
-                translated_tweets.append(translated)
-            return translated_tweets
+            return self._translate_tweets(tweets)
         
         return tweets
     
     def generate_news_thread(self, main_tweet, news_items, language='en'):
         """Generate a thread for news updates"""
-        context = f"News items: {news_items}\n\nProvide deeper insights or explanations about these news items and their significance."
-        tweets = self.generate_thread(main_tweet, context, max_tweets=2)
+        context = THREAD_CONTEXTS['news'].format(news_items)
+        tweets = self.generate_thread(main_tweet, context, max_tweets=2, language=language)
         
         # Translate to Chinese if needed
         if language == 'zh' and tweets:
-            from utils.translator import translator
-            translated_tweets = []
-            for tweet in tweets:
-                translated = translator.translate(tweet)
-                if len(translated) > 280:
-                    translated = translated[:277] + "..."
-                translated_tweets.append(translated)
-            return translated_tweets
+            return self._translate_tweets(tweets)
         
         return tweets
     
@@ -162,66 +449,22 @@ Do NOT include the main tweet or any hashtags."""
             return []
         
         try:
+            # Generate in English (within the Chinese budget for zh posts)
+            messages, params = self._bible_request(verse_text, reference, language)
+            follow_up_tweets = self._generate_tweets(messages, 3, **params)  # Max 3 replies
+            
             if language == 'zh':
-                # Generate in English first, then translate
-                english_tweets = self.generate_bible_thread(verse_text, reference, language='en')
-                
-                # Translate to Chinese
-                from utils.translator import translator
-                chinese_tweets = []
-                for tweet in english_tweets:
-                    translated = translator.translate(tweet)
-                    # Ensure it fits 280 char limit
-                    if len(translated) > 280:
-                        translated = translated[:277] + "..."
-                    chinese_tweets.append(translated)
+                # Translate to Chinese (within X's weighted limit)
+                chinese_tweets = self._translate_tweets(follow_up_tweets)
                 
-                logger.info(f"Translated {len(chinese_tweets)} Bible thread tweets to Chinese")
+                logger.info("Translated %s Bible thread tweets to Chinese", len(chinese_tweets))
                 return chinese_tweets
             
-            # Generate English tweets
-            prompt = f"""You are a Christian faith leader sharing Bible insights.
-
-BIBLE VERSE:
-"{verse_text}"
-- {reference}
-
-Create 2-3 follow-up tweets (under 280 chars each) that provide:
-1. Historical context (who wrote it, why, when)
-2. Practical modern application
-3. An inspiring closing thought
-
-Be encouraging, accessible, and avoid clichés. No emojis.
-
-Format: Return ONLY the tweets, numbered 1., 2., 3."""
-
-            response = self.client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are a thoughtful Bible teacher providing clear, practical insights."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=600,
-                top_p=0.9
-            )
-            
-            content = response.choices[0].message.content.strip()
-            
-            # Extract tweets
-            follow_up_tweets = []
-            for line in content.split('\n'):
-                line = line.strip()
-                if line and any(line.startswith(f"{i}.") for i in range(1, 10)):
-                    tweet = line.split('.', 1)[1].strip()
-                    if tweet and len(tweet) <= 280:
-                        follow_up_tweets.append(tweet)
-            
-            logger.info(f"Generated {len(follow_up_tweets)} Bible thread tweets")
-            return follow_up_tweets[:3]  # Max 3 replies
+            logger.info("Generated %s Bible thread tweets", len(follow_up_tweets))
+            return follow_up_tweets
         
         except Exception as e:
-            logger.error(f"Error generating Bible thread: {e}")
+            logger.error("Error generating Bible thread: %s", e)
             return []
 
 # Global AI thread generator instance
@@ -12,7 +12,7 @@ class SimpleCache:
     def __init__(self, cache_dir=".cache"):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        logger.info(f"Cache initialized at {self.cache_dir}")
+        logger.info("Cache initialized at %s", self.cache_dir)
     
     def _get_cache_file(self, key):
         """Get cache file path for a key"""
@@ -24,7 +24,7 @@ class SimpleCache:
         cache_file = self._get_cache_file(key)
         
         if not cache_file.exists():
-            logger.debug(f"Cache miss: {key}")
+            logger.debug("Cache miss: %s", key)
             return None
         
         try:
@@ -36,14 +36,14 @@ class SimpleCache:
             age = datetime.now() - cached_time
             
             if age > timedelta(minutes=max_age_minutes):
-                logger.debug(f"Cache expired: {key} (age: {age})")
+                logger.debug("Cache expired: %s (age: %s)", key, age)
                 return None
             
-            logger.info(f"Cache hit: {key} (age: {age.seconds}s)")
+            logger.info("Cache hit: %s (age: %ss)", key, age.seconds)
             return cached_data['value']
         
         except Exception as e:
-            logger.error(f"Cache read error for {key}: {e}")
+            logger.error("Cache read error for %s: %s", key, e)
             return None
     
     def set(self, key, value):
@@ -59,10 +59,10 @@ class SimpleCache:
             with open(cache_file, 'w', encoding='utf-8') as f:
                 json.dump(cached_data, f, ensure_ascii=False, indent=2)
             
-            logger.debug(f"Cache set: {key}")
+            logger.debug("Cache set: %s", key)
         
         except Exception as e:
-            logger.error(f"Cache write error for {key}: {e}")
+            logger.error("Cache write error for %s: %s", key, e)
     
     def clear(self):
         """Clear all cached data"""
@@ -71,7 +71,7 @@ class SimpleCache:
                 cache_file.unlink()
             logger.info("Cache cleared")
         except Exception as e:
-            logger.error(f"Cache clear error: {e}")
+            logger.error("Cache clear error: %s", e)
     
     def clear_old(self, max_age_hours=24):
         """Remove cache files older than specified hours"""
@@ -96,10 +96,10 @@ class SimpleCache:
                     count += 1
             
             if count > 0:
-                logger.info(f"Cleared {count} old cache files")
+                logger.info("Cleared %s old cache files", count)
         
         except Exception as e:
-            logger.error(f"Error clearing old cache: {e}")
+            logger.error("Error clearing old cache: %s", e)
 
 # Global cache instance
 cache = SimpleCache()
@@ -0,0 +1,239 @@
+import time
+import threading
+from pathlib import Path
+import numpy as np
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+class PriceHistoryBuffer:
+    """Rolling price history for many symbols in one preallocated NumPy array"""
+
+    def __init__(self, capacity=90):
+        self.capacity = capacity
+        self.symbols = []
+        self._rows = {}
+        self._prices = np.full((0, capacity), np.nan)
+
+    def _row(self, symbol):
+        """Get (or allocate) the buffer row for a symbol"""
+        row = self._rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            self.symbols.append(symbol)
+            self._rows[symbol] = row
+            self._prices = np.vstack([self._prices, np.full((1, self.capacity), np.nan)])
+        return row
+
+    def extend(self, symbol, prices):
+        """Append prices (oldest first) to a symbol's history, dropping the oldest"""
+        prices = np.asarray(prices, dtype=np.float64)[-self.capacity:]
+        if prices.size == 0:
+            return
+
+        index = self._row(symbol)
+        row = self._prices[index]
+        row[:-prices.size] = row[prices.size:]
+        row[-prices.size:] = prices
+
+    def set_series(self, symbol, prices):
+        """Replace a symbol's history with the given prices (oldest first)"""
+        index = self._row(symbol)
+        self._prices[index] = np.nan
+        self.extend(symbol, prices)
+
+    def append(self, symbol, price):
+        """Append a single price to a symbol's history"""
+        self.extend(symbol, [price])
+
+    def series(self, symbol):
+        """Return the stored prices for a symbol (oldest first, no gaps)"""
+        row = self._rows.get(symbol)
+        if row is None:
+            return np.empty(0)
+        prices = self._prices[row]
+        return prices[~np.isnan(prices)]
+
+    def normalized(self, symbol):
+        """Return a symbol's history as % change from its first stored price"""
+        prices = self.series(symbol)
+        if prices.size == 0 or prices[0] == 0:
+            return prices
+        return (prices / prices[0] - 1.0) * 100
+
+
+class MarketChartRenderer:
+    """Render market PNGs from a figure template that is built once and reused
+
+    matplotlib is imported lazily (Agg canvas only, never pyplot) the first time
+    a chart is rendered. Later renders only update the bar, line and text
+    artists, so the cost of building axes, ticks and fonts is paid once.
+    That one figure is shared, so renders (and the build) hold a lock: posts
+    rendering their charts at the same time take turns.
+    """
+
+    WIDTH_PX = 1200
+    HEIGHT_PX = 675
+    DPI = 100
+
+    BACKGROUND = '#0f1419'
+    FOREGROUND = '#e7e9ea'
+    GRID = '#2f3336'
+    UP = '#00ba7c'
+    DOWN = '#f91880'
+
+    def __init__(self, max_assets=8, output_dir=None):
+        self.max_assets = max_assets
+        self.output_dir = Path(output_dir or config.CHART_OUTPUT_DIR)
+        self._canvas = None
+        self._lock = threading.Lock()
+
+    def _build_template(self):
+        """Import matplotlib and build the reusable figure (first render only)"""
+        start = time.perf_counter()
+
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        fig = Figure(
+            figsize=(self.WIDTH_PX / self.DPI, self.HEIGHT_PX / self.DPI),
+            dpi=self.DPI,
+            facecolor=self.BACKGROUND
+        )
+        canvas = FigureCanvasAgg(fig)
+
+        self._title = fig.text(0.04, 0.92, '', color=self.FOREGROUND, fontsize=22, fontweight='bold')
+        self._subtitle = fig.text(0.04, 0.87, '', color=self.FOREGROUND, fontsize=12, alpha=0.7)
+
+        bar_ax = fig.add_axes([0.16, 0.08, 0.34, 0.74])
+        line_ax = fig.add_axes([0.58, 0.08, 0.38, 0.74])
+
+        for ax in (bar_ax, line_ax):
+            ax.set_facecolor(self.BACKGROUND)
+            ax.tick_params(colors=self.FOREGROUND, labelsize=11)
+            ax.grid(True, color=self.GRID, linewidth=0.8)
+            ax.set_axisbelow(True)
+            for spine in ax.spines.values():
+                spine.set_visible(False)
+
+        # One bar and one line per asset slot; unused slots stay hidden
+        slots = np.arange(self.max_assets)
+        self._bars = bar_ax.barh(slots, np.zeros(self.max_assets), height=0.6)
+        bar_ax.axvline(0, color=self.FOREGROUND, linewidth=0.8)
+        bar_ax.invert_yaxis()
+        bar_ax.set_yticks(slots)
+        bar_ax.set_title('24H change (%)', color=self.FOREGROUND, fontsize=13, loc='left')
+
+        self._bar_labels = [
+            bar_ax.text(0, slot, '', va='center', color=self.FOREGROUND, fontsize=10)
+            for slot in slots
+        ]
+        self._lines = [
+            line_ax.plot([], [], linewidth=2)[0]
+            for _ in slots
+        ]
+        line_ax.set_title('Price history (% from start)', color=self.FOREGROUND, fontsize=13, loc='left')
+        self._legend = None
+
+        self._fig = fig
+        self._bar_ax = bar_ax
+        self._line_ax = line_ax
+        self._canvas = canvas
+
+        logger.info("Chart template built in %.0fms", (time.perf_counter() - start) * 1000)
+
+    def warm_up(self):
+        """Build the figure template now rather than on the first render"""
+        with self._lock:
+            if self._canvas is None:
+                self._build_template()
+
+    def render(self, assets, history, title, subtitle='', filename='markets.png'):
+        """
+        Render a market chart PNG
+
+        Args:
+            assets: Ordered dict of {label: {'price': float, 'change': float}}
+            history: PriceHistoryBuffer holding price history keyed by label
+            title: Chart title
+            subtitle: Smaller line under the title (e.g. the date)
+            filename: File name inside the chart output directory
+
+        Returns:
+            Path to the PNG, or None if rendering failed
+        """
+        with self._lock:
+            return self._render(assets, history, title, subtitle, filename)
+
+    def _render(self, assets, history, title, subtitle, filename):
+        try:
+            if self._canvas is None:
+                self._build_template()
+
+            labels = list(assets)[:self.max_assets]
+            changes = np.array([assets[label]['change'] or 0.0 for label in labels], dtype=np.float64)
+            count = len(labels)
+
+            self._title.set_text(title)
+            self._subtitle.set_text(subtitle)
+
+            # Bars: update widths/colors in place
+            colors = np.where(changes >= 0, self.UP, self.DOWN)
+            for slot, bar in enumerate(self._bars):
+                visible = slot < count
+                bar.set_visible(visible)
+                self._bar_labels[slot].set_visible(visible)
+                if not visible:
+                    continue
+                bar.set_width(changes[slot])
+                bar.set_color(colors[slot])
+                self._bar_labels[slot].set_text(f" {changes[slot]:+.1f}% ")
+                self._bar_labels[slot].set_x(changes[slot])
+                self._bar_labels[slot].set_ha('left' if changes[slot] >= 0 else 'right')
+
+            limit = max(float(np.abs(changes).max(initial=0.0)) * 1.4, 1.0)
+            self._bar_ax.set_xlim(-limit, limit)
+            self._bar_ax.set_ylim(self.max_assets - 0.5, -0.5)
+            self._bar_ax.set_yticklabels(labels + [''] * (self.max_assets - count))
+
+            # Lines: swap in each asset's normalized history
+            drawn = []
+            for slot, line in enumerate(self._lines):
+                series = history.normalized(labels[slot]) if slot < count else np.empty(0)
+                line.set_visible(series.size > 1)
+                if series.size > 1:
+                    line.set_data(np.arange(series.size), series)
+                    line.set_label(labels[slot])
+                    drawn.append(line)
+
+            self._line_ax.relim(visible_only=True)
+            self._line_ax.autoscale_view()
+            if self._legend is not None:
+                self._legend.remove()
+                self._legend = None
+            if drawn:
+                self._legend = self._line_ax.legend(
+                    handles=drawn, loc='upper left', fontsize=9, frameon=False,
+                    labelcolor=self.FOREGROUND, ncol=2
+                )
+
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            path = self.output_dir / filename
+            # Low zlib level: flat-color charts stay small and encode much faster
+            self._canvas.print_png(str(path), pil_kwargs={'compress_level': 1})
+
+            logger.info("Chart rendered: %s", path)
+            return path
+
+        except Exception as e:
+            logger.error("Error rendering chart: %s", e)
+            return None
+
+# Global chart renderer instance (matplotlib is loaded on first render)
+chart_renderer = MarketChartRenderer()
+
+
+def render_chart(assets, history, title, subtitle='', filename='markets.png'):
+    """chart_renderer.render() as a module-level function, so the stage pool can run it"""
+    return chart_renderer.render(assets, history, title, subtitle=subtitle, filename=filename)
@@ -0,0 +1,131 @@
+import os
+import json
+import fcntl
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.market_calendar import calendar_for_ticker
+from utils.price_store import price_store, RECORD
+from utils.process_pool import stage_pool
+import config
+
+logger = setup_logger(__name__)
+
+def fetch_history(ticker, start=None, period=None):
+    """
+    Download a ticker's daily bars from yfinance (runs in the stage pool)
+
+    Args:
+        ticker: Yahoo Finance symbol
+        start: First day to fetch (YYYY-MM-DD), or None to fetch `period`
+        period: yfinance period, e.g. '3mo'
+
+    Returns:
+        RECORD array of (timestamp, close), oldest first
+    """
+    import yfinance as yf
+
+    stock = yf.Ticker(ticker)
+    hist = stock.history(start=start) if start else stock.history(period=period)
+
+    records = np.empty(len(hist), dtype=RECORD)
+    records['ts'] = [ts.timestamp() for ts in hist.index]
+    records['close'] = hist['Close'].to_numpy() if len(hist) else []
+    return records
+
+
+class DeltaFetcher:
+    """Fetch only new daily bars per ticker into the price store
+
+    The last stored bar bounds what is requested from yfinance, and the time of
+    the last successful fetch is remembered per ticker. If the ticker's
+    exchange has not closed a session since then, the fetch is skipped.
+    Region jobs (and LOW_MEMORY job processes) update the state file at the
+    same time, so each update re-reads it under a file lock and replaces it
+    atomically.
+    """
+
+    def __init__(self, store=None, state_file=None):
+        self.store = store or price_store
+        self.state_file = Path(state_file or Path(self.store.data_dir) / 'fetch_state.json')
+        self.lock_file = self.state_file.with_name(f"{self.state_file.name}.lock")
+        self._lock = threading.Lock()
+        self._fetched_at = self._load_state()
+
+    def _load_state(self):
+        """Load last-fetch times ({ticker: POSIX timestamp})"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error("Fetch state read error: %s", e)
+            return {}
+
+    def _save_state(self, ticker, fetched_at):
+        """Record a ticker's last-fetch time in the state file (merged with other processes' updates)"""
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            # flock is per open file: the thread lock covers this process's threads
+            with self._lock, open(self.lock_file, 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                state = self._load_state()
+                state[ticker] = fetched_at
+
+                temp_path = self.state_file.with_suffix(f".{os.getpid()}.tmp")
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(state, f)
+                os.replace(temp_path, self.state_file)
+                self._fetched_at = state
+        except Exception as e:
+            logger.error("Fetch state write error: %s", e)
+
+    def needs_fetch(self, ticker, now=None):
+        """Check if the ticker's exchange has closed a session since its last fetch"""
+        fetched_at = self._fetched_at.get(ticker)
+        if fetched_at is None or self.store.last_timestamp(ticker) is None:
+            return True
+
+        since = datetime.fromtimestamp(fetched_at, tz=timezone.utc)
+        return calendar_for_ticker(ticker).has_closed_since(since, now)
+
+    def fetch(self, ticker, now=None):
+        """
+        Fetch new bars for a ticker (no-op if the exchange has been closed)
+
+        Returns:
+            Number of bars written to the store
+        """
+        if not self.needs_fetch(ticker, now):
+            logger.info("%s: exchange closed since last fetch, skipping", ticker)
+            return 0
+
+        last_ts = self.store.last_timestamp(ticker)
+
+        # Parsed in the stage pool: pandas and yfinance stay out of this process
+        with metrics.track('yfinance', 'history'):
+            if last_ts is None:
+                records = stage_pool.call(fetch_history, ticker, period=config.PRICE_HISTORY_SEED_PERIOD)
+            else:
+                # Start on the last stored bar's day so a still-forming bar gets refreshed
+                start = datetime.fromtimestamp(last_ts, tz=timezone.utc).strftime('%Y-%m-%d')
+                records = stage_pool.call(fetch_history, ticker, start=start)
+
+        if not len(records):
+            logger.warning("%s: no bars returned", ticker)
+            return 0
+
+        written = self.store.append(ticker, records['ts'], records['close'])
+
+        self._fetched_at[ticker] = (now or datetime.now(timezone.utc)).timestamp()
+        self._save_state(ticker, self._fetched_at[ticker])
+
+        logger.info("%s: %s bars fetched, %s stored", ticker, len(records), written)
+        return written
+
+# Global delta fetcher instance
+delta_fetcher = DeltaFetcher()
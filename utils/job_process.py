@@ -0,0 +1,166 @@
+import os
+import sys
+import json
+import time
+import signal
+import resource
+import importlib
+import threading
+import subprocess
+from pathlib import Path
+from functools import partial
+from utils.logger import setup_logger, get_log_context, bind_log_context, flush_logs
+from utils.job_runtime import JobRun, JobCancelled, current_run, _current_run
+from utils.metrics import metrics
+import config
+
+logger = setup_logger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# How often the parent checks on the child (and for a cancel to pass on)
+POLL_SECONDS = 0.2
+
+def _peak_rss_bytes():
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_in_subprocess(target, *args, profile=None):
+    """
+    Run a job function in a fresh Python process (LOW_MEMORY)
+
+    Everything the job imports is freed when the process exits. Called from
+    a job runtime worker: the child gets the job's remaining time and log
+    context, its checkpoints are handed to JobRun.checkpoint() as they come,
+    a cancel is passed on as SIGTERM (SIGKILL after JOB_CANCEL_GRACE_SECONDS)
+    and its metrics are merged into this process's.
+
+    Args:
+        target: 'module:attribute' of the function, e.g. 'post_registry:post_registry.run'
+        args: JSON-serializable arguments
+        profile: Profiling mode to run the child under ('cprofile', 'sample') or None
+
+    Returns:
+        The function's result
+    """
+    job_run = current_run()
+    job_id = job_run.job_id if job_run else target
+    spec = {
+        'target': target,
+        'args': list(args),
+        'job': job_id,
+        'timeout': job_run.remaining() if job_run else config.JOB_TIMEOUT_SECONDS,
+        'context': get_log_context(),
+        'profile': profile,
+    }
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])),
+        # Set at runtime (--dry-run), not only from the environment
+        'DRY_RUN': 'true' if config.DRY_RUN else 'false',
+        # Only the scheduler serves and writes metrics; the child's are merged here
+        'METRICS_PORT': '0',
+        'METRICS_TEXTFILE': '',
+    }
+
+    read_fd, write_fd = os.pipe()
+    try:
+        # Own session: a Ctrl+C meant for the scheduler doesn't hit the job mid-tweet
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'utils.job_process', json.dumps(spec), str(write_fd)],
+            cwd=os.getcwd(), env=env, pass_fds=(write_fd,), start_new_session=True
+        )
+    finally:
+        os.close(write_fd)
+
+    outcome = {}
+    reader = threading.Thread(target=_read_messages, args=(read_fd, job_run, outcome), name=f"job-process-{job_id}", daemon=True)
+    reader.start()
+
+    terminated_at = None
+    while True:
+        try:
+            process.wait(timeout=POLL_SECONDS)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+        if job_run is None or not job_run.cancelled:
+            continue
+        if terminated_at is None:
+            process.terminate()
+            terminated_at = time.monotonic()
+        elif time.monotonic() - terminated_at > config.JOB_CANCEL_GRACE_SECONDS:
+            logger.warning("[%s] Job process ignored the cancel for %ss, killing it", job_id, config.JOB_CANCEL_GRACE_SECONDS)
+            process.kill()
+    reader.join()
+
+    if 'peak_rss' in outcome:
+        labels = get_log_context()
+        metrics.set('job_peak_rss_bytes', outcome['peak_rss'], job=job_id, region=labels.get('region'))
+        logger.info("[%s] Job process peak RSS %.0f MB", job_id, outcome['peak_rss'] / 1024 / 1024)
+
+    if 'result' in outcome:
+        return outcome['result']
+    if 'cancelled' in outcome:
+        raise JobCancelled(outcome['cancelled'])
+    raise RuntimeError(outcome.get('error') or f"job process exited with {process.returncode}")
+
+
+def _read_messages(read_fd, job_run, outcome):
+    """Apply the child's messages (one JSON object per line) as they arrive"""
+    with os.fdopen(read_fd, 'r', encoding='utf-8') as channel:
+        for line in channel:
+            try:
+                message = json.loads(line)
+                if 'checkpoint' in message:
+                    if job_run is not None:
+                        job_run.checkpoint(message.pop('checkpoint'))
+                if 'metrics' in message:
+                    metrics.merge(message.pop('metrics'))
+                outcome.update(message)
+            except Exception as e:
+                logger.error("Job process message error: %s", e)
+
+
+def main():
+    """Child side: run the spec'd function and report back on the pipe"""
+    spec = json.loads(sys.argv[1])
+    channel = os.fdopen(int(sys.argv[2]), 'w', encoding='utf-8')
+    lock = threading.Lock()
+
+    def send(**message):
+        with lock:
+            channel.write(json.dumps(message, ensure_ascii=False) + '\n')
+            channel.flush()
+
+    job_run = JobRun(spec['job'], spec['timeout'], on_checkpoint=lambda state: send(checkpoint=state))
+    # The parent cancels with SIGTERM: stop at the next safe point, like a thread job
+    signal.signal(signal.SIGTERM, lambda signum, frame: job_run.cancel())
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _current_run.set(job_run)
+    bind_log_context(**spec['context'])
+
+    try:
+        module_name, _, path = spec['target'].partition(':')
+        func = importlib.import_module(module_name)
+        for name in path.split('.'):
+            func = getattr(func, name)
+        func = partial(func, *spec['args'])
+        if spec.get('profile'):
+            from utils.profiling import profiled
+            func = profiled(spec['job'], func, spec['profile'])
+
+        send(result=func())
+    except JobCancelled as e:
+        send(cancelled=str(e))
+    except Exception as e:
+        logger.error("[%s] Job process error: %s", spec['job'], e)
+        send(error=f"{type(e).__name__}: {e}")
+    finally:
+        send(metrics=metrics.export(), peak_rss=_peak_rss_bytes())
+        channel.close()
+        flush_logs()
+
+if __name__ == '__main__':
+    main()
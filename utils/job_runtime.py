@@ -0,0 +1,149 @@
+import time
+import asyncio
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from utils.logger import setup_logger, bind_log_context
+import config
+
+logger = setup_logger(__name__)
+
+# The JobRun of the job executing in the current thread (None outside the runtime)
+_current_run = contextvars.ContextVar('current_run', default=None)
+
+class JobCancelled(Exception):
+    """Raised when a job is cancelled or runs past its deadline"""
+
+
+class JobRun:
+    """Deadline and cancellation flag of one running job
+
+    Blocking job code can't be interrupted from outside, so it checks in at
+    safe points (Pipeline does so between stages) and stops there.
+    """
+
+    def __init__(self, job_id, timeout, on_checkpoint=None):
+        self.job_id = job_id
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.on_checkpoint = on_checkpoint
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def remaining(self):
+        """Seconds left until the deadline (0 once cancelled or expired)"""
+        if self.cancelled:
+            return 0.0
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled or its deadline has passed"""
+        if self.cancelled:
+            raise JobCancelled(f"Job '{self.job_id}' was cancelled")
+        if time.monotonic() >= self.deadline:
+            raise JobCancelled(f"Job '{self.job_id}' exceeded its {self.timeout}s deadline")
+
+    def sleep(self, seconds):
+        """Sleep that wakes up as soon as the job is cancelled
+
+        Returns:
+            True if the job was cancelled
+        """
+        return self._cancelled.wait(seconds)
+
+    def checkpoint(self, state):
+        """Hand progress the job can resume from to the runner (e.g. tweets posted so far)"""
+        if self.on_checkpoint:
+            self.on_checkpoint(state)
+
+
+def current_run():
+    """Return the JobRun of the job running in this thread, or None"""
+    return _current_run.get()
+
+
+class JobRuntime:
+    """Run blocking job functions from an asyncio scheduler
+
+    Each region gets its own bounded worker pool, so one region's slow jobs
+    can't starve the other's. Every run has a deadline: past it the job is
+    cancelled at its next safe point and the event loop stops waiting for it.
+    """
+
+    def __init__(self, workers_per_group):
+        self.workers_per_group = workers_per_group
+        self._pools = {}
+        self._runs = {}
+
+    def _pool(self, group):
+        if group not in self._pools:
+            self._pools[group] = ThreadPoolExecutor(max_workers=self.workers_per_group, thread_name_prefix=f"job-{group}")
+        return self._pools[group]
+
+    def running(self):
+        """JobRuns currently in flight, by job id"""
+        return dict(self._runs)
+
+    async def run(self, job_id, func, group='default', timeout=None, on_checkpoint=None):
+        """
+        Run func() in the group's worker pool with a deadline
+
+        Args:
+            job_id: Job identifier (for logs and cancellation)
+            func: Blocking callable
+            group: Worker pool to use (e.g. the region)
+            timeout: Seconds before the job is cancelled (default JOB_TIMEOUT_SECONDS)
+            on_checkpoint: Called with the state the job saves through JobRun.checkpoint()
+
+        Returns:
+            func's result, or None if the job was cancelled
+        """
+        timeout = timeout or config.JOB_TIMEOUT_SECONDS
+        job_run = JobRun(job_id, timeout, on_checkpoint)
+        self._runs[job_id] = job_run
+
+        context = contextvars.copy_context()
+        context.run(_current_run.set, job_run)
+        context.run(bind_log_context, job=job_id, region=group)
+        future = asyncio.get_running_loop().run_in_executor(self._pool(group), context.run, func)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+        except asyncio.TimeoutError:
+            job_run.cancel()
+            logger.error("[%s] Deadline of %ss exceeded, cancelling", job_id, timeout)
+            try:
+                await asyncio.wait_for(asyncio.shield(future), config.JOB_CANCEL_GRACE_SECONDS)
+                logger.info("[%s] Stopped after cancel", job_id)
+            except asyncio.TimeoutError:
+                logger.warning("[%s] Still running %ss after cancel (blocked in a stage)", job_id, config.JOB_CANCEL_GRACE_SECONDS)
+            except Exception as e:
+                logger.info("[%s] Stopped after cancel: %s", job_id, e)
+            return None
+
+        except asyncio.CancelledError:
+            job_run.cancel()
+            raise
+
+        finally:
+            self._runs.pop(job_id, None)
+
+    def cancel_all(self):
+        """Cancel every in-flight job at its next safe point (and wake it from JobRun.sleep)"""
+        for job_run in self._runs.values():
+            job_run.cancel()
+
+    def shutdown(self, wait=False):
+        """Stop the worker pools"""
+        for pool in self._pools.values():
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+# Global job runtime instance
+job_runtime = JobRuntime(config.JOB_WORKERS_PER_REGION)
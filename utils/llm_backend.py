@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
+from groq import Groq
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+class LLMBackend:
+    """Chat completion backend used by the AI thread generator
+
+    Subclasses implement complete(); stream() defaults to yielding the whole
+    completion at once and complete_batch() to one completion per request.
+    """
+
+    name = 'base'
+    model = None
+    concurrency = 1  # Requests the backend can serve at the same time
+
+    def warm_up(self):
+        """Load models or open connections ahead of the first request"""
+
+    def complete(self, messages, **params):
+        """Return the stripped completion text for a chat request"""
+        raise NotImplementedError
+
+    def stream(self, messages, **params):
+        """Yield the completion in text pieces (closing the generator ends generation)"""
+        yield self.complete(messages, **params)
+
+    def complete_batch(self, requests):
+        """
+        Run several chat requests
+
+        Args:
+            requests: List of (messages, params) tuples
+
+        Returns:
+            Completion texts in request order
+        """
+        return [self.complete(messages, **params) for messages, params in requests]
+
+
+class GroqBackend(LLMBackend):
+    """Hosted models through the Groq API"""
+
+    name = 'groq'
+
+    def __init__(self, api_key, model="llama-3.3-70b-versatile"):
+        self.client = Groq(api_key=api_key, base_url=config.GROQ_BASE_URL or None)
+        self.model = model
+        self.concurrency = config.PIPELINE_WORKERS
+
+    def complete(self, messages, **params):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            **params
+        )
+        return response.choices[0].message.content.strip()
+
+    def stream(self, messages, **params):
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        try:
+            for chunk in stream:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ''
+        finally:
+            stream.close()
+
+    def complete_batch(self, requests):
+        # Remote calls: send the batch concurrently
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(lambda request: self.complete(request[0], **request[1]), requests))
+
+
+class LocalLLMBackend(LLMBackend):
+    """Quantized GGUF model on the local CPU through llama-cpp-python (optional dependency)
+
+    The model is loaded once (warm_up) and kept in memory; requests run one at a time.
+    """
+
+    name = 'local'
+
+    def __init__(self, model_path, context_size=2048, threads=2):
+        self.model_path = model_path
+        self.model = os.path.basename(model_path)
+        self.context_size = context_size
+        self.threads = threads
+        self._llm = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available(model_path):
+        """Check if llama-cpp-python is installed and the model file exists"""
+        return importlib.util.find_spec('llama_cpp') is not None and os.path.exists(model_path)
+
+    def _load(self):
+        with self._lock:
+            if self._llm is None:
+                from llama_cpp import Llama
+
+                start = time.perf_counter()
+                self._llm = Llama(
+                    model_path=self.model_path,
+                    n_ctx=self.context_size,
+                    n_threads=self.threads,
+                    verbose=False
+                )
+                logger.info("Loaded local model %s in %.1fs", self.model, time.perf_counter() - start)
+        return self._llm
+
+    def warm_up(self):
+        self._load()
+
+    def complete(self, messages, **params):
+        response = self._load().create_chat_completion(messages=messages, **params)
+        return response['choices'][0]['message']['content'].strip()
+
+    def stream(self, messages, **params):
+        for chunk in self._load().create_chat_completion(messages=messages, stream=True, **params):
+            yield chunk['choices'][0]['delta'].get('content') or ''
+
+
+class TemplateBackend(LLMBackend):
+    """Model-free fallback that writes follow-up tweets from the data in the prompt
+
+    Output is plainer than a model's but keeps threads going offline and in dev.
+    """
+
+    name = 'template'
+    model = 'template-v1'
+    concurrency = 4
+
+    # "+ Nasdaq: +0.8%" or "+ BTC: $68,000 (+2.0%)"
+    MOVER_PATTERN = re.compile(r'^[+-] (.+?): (?:\$[\d,.]+ \()?([+-]\d+(?:\.\d+)?)%', re.M)
+
+    def complete(self, messages, **params):
+        prompt = messages[-1]['content']
+
+        rewrite = re.match(r'Rewrite this tweet in at most (\d+) characters.*?\n\n(.*)', prompt, re.S)
+        if rewrite:
+            return self._shorten(rewrite.group(2).strip(), int(rewrite.group(1)))
+
+        verse = re.search(r'BIBLE VERSE:\n"(.*?)"\n- ([^\n]+)', prompt, re.S)
+        if verse:
+            tweets = self._bible_tweets(verse.group(2).strip())
+        else:
+            main = re.search(r'MAIN TWEET:\n(.*?)\n\nCONTEXT/DATA:', prompt, re.S)
+            tweets = self._thread_tweets(main.group(1) if main else '')
+
+        return "\n".join(f"{i}. {tweet}" for i, tweet in enumerate(tweets, 1))
+
+    def _shorten(self, tweet, budget):
+        """Cut a tweet at the last word that fits"""
+        if len(tweet) <= budget:
+            return tweet
+        return tweet[:budget].rsplit(' ', 1)[0].rstrip(',;:') + '.'
+
+    def _bible_tweets(self, reference):
+        return [
+            f"Read {reference} slowly, twice. What does it show about who God is, and what does it ask of us today?",
+            f"Try carrying one phrase from {reference} with you today and coming back to it whenever the day gets loud.",
+            "Scripture is meant to be lived, not just read. How does this verse speak to where you are right now?"
+        ]
+
+    def _thread_tweets(self, main_tweet):
+        movers = [(label, float(change)) for label, change in self.MOVER_PATTERN.findall(main_tweet)]
+        if movers:
+            best = max(movers, key=lambda mover: mover[1])
+            worst = min(movers, key=lambda mover: mover[1])
+            up = sum(1 for _, change in movers if change >= 0)
+            return [
+                f"Biggest mover up: {best[0]} ({best[1]:+.1f}%). Weakest: {worst[0]} ({worst[1]:+.1f}%). {up} of {len(movers)} assets tracked closed the day higher.",
+                "One day is mostly noise. Watch whether the move holds through the week, and what rates, earnings and liquidity do next."
+            ]
+
+        lines = [line.strip() for line in main_tweet.split('\n') if line.strip()]
+        source = next((line.split(':', 1)[1].strip() for line in lines if line.startswith('Source:')), None)
+        headline = lines[1] if len(lines) > 1 else ''
+        if headline and source:
+            return [
+                f"Why it matters: {headline}",
+                f"Worth watching: how {source} and others follow up, and what it changes for developers and everyday users."
+            ]
+
+        return []
+
+
+def create_backend(name=None):
+    """
+    Create the configured LLM backend
+
+    Args:
+        name: 'groq', 'local', 'template', 'none' or 'auto' (default LLM_BACKEND).
+            'auto' picks Groq when GROQ_API_KEY is set, then a local model when
+            llama-cpp-python and LOCAL_LLM_MODEL_PATH are available, then templates.
+
+    Returns:
+        LLMBackend, or None for 'none'
+    """
+    name = (name or config.LLM_BACKEND).lower()
+
+    if name == 'auto':
+        if config.GROQ_API_KEY:
+            name = 'groq'
+        elif LocalLLMBackend.available(config.LOCAL_LLM_MODEL_PATH):
+            name = 'local'
+        else:
+            name = 'template'
+
+    if name == 'groq':
+        return GroqBackend(config.GROQ_API_KEY)
+    if name == 'local':
+        return LocalLLMBackend(
+            config.LOCAL_LLM_MODEL_PATH,
+            context_size=config.LOCAL_LLM_CONTEXT,
+            threads=config.LOCAL_LLM_THREADS
+        )
+    if name == 'template':
+        return TemplateBackend()
+    if name == 'none':
+        return None
+
+    raise ValueError(f"Unknown LLM_BACKEND: {name}")
@@ -1,38 +1,136 @@
-import logging
 import sys
+import json
+import copy
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+import logging.handlers
+from contextlib import contextmanager
 from datetime import datetime
 import config
 
-def setup_logger(name):
-    """Set up logger with consistent formatting"""
-    logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, config.LOG_LEVEL))
+# job / region / stage of the code running in this context (set by the job
+# runtime and the pipeline), added to every record logged from it
+_log_context = contextvars.ContextVar('log_context', default={})
+CONTEXT_FIELDS = ('job', 'region', 'stage')
+
+_queue = None
+_listener = None
+_lock = threading.Lock()
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the job/region/stage of the logging context"""
     
-    # Console handler with UTF-8 encoding for Chinese characters
-    if sys.stdout.encoding != 'utf-8':
-        try:
-            sys.stdout.reconfigure(encoding='utf-8')
-        except (AttributeError, OSError):
-            pass  # reconfigure not available or failed; continue with default
+    def filter(self, record):
+        fields = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, fields.get(field))
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line (time, level, logger, message, job, region, stage)"""
     
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(getattr(logging, config.LOG_LEVEL))
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread without formatting them
     
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    handler.setFormatter(formatter)
+    Only the %-args are merged here (they could change after the call);
+    timestamps, layout and JSON encoding happen on the listener thread.
+    """
     
-    if not logger.handlers:
-        logger.addHandler(handler)
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging():
+    """Send all logging through a queue to one stdout handler on a listener thread (once per process)"""
+    global _queue, _listener
     
+    with _lock:
+        if _listener is not None:
+            return
+        
+        # Console with UTF-8 encoding for Chinese characters
+        if sys.stdout.encoding != 'utf-8':
+            try:
+                sys.stdout.reconfigure(encoding='utf-8')
+            except (AttributeError, OSError):
+                pass  # reconfigure not available or failed; continue with default
+        
+        handler = logging.StreamHandler(sys.stdout)
+        if config.LOG_FORMAT == 'json':
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            ))
+        
+        _queue = queue.Queue()
+        queue_handler = _QueueHandler(_queue)
+        queue_handler.addFilter(ContextFilter())
+        logging.getLogger().addHandler(queue_handler)
+        
+        _listener = logging.handlers.QueueListener(_queue, handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+def setup_logger(name):
+    """Get a logger at LOG_LEVEL (logging is configured on first use)"""
+    configure_logging()
+    logger = logging.getLogger(name)
+    logger.setLevel(getattr(logging, config.LOG_LEVEL))
     return logger
 
+def get_log_context():
+    """The job/region/stage fields of the current context"""
+    return _log_context.get()
+
+def bind_log_context(**fields):
+    """Add fields (job, region, stage) to records logged in this context from now on"""
+    return _log_context.set({**_log_context.get(), **fields})
+
+@contextmanager
+def log_context(**fields):
+    """Add fields (job, region, stage) to records logged inside the block"""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
 def log_tweet(content, language='en', dry_run=False):
     """Log tweet content before posting"""
-    logger = setup_logger('tweet_logger')
     status = "DRY RUN" if dry_run else "POSTING"
-    logger.info(f"[{status}] [{language.upper()}] Tweet: {content[:100]}...")
+    _tweet_logger.info("[%s] [%s] Tweet: %s...", status, language.upper(), content[:100])
+
+def flush_logs():
+    """Write out every queued record (e.g. before the process is stopped)"""
+    if _listener is None or _listener._thread is None:
+        return
+    _queue.join()
+    for handler in _listener.handlers:
+        handler.flush()
 
+_tweet_logger = setup_logger('tweet_logger')
@@ -0,0 +1,106 @@
+from datetime import date, datetime, time, timedelta
+import pytz
+
+# Full-day exchange closures on weekdays. Years missing from a table are treated
+# as weekday-trading, so an out-of-date table only costs extra fetches, never
+# skipped ones. Extend each table when the exchange publishes the next year.
+NYSE_HOLIDAYS = {
+    # 2025
+    date(2025, 1, 1), date(2025, 1, 9), date(2025, 1, 20), date(2025, 2, 17),
+    date(2025, 4, 18), date(2025, 5, 26), date(2025, 6, 19), date(2025, 7, 4),
+    date(2025, 9, 1), date(2025, 11, 27), date(2025, 12, 25),
+    # 2026
+    date(2026, 1, 1), date(2026, 1, 19), date(2026, 2, 16), date(2026, 4, 3),
+    date(2026, 5, 25), date(2026, 6, 19), date(2026, 7, 3), date(2026, 9, 7),
+    date(2026, 11, 26), date(2026, 12, 25),
+    # 2027
+    date(2027, 1, 1), date(2027, 1, 18), date(2027, 2, 15), date(2027, 3, 26),
+    date(2027, 5, 31), date(2027, 6, 18), date(2027, 7, 5), date(2027, 9, 6),
+    date(2027, 11, 25), date(2027, 12, 24),
+}
+
+SSE_HOLIDAYS = {
+    # 2025
+    date(2025, 1, 1), date(2025, 1, 28), date(2025, 1, 29), date(2025, 1, 30),
+    date(2025, 1, 31), date(2025, 2, 3), date(2025, 2, 4), date(2025, 4, 4),
+    date(2025, 5, 1), date(2025, 5, 2), date(2025, 5, 5), date(2025, 6, 2),
+    date(2025, 10, 1), date(2025, 10, 2), date(2025, 10, 3), date(2025, 10, 6),
+    date(2025, 10, 7), date(2025, 10, 8),
+    # 2026
+    date(2026, 1, 1), date(2026, 1, 2), date(2026, 2, 16), date(2026, 2, 17),
+    date(2026, 2, 18), date(2026, 2, 19), date(2026, 2, 20), date(2026, 2, 23),
+    date(2026, 4, 6), date(2026, 5, 1), date(2026, 5, 4), date(2026, 5, 5),
+    date(2026, 6, 19), date(2026, 9, 25), date(2026, 10, 1), date(2026, 10, 2),
+    date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 7),
+}
+
+HKEX_HOLIDAYS = {
+    # 2025
+    date(2025, 1, 1), date(2025, 1, 29), date(2025, 1, 30), date(2025, 1, 31),
+    date(2025, 4, 4), date(2025, 4, 18), date(2025, 4, 21), date(2025, 5, 1),
+    date(2025, 5, 5), date(2025, 7, 1), date(2025, 10, 1), date(2025, 10, 7),
+    date(2025, 10, 29), date(2025, 12, 25), date(2025, 12, 26),
+    # 2026
+    date(2026, 1, 1), date(2026, 2, 17), date(2026, 2, 18), date(2026, 2, 19),
+    date(2026, 4, 3), date(2026, 4, 6), date(2026, 4, 7), date(2026, 5, 1),
+    date(2026, 5, 25), date(2026, 6, 19), date(2026, 7, 1), date(2026, 10, 1),
+    date(2026, 10, 19), date(2026, 12, 25),
+}
+
+class TradingCalendar:
+    """Trading days and session closes for one exchange"""
+
+    def __init__(self, name, timezone, close_time, holidays, settle_minutes=30):
+        self.name = name
+        self.timezone = pytz.timezone(timezone)
+        self.close_time = close_time
+        self.holidays = holidays
+        # Daily bars are only final a little after the closing auction
+        self.settle = timedelta(minutes=settle_minutes)
+
+    def is_trading_day(self, day):
+        """Check if the exchange has a session on a (local) date"""
+        return day.weekday() < 5 and day not in self.holidays
+
+    def last_close(self, now=None):
+        """Return the most recent settled session close at or before `now` (aware datetime)"""
+        now = now or datetime.now(pytz.utc)
+        day = now.astimezone(self.timezone).date()
+
+        # Longest run of closures (e.g. Golden Week plus weekends) is well under 3 weeks
+        for _ in range(21):
+            if self.is_trading_day(day):
+                close = self.timezone.localize(datetime.combine(day, self.close_time)) + self.settle
+                if close <= now:
+                    return close
+            day -= timedelta(days=1)
+
+        return None
+
+    def has_closed_since(self, since, now=None):
+        """Check if a session has closed after the given aware datetime"""
+        last_close = self.last_close(now)
+        return last_close is None or last_close > since
+
+CALENDARS = {
+    'NYSE': TradingCalendar('NYSE', 'America/New_York', time(16, 0), NYSE_HOLIDAYS),
+    'SSE': TradingCalendar('SSE', 'Asia/Shanghai', time(15, 0), SSE_HOLIDAYS),
+    'HKEX': TradingCalendar('HKEX', 'Asia/Hong_Kong', time(16, 10), HKEX_HOLIDAYS),
+}
+
+# Tickers whose exchange can't be told from their suffix
+TICKER_EXCHANGES = {
+    '^HSI': 'HKEX',
+}
+
+def calendar_for_ticker(ticker):
+    """Get the trading calendar for a Yahoo Finance ticker (US listings by default)"""
+    exchange = TICKER_EXCHANGES.get(ticker)
+    if exchange is None:
+        if ticker.endswith(('.SS', '.SZ')):
+            exchange = 'SSE'  # Shenzhen follows the same holiday schedule
+        elif ticker.endswith('.HK'):
+            exchange = 'HKEX'
+        else:
+            exchange = 'NYSE'
+    return CALENDARS[exchange]
@@ -0,0 +1,85 @@
+import numpy as np
+
+# Price display formats by magnitude tier: >= 1000, >= 1, < 1
+PRICE_FORMATS = ('${:,.0f}', '${:,.2f}', '${:.4f}')
+
+class MarketSnapshot:
+    """Prices and percent changes for a group of assets, held as NumPy arrays
+
+    Changes, trend signs and price format tiers are computed for all assets in
+    one vectorized pass; rendering builds each line from those arrays and joins
+    them once.
+    """
+
+    def __init__(self, labels, prices, changes):
+        self.labels = list(labels)
+        self.prices = np.asarray(prices, dtype=np.float64)
+        self.changes = np.nan_to_num(np.asarray(changes, dtype=np.float64))
+
+    @classmethod
+    def from_quotes(cls, quotes):
+        """Build from {label: {'price': float, 'change': float}}"""
+        labels = list(quotes)
+        prices = np.fromiter((quotes[label]['price'] or 0.0 for label in labels), dtype=np.float64, count=len(labels))
+        changes = np.fromiter((quotes[label]['change'] or 0.0 for label in labels), dtype=np.float64, count=len(labels))
+        return cls(labels, prices, changes)
+
+    @classmethod
+    def from_closes(cls, labels, closes):
+        """
+        Build from the last two closes per asset
+
+        Args:
+            labels: Asset labels
+            closes: Array of shape (n, 2) with [previous, latest] closes; rows
+                containing NaN (not enough history) are dropped
+        """
+        closes = np.asarray(closes, dtype=np.float64).reshape(-1, 2)
+        valid = ~np.isnan(closes).any(axis=1) & (closes[:, 0] != 0)
+        closes = closes[valid]
+        changes = (closes[:, 1] - closes[:, 0]) / closes[:, 0] * 100
+        labels = [label for label, keep in zip(labels, valid) if keep]
+        return cls(labels, closes[:, 1], changes)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def head(self, count):
+        """Return a snapshot of the first `count` assets"""
+        return MarketSnapshot(self.labels[:count], self.prices[:count], self.changes[:count])
+
+    def trends(self):
+        """Trend symbol per asset ('+' for flat/up, '-' for down)"""
+        return np.where(self.changes >= 0, '+', '-')
+
+    def price_tiers(self):
+        """Index into PRICE_FORMATS per asset, chosen by price magnitude"""
+        return np.select([self.prices >= 1000, self.prices >= 1], [0, 1], default=2)
+
+    def formatted_prices(self):
+        """Display strings for all prices"""
+        return [PRICE_FORMATS[tier].format(price) for tier, price in zip(self.price_tiers().tolist(), self.prices.tolist())]
+
+    def formatted_changes(self):
+        """Display strings for all changes (e.g. '+1.2%')"""
+        return np.char.mod('%+.1f%%', self.changes).tolist()
+
+    def render_lines(self, with_price=False):
+        """Render one '<trend> <label>: [price (]change[)]' line per asset, joined by newlines"""
+        trends = self.trends().tolist()
+        changes = self.formatted_changes()
+
+        if with_price:
+            prices = self.formatted_prices()
+            lines = [f"{t} {label}: {p} ({c})" for t, label, p, c in zip(trends, self.labels, prices, changes)]
+        else:
+            lines = [f"{t} {label}: {c}" for t, label, c in zip(trends, self.labels, changes)]
+
+        return "\n".join(lines)
+
+    def to_dict(self):
+        """Convert back to {label: {'price': float, 'change': float}}"""
+        return {
+            label: {'price': price, 'change': change}
+            for label, price, change in zip(self.labels, self.prices.tolist(), self.changes.tolist())
+        }
@@ -0,0 +1,237 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.logger import setup_logger, get_log_context
+import config
+
+logger = setup_logger(__name__)
+
+# Histogram buckets in seconds (upstream calls take ~0.1s-30s, jobs up to JOB_TIMEOUT_SECONDS)
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+HELP = {
+    'job_duration_seconds': 'Post job wall time',
+    'job_runs_total': 'Post job runs by outcome',
+    'stage_duration_seconds': 'Pipeline stage wall time',
+    'stage_errors_total': 'Pipeline stages that raised',
+    'upstream_request_seconds': 'Upstream call latency (queue wait included)',
+    'upstream_requests_total': 'Upstream calls by outcome',
+    'job_peak_rss_bytes': 'Peak RSS of the process of the last run of a job (LOW_MEMORY)',
+    'process_peak_rss_bytes': 'Peak RSS of the scheduler process',
+    'stage_pool_tasks_total': 'Stage pool tasks by outcome (ok, error, timeout, broken, cancelled)',
+    'stage_pool_peak_rss_bytes': 'Largest peak RSS among the stage pool workers',
+}
+
+
+class Metrics:
+    """In-process counters, gauges and histograms in the Prometheus text format
+
+    Series are keyed by name plus labels; upstream calls are labelled with
+    the job and stage of the logging context, so a late post can be traced to
+    the stage and upstream (yfinance, NewsAPI, Groq, Google, X) that held it up.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+    def inc(self, name, value=1, **labels):
+        """Add to a counter"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """Set a gauge"""
+        key = self._key(name, labels)
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """Record a value (seconds) in a histogram"""
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall time of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    @contextmanager
+    def track(self, upstream, operation):
+        """
+        Time an upstream call and count it by outcome ('ok' or 'error')
+
+        Args:
+            upstream: Service name, e.g. 'groq', 'google', 'x', 'yfinance'
+            operation: Call made, e.g. 'complete', 'create_tweet'
+        """
+        context = get_log_context()
+        labels = {'upstream': upstream, 'operation': operation, 'job': context.get('job'), 'stage': context.get('stage')}
+        outcome = 'error'
+        start = time.perf_counter()
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.observe('upstream_request_seconds', time.perf_counter() - start, **labels)
+            self.inc('upstream_requests_total', outcome=outcome, **labels)
+
+    def values(self, name):
+        """
+        Current values of every series of a metric
+
+        Returns:
+            List of (labels dict, value); value is the count for counters and
+            (count, sum) for histograms
+        """
+        with self._lock:
+            series = [(labels, value) for (key, labels), value in self._counters.items() if key == name]
+            series += [(labels, value) for (key, labels), value in self._gauges.items() if key == name]
+            series += [(labels, (count, total)) for (key, labels), (_, count, total) in self._histograms.items() if key == name]
+        return [(dict(labels), value) for labels, value in series]
+
+    def export(self):
+        """Every series as JSON-serializable data (to hand to another process's merge())"""
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, labels, list(buckets), count, total] for (name, labels), (buckets, count, total) in self._histograms.items()],
+            }
+
+    def merge(self, exported):
+        """Add the series of export() (e.g. from a job subprocess) into this registry"""
+        with self._lock:
+            for name, labels, value in exported['counters']:
+                key = (name, tuple(map(tuple, labels)))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, value in exported['gauges']:
+                self._gauges[(name, tuple(map(tuple, labels)))] = value
+            for name, labels, buckets, count, total in exported['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+                histogram[0] = [mine + theirs for mine, theirs in zip(histogram[0], buckets)]
+                histogram[1] += count
+                histogram[2] += total
+
+    def render(self):
+        """Return every series in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted((key, (list(buckets), count, total)) for key, (buckets, count, total) in self._histograms.items())
+
+        def series(name, labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return name
+            return name + '{' + ','.join('%s="%s"' % (key, value.replace('\\', '\\\\').replace('"', '\\"')) for key, value in pairs) + '}'
+
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{series(name, labels)} {value}")
+
+        for (name, labels), value in gauges:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{series(name, labels)} {value}")
+
+        for (name, labels), (buckets, count, total) in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                lines.append(f"{series(name + '_bucket', labels, [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{series(name + '_bucket', labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{series(name + '_sum', labels)} {total:.6f}")
+            lines.append(f"{series(name + '_count', labels)} {count}")
+
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path=None):
+        """Write the metrics for node_exporter's textfile collector (atomically)"""
+        path = path or config.METRICS_TEXTFILE
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w') as f:
+                f.write(self.render())
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.error("Metrics textfile write error: %s", e)
+
+    def serve(self, port=None):
+        """Serve GET /metrics on a daemon thread (port 0 or unset: disabled)"""
+        port = port if port is not None else config.METRICS_PORT
+        if not port or self._server is not None:
+            return
+
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the bot's log
+
+        try:
+            self._server = ThreadingHTTPServer(('0.0.0.0', port), Handler)
+        except OSError as e:
+            logger.error("Metrics endpoint not started on port %s: %s", port, e)
+            return
+        threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True).start()
+        logger.info("Metrics endpoint on :%s/metrics", port)
+
+    def flush(self):
+        """Write the textfile (if configured); called after jobs and at shutdown"""
+        self.write_textfile()
+
+# Global metrics instance
+metrics = Metrics()
@@ -0,0 +1,151 @@
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.logger import setup_logger, log_context
+from utils.job_runtime import current_run, JobCancelled
+from utils.profiling import profile_thread
+from utils.metrics import metrics
+import config
+
+logger = setup_logger(__name__)
+
+# Shared by all pipelines; stages are I/O bound (HTTP, Groq, X), so threads
+# suffice (their CPU-heavy parts go to the stage pool, utils/process_pool.py)
+_executor = ThreadPoolExecutor(max_workers=config.PIPELINE_WORKERS, thread_name_prefix='stage')
+
+class Stage:
+    """One named step of a pipeline and the stages it depends on"""
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self):
+        """Wall time in seconds (None until the stage has finished)"""
+        if self.started is None or self.finished is None:
+            return None
+        return self.finished - self.started
+
+
+class Pipeline:
+    """Run named stages as a dependency graph
+
+    Each stage starts as soon as all of its dependencies have finished and is
+    called with their results as keyword arguments, so independent stages
+    (e.g. the Groq call and the chart render) run concurrently.
+
+    Example:
+        pipeline = Pipeline('texas_markets')
+        pipeline.add('sentiment', module.get_fear_greed_index)
+        pipeline.add('markets', module.get_us_markets)
+        pipeline.add('main', format_main, deps=['sentiment', 'markets'])
+        results = pipeline.run()
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+
+    def add(self, name, func, deps=()):
+        """Register a stage; dependencies must already be registered"""
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+        self.stages[name] = Stage(name, func, deps)
+        return self
+
+    def _run_stage(self, stage, results):
+        stage.started = time.perf_counter()
+        try:
+            with log_context(stage=stage.name), profile_thread(stage.name):
+                return stage.func(**{dep: results[dep] for dep in stage.deps})
+        except Exception:
+            metrics.inc('stage_errors_total', job=self.name, stage=stage.name)
+            raise
+        finally:
+            stage.finished = time.perf_counter()
+            metrics.observe('stage_duration_seconds', stage.finished - stage.started, job=self.name, stage=stage.name)
+
+    def run(self):
+        """
+        Run all stages and return {stage name: result}
+
+        The first stage exception is re-raised after in-flight stages finish;
+        stages that depend on a failed stage are not started. Inside the job
+        runtime, no stage is started once the job is cancelled or past its
+        deadline (JobCancelled is raised instead).
+        """
+        self._start = time.perf_counter()
+        job_run = current_run()
+        results = {}
+        pending = dict(self.stages)
+        running = {}
+        error = None
+
+        while pending or running:
+            if error is None and job_run is not None:
+                try:
+                    job_run.check()
+                except JobCancelled as e:
+                    logger.error("[%s] %s; not starting: %s", self.name, e, ', '.join(pending) or 'nothing')
+                    error = e
+
+            if error is None:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        # Stages see the job's context (current_run() for checkpoints and cancellation)
+                        running[_executor.submit(contextvars.copy_context().run, self._run_stage, stage, results)] = stage
+                        del pending[name]
+
+            if not running:
+                break
+
+            # Wake up at the job deadline to stop starting stages
+            timeout = job_run.remaining() if job_run is not None and error is None else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    results[stage.name] = future.result()
+                except Exception as e:
+                    logger.error("[%s] Stage '%s' failed: %s", self.name, stage.name, e)
+                    error = error or e
+
+        self.log_timings()
+
+        if error is not None:
+            raise error
+        return results
+
+    def critical_path(self):
+        """Return the chain of stages that determined the pipeline's end time"""
+        finished = [stage for stage in self.stages.values() if stage.finished is not None]
+        if not finished:
+            return []
+
+        path = [max(finished, key=lambda stage: stage.finished)]
+        while path[-1].deps:
+            deps = [self.stages[dep] for dep in path[-1].deps if self.stages[dep].finished is not None]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda stage: stage.finished))
+
+        return list(reversed(path))
+
+    def log_timings(self):
+        """Log per-stage timings (start offset + duration) and the critical path"""
+        timings = []
+        for stage in self.stages.values():
+            if stage.duration is not None:
+                offset = (stage.started - self._start) * 1000
+                timings.append(f"{stage.name} +{offset:.0f}ms/{stage.duration * 1000:.0f}ms")
+
+        path = self.critical_path()
+        total = (path[-1].finished - self._start) if path else 0.0
+
+        logger.info("[%s] Stages: %s", self.name, ', '.join(timings))
+        logger.info("[%s] Critical path (%.2fs): %s", self.name, total, ' -> '.join(stage.name for stage in path))
@@ -0,0 +1,70 @@
+import os
+import json
+import time
+import shutil
+from pathlib import Path
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+# Days of plans kept on disk (for looking back at what was planned)
+KEEP_DAYS = 7
+
+class PlanStore:
+    """Ready-to-post plans from the daily plan, one per (job id, run date)
+
+    Each plan is a JSON file (main tweet, replies, the source data it was
+    built from and when) in a directory per run date, next to its chart.
+    """
+
+    def __init__(self, plan_dir):
+        self.plan_dir = Path(plan_dir)
+
+    def path(self, job_id, run_date, suffix='.json'):
+        return self.plan_dir / run_date / f"{job_id}{suffix}"
+
+    def save(self, job_id, run_date, plan):
+        """Write a plan (atomically: a post starting meanwhile sees the old one or the new one)"""
+        path = self.path(job_id, run_date)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+
+    def save_chart(self, job_id, run_date, chart_path):
+        """
+        Copy a rendered chart next to the plan (the renderer reuses its file names)
+
+        Returns:
+            Path of the copy
+        """
+        path = self.path(job_id, run_date, '.png')
+        path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(chart_path, path)
+        return str(path)
+
+    def load(self, job_id, run_date):
+        """Return a post's plan for a run date, or None"""
+        path = self.path(job_id, run_date)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Error reading plan %s: %s", path, e)
+            return None
+
+    def prune(self, keep_days=KEEP_DAYS):
+        """Delete the plans of run dates older than keep_days"""
+        if not self.plan_dir.is_dir():
+            return
+        cutoff = time.strftime('%Y-%m-%d', time.localtime(time.time() - keep_days * 86400))
+        for day in self.plan_dir.iterdir():
+            if day.is_dir() and day.name < cutoff:
+                shutil.rmtree(day, ignore_errors=True)
+
+# Global plan store instance
+plan_store = PlanStore(config.DAILY_PLAN_DIR)
@@ -0,0 +1,185 @@
+import os
+import time
+from pathlib import Path
+import numpy as np
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+# One fixed-width record per bar: POSIX timestamp (seconds, UTC) and close price
+RECORD = np.dtype([('ts', '<f8'), ('close', '<f8')])
+
+class PriceHistoryStore:
+    """Append-only local price history, one binary record file per symbol
+
+    Files are read through np.memmap, so loading a symbol's history costs no
+    parsing and only touches the pages that are actually used.
+    """
+
+    def __init__(self, data_dir=None, max_records=None):
+        self.data_dir = Path(data_dir or config.PRICE_HISTORY_DIR)
+        self.max_records = max_records or config.PRICE_HISTORY_MAX_RECORDS
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+
+    def _get_file(self, symbol):
+        """Get the record file path for a symbol"""
+        safe_symbol = "".join(c if c.isalnum() or c in ['_', '-'] else '_' for c in symbol)
+        return self.data_dir / f"{safe_symbol}.bin"
+
+    def load(self, symbol):
+        """Return a read-only record array (fields 'ts' and 'close') for a symbol"""
+        path = self._get_file(symbol)
+        try:
+            if path.stat().st_size < RECORD.itemsize:
+                return np.empty(0, dtype=RECORD)
+            return np.memmap(path, dtype=RECORD, mode='r')
+        except FileNotFoundError:
+            return np.empty(0, dtype=RECORD)
+        except Exception as e:
+            logger.error("Price history read error for %s: %s", symbol, e)
+            return np.empty(0, dtype=RECORD)
+
+    def last(self, symbol):
+        """Return the most recent (timestamp, close) for a symbol, or None"""
+        path = self._get_file(symbol)
+        try:
+            size = path.stat().st_size
+            if size < RECORD.itemsize:
+                return None
+            with open(path, 'rb') as f:
+                f.seek(size - size % RECORD.itemsize - RECORD.itemsize)
+                record = np.frombuffer(f.read(RECORD.itemsize), dtype=RECORD)[0]
+            return float(record['ts']), float(record['close'])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Price history read error for %s: %s", symbol, e)
+            return None
+
+    def last_timestamp(self, symbol):
+        """Return the timestamp of the most recent stored bar, or None"""
+        last = self.last(symbol)
+        return last[0] if last else None
+
+    def append(self, symbol, timestamps, closes):
+        """
+        Append bars newer than the last stored one
+
+        A bar with the same timestamp as the last stored bar replaces it, so a
+        still-forming daily bar can be refreshed on the next fetch.
+
+        Returns:
+            Number of records written
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        closes = np.asarray(closes, dtype=np.float64)
+        valid = ~np.isnan(closes)
+        timestamps, closes = timestamps[valid], closes[valid]
+        if timestamps.size == 0:
+            return 0
+
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, closes = timestamps[order], closes[order]
+
+        path = self._get_file(symbol)
+        last_ts = self.last_timestamp(symbol)
+        replace_last = False
+
+        if last_ts is not None:
+            keep = timestamps >= last_ts
+            timestamps, closes = timestamps[keep], closes[keep]
+            if timestamps.size and timestamps[0] == last_ts:
+                replace_last = True
+
+        if timestamps.size == 0:
+            return 0
+
+        records = np.empty(timestamps.size, dtype=RECORD)
+        records['ts'] = timestamps
+        records['close'] = closes
+
+        try:
+            with open(path, 'r+b' if replace_last else 'ab') as f:
+                if replace_last:
+                    size = f.seek(0, os.SEEK_END)
+                    f.seek(size - size % RECORD.itemsize - RECORD.itemsize)
+                    f.truncate()
+                f.write(records.tobytes())
+
+            if path.stat().st_size > 2 * self.max_records * RECORD.itemsize:
+                self.compact(symbol)
+
+            logger.debug("Price history: %s +%s bars", symbol, records.size)
+            return int(records.size)
+
+        except Exception as e:
+            logger.error("Price history write error for %s: %s", symbol, e)
+            return 0
+
+    def append_price(self, symbol, price, timestamp=None):
+        """Append a single spot price (e.g. a CoinGecko quote) at the given/current time"""
+        return self.append(symbol, [timestamp or time.time()], [price])
+
+    def compact(self, symbol):
+        """Keep only the newest max_records bars for a symbol"""
+        records = np.array(self.load(symbol)[-self.max_records:])
+        path = self._get_file(symbol)
+        tmp_path = path.with_suffix('.tmp')
+        try:
+            records.tofile(tmp_path)
+            os.replace(tmp_path, path)
+            logger.info("Price history compacted: %s (%s bars)", symbol, records.size)
+        except Exception as e:
+            logger.error("Price history compaction error for %s: %s", symbol, e)
+
+    def closes(self, symbol, limit=None):
+        """Return stored closes (oldest first), optionally only the newest `limit`"""
+        records = self.load(symbol)
+        if limit:
+            records = records[-limit:]
+        return np.array(records['close'])
+
+    def bar_change(self, symbol):
+        """
+        Latest close and percent change from the previous stored bar
+
+        Returns:
+            (close, change_pct) or None if fewer than two bars are stored
+        """
+        closes = self.closes(symbol, limit=2)
+        if closes.size < 2 or closes[0] == 0:
+            return None
+        return float(closes[1]), float((closes[1] - closes[0]) / closes[0] * 100)
+
+    def change(self, symbol, days=1):
+        """
+        Percent change from the close at least `days` before the latest bar
+
+        Returns:
+            Percent change, or None if the store doesn't reach back that far
+        """
+        records = self.load(symbol)
+        if records.size < 2:
+            return None
+
+        cutoff = records['ts'][-1] - days * 86400
+        # Allow a few hours of slack: daily bars don't land at identical times of day
+        index = np.searchsorted(records['ts'], cutoff + 6 * 3600, side='right') - 1
+        if index < 0 or index >= records.size - 1:
+            return None
+
+        base = records['close'][index]
+        if base == 0:
+            return None
+        return float((records['close'][-1] - base) / base * 100)
+
+    def moving_average(self, symbol, window):
+        """Simple moving average of the newest `window` closes, or None"""
+        closes = self.closes(symbol, limit=window)
+        if closes.size < window:
+            return None
+        return float(closes.mean())
+
+# Global price history store
+price_store = PriceHistoryStore()
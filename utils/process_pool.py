@@ -0,0 +1,331 @@
+import os
+import sys
+import time
+import signal
+import tempfile
+import threading
+import itertools
+import subprocess
+from pathlib import Path
+from multiprocessing.connection import Connection
+import numpy as np
+from utils.logger import setup_logger, get_log_context, log_context
+from utils.job_runtime import current_run
+from utils.metrics import metrics
+import config
+
+logger = setup_logger(__name__)
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# How often a caller waiting on a task checks its job's cancel flag / deadline
+POLL_SECONDS = 0.2
+
+# Array results are handed back in RAM-backed files (tmpfs), not through the pipe
+SHARED_DIR = Path('/dev/shm') if os.path.isdir('/dev/shm') else Path(tempfile.gettempdir())
+
+class SharedArray:
+    """A NumPy array a worker left in a shared memory file (path, shape, dtype)"""
+
+    _ids = itertools.count()
+
+    def __init__(self, path, shape, dtype):
+        self.path = path
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def share(cls, array):
+        """Write an array to a new shared memory file (worker side)"""
+        path = SHARED_DIR / f"stage-pool-{os.getpid()}-{next(cls._ids)}"
+        mapped = np.memmap(path, dtype=array.dtype, mode='w+', shape=array.shape)
+        mapped[...] = array
+        mapped.flush()
+        del mapped
+        return cls(str(path), array.shape, array.dtype)
+
+    def take(self):
+        """Copy the array out and delete the file (caller side)"""
+        try:
+            return np.array(np.memmap(self.path, dtype=self.dtype, mode='r', shape=self.shape))
+        finally:
+            os.unlink(self.path)
+
+
+def warm_worker():
+    """Load yfinance/pandas and the chart template once per worker, not per task"""
+    import yfinance  # noqa: F401
+    from utils.chart_renderer import chart_renderer
+    chart_renderer.warm_up()
+
+
+class _Worker:
+    """One `python -m utils.process_pool` process and its task pipes"""
+
+    def __init__(self, initializers, timeout):
+        task_read, task_write = os.pipe()
+        result_read, result_write = os.pipe()
+        env = {
+            **os.environ,
+            'PYTHONPATH': os.pathsep.join(filter(None, [str(ROOT), os.environ.get('PYTHONPATH')])),
+            'METRICS_PORT': '0',
+            'METRICS_TEXTFILE': '',
+        }
+        try:
+            # Own session: a Ctrl+C meant for the scheduler doesn't hit a task
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'utils.process_pool', str(task_read), str(result_write)],
+                cwd=os.getcwd(), env=env, pass_fds=(task_read, result_write), start_new_session=True
+            )
+        finally:
+            os.close(task_read)
+            os.close(result_write)
+        self.tasks = Connection(task_write, readable=False)
+        self.results = Connection(result_read, writable=False)
+        self.completed = 0
+
+        self.tasks.send(initializers)
+        if not self.results.poll(timeout):
+            self.kill()
+            raise TimeoutError(f"stage pool worker not ready after {timeout}s")
+        self.results.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.close()
+
+    def close(self):
+        """Close the pipes (the worker exits at the end of its input)"""
+        for connection in (self.tasks, self.results):
+            try:
+                connection.close()
+            except OSError:
+                pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+class StagePool:
+    """Persistent worker processes for the CPU-heavy, GIL-bound parts of stages
+
+    yfinance/pandas parsing and chart rendering run here instead of in the
+    scheduler process, so they don't hold the GIL over the posting threads and
+    their memory stays in the workers. Workers are warmed (imports, chart
+    template) as they start and replaced after max_tasks_per_child tasks so
+    leaks can't build up. A task running past `timeout` gets its worker
+    killed and replaced; the caller gets a TimeoutError. With workers=0 tasks
+    run inline in the calling thread.
+
+    Tasks must be module-level functions with picklable arguments. NumPy
+    array results come back through shared memory, not the result pipe.
+    """
+
+    def __init__(self, name, workers, timeout, max_tasks_per_child, initializers=()):
+        self.name = name
+        self.workers = workers
+        self.timeout = timeout
+        self.max_tasks_per_child = max_tasks_per_child
+        self.initializers = list(initializers)
+        self._idle = []
+        self._started = 0  # Workers alive or starting
+        self._closed = False
+        self._available = threading.Condition()
+
+    def add_initializer(self, func, *args):
+        """Run func(*args) in every worker as it starts (call before the first task)"""
+        self.initializers.append((func, args))
+
+    def warm_up(self):
+        """Start every worker now rather than on the first task"""
+        if not self.workers:
+            return
+        start = time.perf_counter()
+        try:
+            with self._available:
+                missing = self.workers - self._started
+                self._started += missing
+            for _ in range(missing):
+                self._start_worker()
+            logger.info("Stage pool '%s': %s worker(s) ready in %.1fs", self.name, self.workers, time.perf_counter() - start)
+        except Exception as e:
+            logger.error("Stage pool '%s' warm-up error: %s", self.name, e)
+
+    def _start_worker(self):
+        """Start a worker into the idle list (its slot is already counted in _started)"""
+        try:
+            worker = _Worker(self.initializers, self.timeout)
+        except Exception:
+            with self._available:
+                self._started -= 1
+                self._available.notify()
+            raise
+        with self._available:
+            self._idle.append(worker)
+            self._available.notify()
+
+    def _acquire(self, job_run, deadline):
+        """Take an idle worker, starting one if the pool isn't full"""
+        while True:
+            with self._available:
+                if self._idle:
+                    return self._idle.pop()
+                if self._closed:
+                    raise RuntimeError(f"stage pool '{self.name}' is shut down")
+                start = self._started < self.workers
+                if start:
+                    self._started += 1
+                else:
+                    if job_run is not None:
+                        job_run.check()
+                    if time.monotonic() >= deadline:
+                        raise TimeoutError(f"no stage pool worker free within {self.timeout}s")
+                    self._available.wait(POLL_SECONDS)
+            if start:
+                self._start_worker()
+
+    def _release(self, worker, healthy):
+        """Return a worker to the pool, or retire it and start a replacement in the background"""
+        worker.completed += 1
+        if healthy and worker.completed < self.max_tasks_per_child and not self._closed:
+            with self._available:
+                self._idle.append(worker)
+                self._available.notify()
+            return
+
+        if healthy:
+            worker.close()
+        else:
+            worker.kill()
+        if self._closed:
+            with self._available:
+                self._started -= 1
+            return
+        threading.Thread(target=self._replace, name=f"{self.name}-respawn", daemon=True).start()
+
+    def _replace(self):
+        try:
+            self._start_worker()
+        except Exception as e:
+            logger.error("Stage pool '%s': replacement worker failed to start: %s", self.name, e)
+
+    def call(self, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) in a worker and wait for the result
+
+        Inside the job runtime, waiting stops when the job is cancelled or
+        past its deadline (JobCancelled; the worker is replaced).
+
+        Returns:
+            func's result
+
+        Raises:
+            TimeoutError: The task ran past the pool's timeout (its worker was killed)
+            RuntimeError: The worker died running the task
+            JobCancelled: The job was cancelled while waiting
+        """
+        if not self.workers:
+            return func(*args, **kwargs)
+
+        task = getattr(func, '__name__', str(func))
+        job_run = current_run()
+        deadline = time.monotonic() + self.timeout
+        worker = self._acquire(job_run, deadline)
+        outcome = 'error'
+        healthy = False
+        try:
+            worker.tasks.send((func, args, kwargs, get_log_context()))
+            while not worker.results.poll(POLL_SECONDS):
+                if job_run is not None and job_run.cancelled:
+                    outcome = 'cancelled'
+                    job_run.check()
+                if time.monotonic() >= deadline:
+                    outcome = 'timeout'
+                    logger.warning("Stage pool '%s': %s ran past %ss, killing its worker", self.name, task, self.timeout)
+                    raise TimeoutError(f"{task} ran past the stage pool timeout ({self.timeout}s)")
+            outcome, result = worker.results.recv()
+            healthy = True
+            if isinstance(result, SharedArray):
+                result = result.take()
+        except (EOFError, OSError):
+            outcome = 'broken'
+            raise RuntimeError(f"stage pool worker died running {task}")
+        finally:
+            self._release(worker, healthy)
+            metrics.inc('stage_pool_tasks_total', pool=self.name, task=task, outcome=outcome)
+
+        if outcome != 'ok':
+            raise result
+        return result
+
+    def peak_rss_bytes(self):
+        """Largest peak RSS among the idle workers (Linux /proc), or None"""
+        with self._available:
+            pids = [worker.process.pid for worker in self._idle]
+        peaks = []
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/status", 'r') as f:
+                    for line in f:
+                        if line.startswith('VmHWM:'):
+                            peaks.append(int(line.split()[1]) * 1024)
+            except (OSError, ValueError):
+                continue
+        return max(peaks) if peaks else None
+
+    def shutdown(self):
+        """Stop the idle workers; busy ones are stopped when their task returns"""
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._started -= len(idle)
+            self._available.notify_all()
+        for worker in idle:
+            worker.close()
+
+
+def main():
+    """Worker side: run the initializers, then tasks until the pool closes the pipe"""
+    tasks = Connection(int(sys.argv[1]), writable=False)
+    results = Connection(int(sys.argv[2]), readable=False)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    for func, args in tasks.recv():
+        try:
+            func(*args)
+        except Exception as e:
+            logger.error("Stage pool worker init error (%s): %s", getattr(func, '__name__', func), e)
+    results.send('ready')
+
+    while True:
+        try:
+            func, args, kwargs, context = tasks.recv()
+        except EOFError:
+            break
+        try:
+            with log_context(**context):
+                result = func(*args, **kwargs)
+            if isinstance(result, np.ndarray) and result.nbytes:
+                result = SharedArray.share(result)
+            results.send(('ok', result))
+        except Exception as e:
+            try:
+                results.send(('error', e))
+            except Exception:
+                # The exception itself doesn't pickle
+                results.send(('error', RuntimeError(f"{type(e).__name__}: {e}")))
+
+# Global stage pool instance (workers start on first use or warm_up())
+stage_pool = StagePool(
+    'stages',
+    workers=config.STAGE_PROCESS_WORKERS,
+    timeout=config.STAGE_PROCESS_TIMEOUT_SECONDS,
+    max_tasks_per_child=config.STAGE_PROCESS_MAX_TASKS,
+    initializers=[(warm_worker, ())]
+)
+
+if __name__ == '__main__':
+    # Through the imported module, so results pickle as utils.process_pool.SharedArray
+    from utils.process_pool import main
+    main()
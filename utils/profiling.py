@@ -0,0 +1,236 @@
+import io
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import contextvars
+from pathlib import Path
+from datetime import datetime
+from contextlib import contextmanager
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+# The JobProfile of the job running in this context (pipeline stages inherit it)
+_current_profile = contextvars.ContextVar('current_profile', default=None)
+
+# Jobs profiled at the same time share tracemalloc: it is started by the first
+# and stopped after the last (and never if it was already on), under this lock
+_tracing_lock = threading.Lock()
+_tracing_jobs = 0
+_started_tracing = False
+
+def _start_tracing():
+    global _tracing_jobs, _started_tracing
+    with _tracing_lock:
+        if _tracing_jobs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(config.PROFILE_TRACEMALLOC_FRAMES)
+            _started_tracing = True
+        _tracing_jobs += 1
+        tracemalloc.reset_peak()
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+
+def _stop_tracing():
+    """
+    Release a job's hold on tracemalloc
+
+    Returns:
+        (snapshot, current, peak) of the traced memory, or None if tracing was
+        turned off meanwhile (e.g. by other code)
+    """
+    global _tracing_jobs, _started_tracing
+    with _tracing_lock:
+        traced = None
+        if tracemalloc.is_tracing():
+            # Leave out the profiler's own allocations (sampled stacks)
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, __file__)])
+            traced = (snapshot, *tracemalloc.get_traced_memory())
+        _tracing_jobs = max(_tracing_jobs - 1, 0)
+        if _tracing_jobs == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+        return traced
+
+class JobProfile:
+    """Profile of one job run, collected from every thread that works on it
+
+    mode 'cprofile' runs a deterministic profiler in the job's thread and in
+    each pipeline stage and merges them; 'sample' records the stacks of those
+    threads every PROFILE_SAMPLE_INTERVAL_MS (much cheaper, coarser). With
+    tracemalloc on, allocations made during the run are diffed too.
+    """
+
+    def __init__(self, job_id, mode='cprofile', trace_memory=True, output_dir=None):
+        self.job_id = job_id
+        self.mode = mode
+        self.trace_memory = trace_memory
+        self.output_dir = Path(output_dir or config.PROFILE_DIR)
+        self.started_at = datetime.now()
+        self._stats = None
+        self._samples = {}
+        self._threads = {}  # thread id -> label, for the sampler
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._snapshot = None
+
+    @contextmanager
+    def thread(self, label):
+        """Profile the calling thread for the duration of the block"""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._threads[thread_id] = label
+
+        profiler = None
+        if self.mode == 'cprofile':
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                logger.warning("[%s] Not profiling %s: %s", self.job_id, label, e)
+                profiler = None
+
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    if self._stats is None:
+                        self._stats = pstats.Stats(profiler)
+                    else:
+                        self._stats.add(profiler)
+            with self._lock:
+                self._threads.pop(thread_id, None)
+
+    def _sample(self):
+        interval = config.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            with self._lock:
+                threads = dict(self._threads)
+            frames = sys._current_frames()
+            for thread_id, label in threads.items():
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ';'.join([label] + stack[::-1])
+                self._samples[key] = self._samples.get(key, 0) + 1
+
+    def start(self):
+        if self.trace_memory:
+            self._snapshot = _start_tracing()
+
+        if self.mode == 'sample':
+            self._sampler = threading.Thread(target=self._sample, name=f"sampler-{self.job_id}", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Stop collecting and write the reports
+
+        Returns:
+            List of report paths
+        """
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+
+        allocations = None
+        if self._snapshot is not None:
+            traced = _stop_tracing()
+            if traced is None:
+                logger.warning("[%s] tracemalloc was stopped during the run, no allocation report", self.job_id)
+            else:
+                snapshot, current, peak = traced
+                allocations = (snapshot.compare_to(self._snapshot, 'lineno'), current, peak)
+
+        try:
+            return self._write(allocations)
+        except Exception as e:
+            logger.error("[%s] Profile report write error: %s", self.job_id, e)
+            return []
+
+    def _write(self, allocations):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"{self.job_id}-{self.started_at:%Y%m%d-%H%M%S}"
+        paths = []
+
+        if self._stats is not None:
+            self._stats.dump_stats(f"{base}.prof")
+            report = io.StringIO()
+            self._stats.stream = report
+            self._stats.sort_stats('cumulative').print_stats(config.PROFILE_TOP_N)
+            Path(f"{base}-cprofile.txt").write_text(report.getvalue())
+            paths += [f"{base}.prof", f"{base}-cprofile.txt"]
+
+        if self._samples:
+            # Collapsed stacks: feed to flamegraph.pl or speedscope
+            lines = [f"{stack} {count}" for stack, count in sorted(self._samples.items(), key=lambda item: -item[1])]
+            Path(f"{base}-samples.txt").write_text('\n'.join(lines) + '\n')
+            paths.append(f"{base}-samples.txt")
+
+        if allocations is not None:
+            diff, current, peak = allocations
+            lines = [
+                f"Job {self.job_id}, started {self.started_at:%Y-%m-%d %H:%M:%S}",
+                f"Traced memory: {current / 1024 / 1024:.1f} MiB now, {peak / 1024 / 1024:.1f} MiB peak during the run",
+                "(tracemalloc is process-wide: jobs running at the same time are included)",
+                "",
+                f"Top {config.PROFILE_TOP_N} allocation changes by line:"
+            ]
+            lines += [str(stat) for stat in diff[:config.PROFILE_TOP_N]]
+            Path(f"{base}-alloc.txt").write_text('\n'.join(lines) + '\n')
+            paths.append(f"{base}-alloc.txt")
+
+        return paths
+
+
+def profile_mode(job_id, flag=None):
+    """
+    Profiling mode for a job: its own 'profile' flag, else PROFILE_JOBS
+
+    Args:
+        job_id: Job id
+        flag: The job's 'profile' setting (True, 'cprofile', 'sample' or None)
+
+    Returns:
+        'cprofile', 'sample' or None (not profiled)
+    """
+    if flag:
+        return flag if flag in ('cprofile', 'sample') else config.PROFILE_MODE
+    if 'all' in config.PROFILE_JOBS or job_id in config.PROFILE_JOBS:
+        return config.PROFILE_MODE
+    return None
+
+
+def profiled(job_id, func, mode):
+    """Wrap a job function so each run is profiled and its reports written"""
+    def run():
+        profile = JobProfile(job_id, mode=mode, trace_memory=config.PROFILE_TRACEMALLOC)
+        token = _current_profile.set(profile)
+        profile.start()
+        start = time.perf_counter()
+        try:
+            with profile.thread('job'):
+                return func()
+        finally:
+            _current_profile.reset(token)
+            paths = profile.stop()
+            logger.info("[%s] Profiled run (%s, %.1fs): %s", job_id, mode, time.perf_counter() - start, ', '.join(paths) or 'no reports')
+    return run
+
+
+@contextmanager
+def profile_thread(label):
+    """Include the calling thread in the current job's profile (no-op when not profiling)"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    with profile.thread(label):
+        yield
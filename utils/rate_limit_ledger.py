@@ -0,0 +1,72 @@
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+class RateLimitLedger:
+    """Per-account record of tweets posted and X rate-limit blocks (SQLite)
+
+    Every account gets its own daily and monthly tweet budget, and an account
+    X answered with 429 is held until the reset time X sent, instead of
+    sleeping inside a job. Kept next to the run ledger so it survives restarts.
+    """
+
+    def __init__(self, db_path, max_per_day, max_per_month):
+        self.max_per_day = max_per_day
+        self.max_per_month = max_per_month
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tweets_posted (account TEXT NOT NULL, posted_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tweets_posted_account ON tweets_posted (account, posted_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS rate_limit_blocks (account TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    def count(self, account, seconds):
+        """Tweets the account posted in the last `seconds`"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM tweets_posted WHERE account = ? AND posted_at >= ?",
+                (account, time.time() - seconds)
+            ).fetchone()
+        return row[0]
+
+    def check(self, account):
+        """
+        Check if the account may post another tweet now
+
+        Returns:
+            None if it may, else the reason it may not
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT until FROM rate_limit_blocks WHERE account = ?", (account,)).fetchone()
+        if row and row[0] > time.time():
+            return f"rate limited by X for {row[0] - time.time():.0f}s more"
+
+        if self.count(account, 86400) >= self.max_per_day:
+            return f"daily limit of {self.max_per_day} tweets reached"
+        if self.count(account, 30 * 86400) >= self.max_per_month:
+            return f"monthly limit of {self.max_per_month} tweets reached"
+        return None
+
+    def record(self, account):
+        """Count a tweet the account just posted"""
+        with self._lock:
+            self._conn.execute("INSERT INTO tweets_posted (account, posted_at) VALUES (?, ?)", (account, time.time()))
+
+    def block(self, account, until):
+        """Hold the account until a unix time (the reset X sent with a 429)"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO rate_limit_blocks (account, until) VALUES (?, ?) "
+                "ON CONFLICT (account) DO UPDATE SET until = MAX(until, excluded.until)",
+                (account, until)
+            )
+        logger.warning("[%s] Rate limited until %s", account, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(until)))
+
+# Global rate-limit ledger instance
+rate_limit_ledger = RateLimitLedger(config.SCHEDULER_DB_PATH, config.MAX_TWEETS_PER_DAY, config.MAX_TWEETS_PER_MONTH)
@@ -0,0 +1,66 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+class RequestQueue:
+    """Bounded request queue in front of a model backend
+
+    `workers` threads (started on first use) take jobs in order, so a local
+    model serves one request at a time while a hosted API can serve several.
+    Submitting to a full queue fails fast instead of piling up work behind a
+    slow model.
+
+    Example:
+        requests = RequestQueue('llm', workers=1, maxsize=12, timeout=120)
+        text = requests.call(backend.complete, messages)
+    """
+
+    def __init__(self, name, workers, maxsize, timeout=None):
+        self.name = name
+        self.workers = workers
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            future, func, args, kwargs = self._queue.get()
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(*args, **kwargs))
+                    except Exception as e:
+                        future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Queue func(*args, **kwargs) to run on a worker
+
+        Returns:
+            concurrent.futures.Future with the result
+
+        Raises:
+            RuntimeError: If the queue is full
+        """
+        self._ensure_workers()
+        future = Future()
+        try:
+            self._queue.put_nowait((future, func, args, kwargs))
+        except queue.Full:
+            raise RuntimeError(f"{self.name} request queue is full ({self.maxsize} pending)")
+        return future
+
+    def call(self, func, *args, **kwargs):
+        """Queue a job and wait for its result (up to `timeout` seconds)"""
+        return self.submit(func, *args, **kwargs).result(timeout=self.timeout)
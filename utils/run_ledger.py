@@ -0,0 +1,114 @@
+import time
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+class RunLedger:
+    """Durable record of post runs: one row per (job id, run date)
+
+    A post counts as done for the day once its row is 'completed', so a run
+    is never repeated after a restart; 'running' rows left by a process that
+    died mid-run are picked up again by catch-up. A thread stopped halfway
+    keeps a checkpoint of the tweets already posted, so it is resumed rather
+    than posted again.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS post_runs (
+                job_id TEXT NOT NULL,
+                run_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                started_at REAL,
+                finished_at REAL,
+                error TEXT,
+                checkpoint TEXT,
+                PRIMARY KEY (job_id, run_date)
+            )"""
+        )
+        # Ledgers created before checkpoints existed
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(post_runs)")]
+        if 'checkpoint' not in columns:
+            self._conn.execute("ALTER TABLE post_runs ADD COLUMN checkpoint TEXT")
+
+    def status(self, job_id, run_date):
+        """Return the run's status ('running', 'completed', 'failed') or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM post_runs WHERE job_id = ? AND run_date = ?",
+                (job_id, run_date)
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_completed(self, job_id, run_date):
+        return self.status(job_id, run_date) == 'completed'
+
+    def start(self, job_id, run_date):
+        """Mark a run as started (counting attempts)"""
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO post_runs (job_id, run_date, status, attempts, started_at)
+                VALUES (?, ?, 'running', 1, ?)
+                ON CONFLICT (job_id, run_date) DO UPDATE SET
+                    status = 'running', attempts = attempts + 1,
+                    started_at = excluded.started_at, finished_at = NULL, error = NULL""",
+                (job_id, run_date, time.time())
+            )
+
+    def finish(self, job_id, run_date, status, error=None):
+        """Record the outcome of a run ('completed', 'failed' or 'interrupted')"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE post_runs SET status = ?, finished_at = ?, error = ? WHERE job_id = ? AND run_date = ?",
+                (status, time.time(), error, job_id, run_date)
+            )
+        logger.info("[%s] Run for %s: %s", job_id, run_date, status)
+
+    def save_checkpoint(self, job_id, run_date, state):
+        """Store a run's resumable progress (JSON-serializable dict)"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE post_runs SET checkpoint = ? WHERE job_id = ? AND run_date = ?",
+                (json.dumps(state, ensure_ascii=False), job_id, run_date)
+            )
+
+    def checkpoint(self, job_id, run_date):
+        """Return the progress saved by an unfinished run, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT checkpoint FROM post_runs WHERE job_id = ? AND run_date = ? AND status != 'completed'",
+                (job_id, run_date)
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def unfinished(self, since):
+        """(job_id, run_date) of runs that stopped partway with a checkpoint, started since a unix time"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, run_date FROM post_runs WHERE status != 'completed' AND checkpoint IS NOT NULL AND started_at >= ?",
+                (since,)
+            ).fetchall()
+        return rows
+
+    def runs(self, run_date):
+        """All runs recorded for a date as {job_id: status}"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, status FROM post_runs WHERE run_date = ?",
+                (run_date,)
+            ).fetchall()
+        return dict(rows)
+
+# Global run ledger instance
+run_ledger = RunLedger(config.SCHEDULER_DB_PATH)
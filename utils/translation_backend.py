@@ -0,0 +1,131 @@
+import time
+import threading
+import importlib.util
+from deep_translator import GoogleTranslator
+from utils.logger import setup_logger
+import config
+
+logger = setup_logger(__name__)
+
+class TranslationBackend:
+    """English to Simplified Chinese translation backend
+
+    Subclasses implement translate_batch(); translate() runs a batch of one.
+    """
+
+    name = 'base'
+    concurrency = 1  # Batches the backend can translate at the same time
+
+    def warm_up(self):
+        """Load models ahead of the first request"""
+
+    def translate(self, text):
+        return self.translate_batch([text])[0]
+
+    def translate_batch(self, texts):
+        """Translate a list of strings, returning the translations in order"""
+        raise NotImplementedError
+
+
+class GoogleBackend(TranslationBackend):
+    """Google Translate through deep-translator (network, rate-limited)"""
+
+    name = 'google'
+    concurrency = 2
+
+    def __init__(self):
+        self.translator = GoogleTranslator(source='en', target='zh-CN')
+        if config.GOOGLE_TRANSLATE_URL:
+            self.translator._base_url = config.GOOGLE_TRANSLATE_URL
+
+    def translate(self, text):
+        return self.translator.translate(text)
+
+    def translate_batch(self, texts):
+        return [self.translate(text) for text in texts]
+
+
+class OpusMTBackend(TranslationBackend):
+    """Local OPUS-MT (Marian) en->zh model on the CPU (optional transformers + torch)
+
+    The model is loaded once (warm_up) and kept in memory; all strings of a
+    post are translated in padded batches of up to `batch_size`.
+    """
+
+    name = 'opus'
+
+    def __init__(self, model_name, threads=2, batch_size=16, target_token=None):
+        self.model_name = model_name
+        self.threads = threads
+        self.batch_size = batch_size
+        # Multi-target OPUS-MT models pick the output language from a >>id<< prefix
+        self.target_token = target_token
+        self._tokenizer = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        """Check if transformers, torch and sentencepiece are installed"""
+        return all(importlib.util.find_spec(module) is not None for module in ('transformers', 'torch', 'sentencepiece'))
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import torch
+                from transformers import MarianMTModel, MarianTokenizer
+
+                start = time.perf_counter()
+                torch.set_num_threads(self.threads)
+                self._tokenizer = MarianTokenizer.from_pretrained(self.model_name)
+                self._model = MarianMTModel.from_pretrained(self.model_name).eval()
+                logger.info("Loaded translation model %s in %.1fs", self.model_name, time.perf_counter() - start)
+        return self._tokenizer, self._model
+
+    def warm_up(self):
+        self._load()
+
+    def translate_batch(self, texts):
+        import torch
+
+        tokenizer, model = self._load()
+        if self.target_token:
+            texts = [f"{self.target_token} {text}" for text in texts]
+
+        translations = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = tokenizer(texts[start:start + self.batch_size], return_tensors='pt', padding=True, truncation=True, max_length=512)
+            with torch.inference_mode():
+                output = model.generate(**batch, max_new_tokens=512)
+            translations.extend(tokenizer.batch_decode(output, skip_special_tokens=True))
+
+        return translations
+
+
+def create_backend(name=None):
+    """
+    Create the configured translation backend
+
+    Args:
+        name: 'opus', 'google' or 'auto' (default TRANSLATION_BACKEND). 'auto'
+            picks the local OPUS-MT model when its packages are installed.
+
+    Returns:
+        TranslationBackend
+    """
+    name = (name or config.TRANSLATION_BACKEND).lower()
+
+    if name == 'auto':
+        name = 'opus' if OpusMTBackend.available() else 'google'
+
+    if name == 'opus':
+        return OpusMTBackend(
+            config.OPUS_MT_MODEL,
+            threads=config.LOCAL_TRANSLATION_THREADS,
+            batch_size=config.TRANSLATION_BATCH_SIZE,
+            target_token=config.OPUS_MT_TARGET_TOKEN
+        )
+    if name == 'google':
+        return GoogleBackend()
+
+    raise ValueError(f"Unknown TRANSLATION_BACKEND: {name}")
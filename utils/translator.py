@@ -1,35 +1,121 @@
-from deep_translator import GoogleTranslator
+from contextlib import contextmanager
 from utils.logger import setup_logger
+from utils.tweet_length import fits, truncate
+from utils.translation_backend import create_backend, GoogleBackend
+from utils.request_queue import RequestQueue
+from utils.metrics import metrics
+import config
 
 logger = setup_logger(__name__)
 
 class ChineseTranslator:
-    """Handle English to Chinese translations"""
+    """Handle English to Chinese translations
+    
+    The configured backend (a local OPUS-MT model or Google) sits behind a
+    bounded queue. Google is the fallback whenever the local model fails.
+    """
     
     def __init__(self):
-        self.translator = GoogleTranslator(source='en', target='zh-CN')
+        try:
+            self.backend = create_backend()
+        except Exception as e:
+            logger.error("Failed to create translation backend '%s': %s (using Google)", config.TRANSLATION_BACKEND, e)
+            self.backend = GoogleBackend()
+        
+        self.fallback = None
+        self._prefetched = {}  # English -> Chinese, see prefetched()
+        self.queue = RequestQueue(
+            'translate',
+            workers=self.backend.concurrency,
+            maxsize=config.TRANSLATION_QUEUE_SIZE,
+            timeout=config.TRANSLATION_TIMEOUT
+        )
+        logger.info("Translator initialized with %s backend", self.backend.name)
     
-    def translate(self, text):
-        """Translate English text to Simplified Chinese"""
+    def warm_up(self):
+        """Start loading the translation model in the background"""
+        self.queue.submit(self.backend.warm_up)
+    
+    def _fallback_backend(self):
+        """Google backend used when the primary backend fails (None if Google is the primary)"""
+        if self.backend.name == 'google':
+            return None
+        if self.fallback is None:
+            self.fallback = GoogleBackend()
+        return self.fallback
+    
+    def translate_batch(self, texts):
+        """
+        Translate several English strings to Simplified Chinese in one backend call
+        
+        Strings held by prefetched() are served from memory.
+        
+        Returns:
+            Translations in order (the original string wherever translation fails)
+        """
+        texts = list(texts)
+        results = [self._prefetched.get(text, text) for text in texts]
+        indexes = [i for i, text in enumerate(texts) if text and text.strip() and text not in self._prefetched]
+        if not indexes:
+            return results
+        
+        sources = [results[i] for i in indexes]
         try:
-            translated = self.translator.translate(text)
-            logger.info(f"Translated: {text[:50]}... -> {translated[:50]}...")
-            return translated
+            with metrics.track(self.backend.name, 'translate'):
+                translations = self.queue.call(self.backend.translate_batch, sources)
         except Exception as e:
-            logger.error(f"Translation error: {e}")
-            return text  # Return original if translation fails
+            fallback = self._fallback_backend()
+            if fallback is None:
+                logger.error("Translation error: %s", e)
+                return results  # Return originals if translation fails
+            
+            logger.warning("%s translation failed: %s (falling back to Google)", self.backend.name, e)
+            try:
+                with metrics.track(fallback.name, 'translate'):
+                    translations = fallback.translate_batch(sources)
+            except Exception as e:
+                logger.error("Translation error: %s", e)
+                return results
+        
+        for i, translated in zip(indexes, translations):
+            if translated:
+                results[i] = translated
+        
+        logger.info("Translated %s strings: %s... -> %s...", len(sources), sources[0][:50], results[indexes[0]][:50])
+        return results
+    
+    @contextmanager
+    def prefetched(self, texts):
+        """
+        Translate strings in one backend call up front; inside the block
+        translate_batch() serves them from memory (the daily plan's batching)
+        """
+        texts = [text for text in dict.fromkeys(texts) if text and text.strip() and text not in self._prefetched]
+        added = {}
+        if texts:
+            # Failed translations come back unchanged and aren't kept
+            added = {text: translated for text, translated in zip(texts, self.translate_batch(texts)) if translated != text}
+            self._prefetched.update(added)
+        try:
+            yield
+        finally:
+            for text in added:
+                self._prefetched.pop(text, None)
+    
+    def translate(self, text):
+        """Translate English text to Simplified Chinese"""
+        return self.translate_batch([text])[0]
     
     def translate_with_limit(self, text, char_limit=280):
         """Translate text and ensure it stays within character limit"""
         translated = self.translate(text)
         
-        # If translated text exceeds limit, truncate intelligently
-        if len(translated) > char_limit:
-            translated = translated[:char_limit-3] + "..."
-            logger.warning(f"Translated text truncated to {char_limit} chars")
+        # If translated text exceeds limit (CJK counts double on X), truncate intelligently
+        if not fits(translated, char_limit):
+            translated = truncate(translated, char_limit)
+            logger.warning("Translated text truncated to %s chars", char_limit)
         
         return translated
 
 # Global translator instance
 translator = ChineseTranslator()
-
@@ -0,0 +1,150 @@
+import re
+import unicodedata
+from bisect import bisect_right
+from functools import lru_cache
+import config
+
+# X counts every URL as a t.co link; trailing punctuation is not part of the URL
+URL_PATTERN = re.compile(r'https?://\S+?(?=[.,;:!?)\]\'"]*(?:\s|$))')
+URL_WEIGHT = 23
+
+ELLIPSIS = "..."
+
+# Code point ranges X counts as 1; everything else (CJK, emoji, ...) counts as 2
+LIGHT_RANGES = (
+    (0x0000, 0x10FF),  # Latin, Greek, Cyrillic, Hebrew, Arabic, ...
+    (0x2000, 0x200D),  # Spaces
+    (0x2010, 0x201F),  # Dashes and quotes
+    (0x2032, 0x2037),  # Primes
+)
+
+# Range starts/ends flattened for bisect: an odd insertion point is inside a range
+_LIGHT_BOUNDS = tuple(bound for low, high in LIGHT_RANGES for bound in (low, high + 1))
+
+# Code points that extend the previous character into one emoji (counted as 2 in total)
+EMOJI_MODIFIER_RANGES = (
+    (0x200D, 0x200D),    # Zero-width joiner
+    (0x20E3, 0x20E3),    # Combining enclosing keycap
+    (0xFE0F, 0xFE0F),    # Emoji presentation selector
+    (0x1F3FB, 0x1F3FF),  # Skin tones
+    (0xE0020, 0xE007F),  # Tag sequences (subdivision flags)
+)
+_EMOJI_MODIFIER_BOUNDS = tuple(bound for low, high in EMOJI_MODIFIER_RANGES for bound in (low, high + 1))
+
+REGIONAL_INDICATORS = (0x1F1E6, 0x1F1FF)  # Flags are pairs of these
+ZWJ = 0x200D
+
+def _in_ranges(bounds, code):
+    return bisect_right(bounds, code) % 2 == 1
+
+def char_weight(char):
+    """X weight of a single code point (1 or 2)"""
+    return 1 if _in_ranges(_LIGHT_BOUNDS, ord(char)) else 2
+
+def _is_open_flag(cluster):
+    """A single regional indicator waiting for its pair"""
+    return len(cluster) == 1 and REGIONAL_INDICATORS[0] <= ord(cluster) <= REGIONAL_INDICATORS[1]
+
+def graphemes(text):
+    """
+    Split text into user-perceived characters
+
+    Emoji sequences (ZWJ families, skin tones, keycaps, flags) and base
+    characters with combining marks stay in one piece, so they are never cut
+    apart by truncation.
+    """
+    clusters = []
+    joined = False
+    for char in text:
+        code = ord(char)
+        if clusters and (
+            joined
+            or _in_ranges(_EMOJI_MODIFIER_BOUNDS, code)
+            or 0xFE00 <= code <= 0xFE0E
+            or unicodedata.combining(char)
+            or (REGIONAL_INDICATORS[0] <= code <= REGIONAL_INDICATORS[1] and _is_open_flag(clusters[-1]))
+        ):
+            clusters[-1] += char
+        else:
+            clusters.append(char)
+        joined = code == ZWJ
+    return clusters
+
+def _is_emoji_sequence(cluster):
+    if len(cluster) == 2 and _is_open_flag(cluster[0]):
+        return True
+    return any(_in_ranges(_EMOJI_MODIFIER_BOUNDS, ord(char)) for char in cluster)
+
+def _cluster_weight(cluster):
+    if len(cluster) == 1:
+        return char_weight(cluster)
+    if _is_emoji_sequence(cluster):
+        return 2
+    return sum(char_weight(char) for char in cluster)
+
+def _segments(text):
+    """Yield (piece, weight) with each URL as one piece and everything else per grapheme"""
+    position = 0
+    for match in URL_PATTERN.finditer(text):
+        for cluster in graphemes(text[position:match.start()]):
+            yield cluster, _cluster_weight(cluster)
+        yield match.group(), URL_WEIGHT
+        position = match.end()
+    for cluster in graphemes(text[position:]):
+        yield cluster, _cluster_weight(cluster)
+
+def normalize(text):
+    """NFC form of text, as X counts it (post this form so the count matches)"""
+    return text if text.isascii() else unicodedata.normalize('NFC', text)
+
+@lru_cache(maxsize=2048)
+def weighted_length(text):
+    """Length of text as counted by X (URLs count 23, CJK characters and emoji count 2)"""
+    if text.isascii() and '://' not in text:
+        return len(text)
+    return sum(weight for _, weight in _segments(normalize(text)))
+
+def fits(text, limit=None):
+    """Check if text fits in a tweet"""
+    return weighted_length(text) <= (limit or config.TWEET_CHAR_LIMIT)
+
+def truncate(text, limit=None, ellipsis=ELLIPSIS):
+    """
+    Cut text to a weighted limit, ending with an ellipsis
+
+    The cut falls between graphemes and never inside a URL.
+
+    Args:
+        text: Text to shorten
+        limit: Weighted limit including the ellipsis (default TWEET_CHAR_LIMIT)
+        ellipsis: Marker appended when text is cut
+
+    Returns:
+        text (in NFC form) if it fits, else the longest prefix that fits plus ellipsis
+    """
+    limit = limit or config.TWEET_CHAR_LIMIT
+    text = normalize(text)
+    if weighted_length(text) <= limit:
+        return text
+
+    budget = limit - weighted_length(ellipsis)
+    pieces = []
+    used = 0
+    for piece, weight in _segments(text):
+        if used + weight > budget:
+            break
+        pieces.append(piece)
+        used += weight
+
+    return "".join(pieces).rstrip() + ellipsis
+
+def char_budget(language='en', limit=None):
+    """
+    Number of characters that fit in a tweet for a language
+
+    Args:
+        language: 'en' (1 per character) or 'zh' (CJK characters count 2)
+        limit: Weighted limit (default TWEET_CHAR_LIMIT)
+    """
+    limit = limit or config.TWEET_CHAR_LIMIT
+    return limit // 2 if language == 'zh' else limit
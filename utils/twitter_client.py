@@ -1,46 +1,112 @@
 import tweepy
 import config
 import time
+import threading
+import contextvars
 from pathlib import Path
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from utils.logger import setup_logger, log_tweet
+from utils.tweet_length import normalize, fits, truncate
+from utils.job_runtime import current_run
+from utils.rate_limit_ledger import rate_limit_ledger
+from utils.metrics import metrics
 
 logger = setup_logger(__name__)
 
+class _RedirectAdapter(HTTPAdapter):
+    """Send requests for X's API hosts to another base URL (X_API_URL, e.g. a local mock)"""
+    
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+    
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        request.url = self.base_url + url.path + (f"?{url.query}" if url.query else '')
+        return super().send(request, **kwargs)
+
+
 class TwitterClient:
-    """Handle all Twitter API interactions"""
+    """Handle all Twitter API interactions for one X account
     
-    def __init__(self):
+    Rate limits are tracked per account in the rate-limit ledger: a 429 holds
+    the account until X's reset time rather than sleeping inside a job.
+    """
+    
+    def __init__(self, account='default', credentials=None):
+        self.account = account
+        self.credentials = credentials or config.TWITTER_ACCOUNTS[account]
         self.client = None
         self.api = None
         self._initialize_client()
     
     def _initialize_client(self):
         """Initialize Twitter API client"""
+        credentials = self.credentials
         try:
             # Twitter API v2 client
             self.client = tweepy.Client(
-                bearer_token=config.TWITTER_BEARER_TOKEN,
-                consumer_key=config.TWITTER_API_KEY,
-                consumer_secret=config.TWITTER_API_SECRET,
-                access_token=config.TWITTER_ACCESS_TOKEN,
-                access_token_secret=config.TWITTER_ACCESS_TOKEN_SECRET,
-                wait_on_rate_limit=True
+                bearer_token=credentials['bearer_token'],
+                consumer_key=credentials['api_key'],
+                consumer_secret=credentials['api_secret'],
+                access_token=credentials['access_token'],
+                access_token_secret=credentials['access_token_secret'],
+                wait_on_rate_limit=False
             )
             
             # Twitter API v1.1 (needed for media uploads)
             auth = tweepy.OAuth1UserHandler(
-                config.TWITTER_API_KEY,
-                config.TWITTER_API_SECRET,
-                config.TWITTER_ACCESS_TOKEN,
-                config.TWITTER_ACCESS_TOKEN_SECRET
+                credentials['api_key'],
+                credentials['api_secret'],
+                credentials['access_token'],
+                credentials['access_token_secret']
             )
-            self.api = tweepy.API(auth, wait_on_rate_limit=True)
+            self.api = tweepy.API(auth, wait_on_rate_limit=False)
+            
+            if config.X_API_URL:
+                adapter = _RedirectAdapter(config.X_API_URL)
+                for session in (self.client.session, self.api.session):
+                    session.mount('https://api.twitter.com', adapter)
+                    session.mount('https://upload.twitter.com', adapter)
+                logger.info("X API calls for %s go to %s", self.account, config.X_API_URL)
             
-            logger.info("Twitter client initialized successfully")
+            logger.info("Twitter client initialized successfully (%s)", self.account)
         except Exception as e:
-            logger.error(f"Failed to initialize Twitter client: {e}")
+            logger.error("Failed to initialize Twitter client (%s): %s", self.account, e)
             raise
     
+    def _rate_limited(self, error):
+        """Hold the account until the reset time X sent with a 429 (15 minutes if none)
+        
+        Only the limits X reports as used up (`*-remaining: 0`) count: the 24h
+        headers come with every response, so a spent 15-minute window must not
+        hold the account for a day. Without any at 0, x-rate-limit-reset is used.
+        """
+        headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+        resets = {}
+        for limit in ('x-rate-limit', 'x-user-limit-24hour', 'x-app-limit-24hour'):
+            reset = str(headers.get(f"{limit}-reset", ''))
+            if reset.isdigit():
+                resets[limit] = (int(reset), str(headers.get(f"{limit}-remaining", '')).strip() == '0')
+        exhausted = [reset for reset, spent in resets.values() if spent]
+        if exhausted:
+            until = max(exhausted)
+        elif 'x-rate-limit' in resets:
+            until = resets['x-rate-limit'][0]
+        else:
+            until = time.time() + 900
+        rate_limit_ledger.block(self.account, until)
+    
+    def _can_post(self):
+        """Check the account's rate-limit ledger before a tweet"""
+        reason = rate_limit_ledger.check(self.account)
+        if reason:
+            logger.error("[%s] Not posting: %s", self.account, reason)
+            return False
+        return True
+    
     def upload_media(self, image_path):
         """
         Upload an image to Twitter and return media_id
@@ -53,16 +119,17 @@ class TwitterClient:
         """
         try:
             if config.DRY_RUN:
-                logger.info(f"DRY RUN mode - would upload image: {image_path}")
+                logger.info("DRY RUN mode - would upload image: %s", image_path)
                 return "fake_media_id_dry_run"
             
             # Upload using API v1.1
-            media = self.api.media_upload(filename=str(image_path))
-            logger.info(f"Image uploaded successfully - media_id: {media.media_id_string}")
+            with metrics.track('x', 'media_upload'):
+                media = self.api.media_upload(filename=str(image_path))
+            logger.info("Image uploaded successfully - media_id: %s", media.media_id_string)
             return media.media_id_string
         
         except Exception as e:
-            logger.error(f"Failed to upload image: {e}")
+            logger.error("Failed to upload image: %s", e)
             return None
     
     def post_tweet(self, content, language='en', image_path=None):
@@ -81,10 +148,11 @@ class TwitterClient:
             logger.warning("Empty content, skipping tweet")
             return None
         
-        # Truncate if too long
-        if len(content) > config.TWEET_CHAR_LIMIT:
-            content = content[:config.TWEET_CHAR_LIMIT-3] + "..."
-            logger.warning(f"Tweet truncated to {config.TWEET_CHAR_LIMIT} chars")
+        # Truncate if too long (X weighted length, counted on the NFC form posted)
+        content = normalize(content)
+        if not fits(content):
+            content = truncate(content)
+            logger.warning("Tweet truncated to %s chars", config.TWEET_CHAR_LIMIT)
         
         log_tweet(content, language, config.DRY_RUN)
         
@@ -92,6 +160,9 @@ class TwitterClient:
             logger.info("DRY RUN mode - tweet not posted")
             return "fake_tweet_id_dry_run"
         
+        if not self._can_post():
+            return None
+        
         try:
             # Upload image if provided
             media_ids = None
@@ -101,29 +172,38 @@ class TwitterClient:
                     media_ids = [media_id]
             
             # Post tweet
-            response = self.client.create_tweet(text=content, media_ids=media_ids)
+            with metrics.track('x', 'create_tweet'):
+                response = self.client.create_tweet(text=content, media_ids=media_ids)
             tweet_id = response.data['id']
-            logger.info(f"Tweet posted successfully - ID: {tweet_id}")
+            rate_limit_ledger.record(self.account)
+            logger.info("Tweet posted successfully (%s) - ID: %s", self.account, tweet_id)
             return tweet_id
         
         except tweepy.errors.TooManyRequests as e:
-            logger.error(f"Rate limit exceeded: {e}")
+            logger.error("Rate limit exceeded: %s", e)
+            self._rate_limited(e)
             return None
         except tweepy.errors.Forbidden as e:
-            logger.error(f"Forbidden - check API permissions: {e}")
+            logger.error("Forbidden - check API permissions: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Failed to post tweet: {e}")
+            logger.error("Failed to post tweet: %s", e)
             return None
     
-    def post_thread(self, tweets, language='en', image_path=None):
+    def post_thread(self, tweets, language='en', image_path=None, posted_ids=None, on_progress=None):
         """
         Post a thread of tweets
         
+        on_progress gets the IDs posted so far after every tweet (to checkpoint
+        them), and inside a job a cancellation (deadline or shutdown) stops the
+        thread between tweets so it can be resumed later with posted_ids.
+        
         Args:
             tweets: List of tweet strings [main_tweet, reply1, reply2, ...]
             language: Language code
             image_path: Optional image for the first tweet
+            posted_ids: IDs of the tweets already posted (to resume a thread)
+            on_progress: Optional callback with the list of posted IDs
         
         Returns:
             True if all tweets posted successfully
@@ -132,43 +212,76 @@ class TwitterClient:
             logger.warning("Empty thread, skipping")
             return False
         
+        job_run = current_run()
+        posted_ids = list(posted_ids or [])
+        
+        def checkpoint(tweet_id):
+            posted_ids.append(tweet_id)
+            if on_progress:
+                on_progress(list(posted_ids))
+        
         try:
-            # Post main tweet with optional image
-            main_tweet_id = self.post_tweet(tweets[0], language, image_path)
-            
-            if not main_tweet_id:
-                logger.error("Failed to post main tweet")
-                return False
+            if posted_ids:
+                logger.info("Resuming thread after %s of %s tweets", len(posted_ids), len(tweets))
+            else:
+                # Post main tweet with optional image
+                main_tweet_id = self.post_tweet(tweets[0], language, image_path)
+                
+                if not main_tweet_id:
+                    logger.error("Failed to post main tweet")
+                    return False
+                checkpoint(main_tweet_id)
             
             # Post replies
-            previous_tweet_id = main_tweet_id
+            previous_tweet_id = posted_ids[-1]
             
-            for i, reply_content in enumerate(tweets[1:], 1):
+            for i, reply_content in enumerate(tweets[len(posted_ids):], len(posted_ids)):
+                if job_run and job_run.cancelled:
+                    logger.warning("Job cancelled, stopping thread after %s of %s tweets", len(posted_ids), len(tweets))
+                    return False
+                
+                reply_content = normalize(reply_content)
+                if not fits(reply_content):
+                    reply_content = truncate(reply_content)
+                    logger.warning("Thread reply %s truncated to %s chars", i, config.TWEET_CHAR_LIMIT)
+                
                 if config.DRY_RUN:
-                    logger.info(f"DRY RUN mode - would post reply {i}: {reply_content[:50]}...")
+                    logger.info("DRY RUN mode - would post reply %s: %s...", i, reply_content[:50])
                     time.sleep(0.1)  # Simulate delay
                     continue
                 
+                if not self._can_post():
+                    return False
+                
                 try:
-                    response = self.client.create_tweet(
-                        text=reply_content,
-                        in_reply_to_tweet_id=previous_tweet_id
-                    )
+                    with metrics.track('x', 'create_tweet'):
+                        response = self.client.create_tweet(
+                            text=reply_content,
+                            in_reply_to_tweet_id=previous_tweet_id
+                        )
                     previous_tweet_id = response.data['id']
-                    logger.info(f"Thread reply {i} posted - ID: {previous_tweet_id}")
+                    rate_limit_ledger.record(self.account)
+                    checkpoint(previous_tweet_id)
+                    logger.info("Thread reply %s posted - ID: %s", i, previous_tweet_id)
                     
-                    # Small delay between tweets
-                    time.sleep(2)
+                    # Small delay between tweets (cut short if the job is cancelled)
+                    if i < len(tweets) - 1:
+                        if job_run:
+                            job_run.sleep(config.THREAD_REPLY_DELAY_SECONDS)
+                        else:
+                            time.sleep(config.THREAD_REPLY_DELAY_SECONDS)
                 
                 except Exception as e:
-                    logger.error(f"Failed to post thread reply {i}: {e}")
+                    logger.error("Failed to post thread reply %s: %s", i, e)
+                    if isinstance(e, tweepy.errors.TooManyRequests):
+                        self._rate_limited(e)
                     return False
             
-            logger.info(f"Thread posted successfully ({len(tweets)} tweets)")
+            logger.info("Thread posted successfully (%s tweets, %s)", len(tweets), self.account)
             return True
         
         except Exception as e:
-            logger.error(f"Failed to post thread: {e}")
+            logger.error("Failed to post thread: %s", e)
             return False
     
     def post_bilingual_tweet(self, english_content, chinese_content):
@@ -186,6 +299,88 @@ class TwitterClient:
         
         return success
 
-# Global Twitter client instance
-twitter_client = TwitterClient()
+
+class TwitterClientPool:
+    """One TwitterClient per X account in config.TWITTER_ACCOUNTS
+    
+    Clients are built on first use and kept, so each account reuses its
+    HTTP connections. post_thread() fans one generated thread out to every
+    account subscribed to it.
+    """
+    
+    def __init__(self, accounts):
+        self.accounts = accounts
+        self._clients = {}
+        self._lock = threading.Lock()
+    
+    def client(self, account='default'):
+        """Return the account's client, creating it the first time"""
+        with self._lock:
+            if account not in self._clients:
+                if account not in self.accounts:
+                    raise ValueError(f"Unknown X account: {account}")
+                self._clients[account] = TwitterClient(account, self.accounts[account])
+            return self._clients[account]
+    
+    def post_thread(self, tweets, language='en', image_path=None, accounts=('default',)):
+        """
+        Post the same thread to several accounts (concurrently)
+        
+        Inside a job, the tweets posted to every account are checkpointed
+        after each tweet, as {'tweets', 'language', 'image_path', 'accounts'}.
+        
+        Args:
+            tweets: List of tweet strings [main_tweet, reply1, reply2, ...]
+            language: Language code
+            image_path: Optional image for the first tweet
+            accounts: Account names, or {account: IDs already posted} to resume
+        
+        Returns:
+            True if the thread was posted to every account
+        """
+        if isinstance(accounts, dict):
+            progress = {account: list(ids) for account, ids in accounts.items()}
+        else:
+            progress = {account: [] for account in accounts}
+        
+        job_run = current_run()
+        lock = threading.Lock()
+        
+        def save(account, ids):
+            with lock:
+                progress[account] = ids
+                if job_run:
+                    job_run.checkpoint({
+                        'tweets': list(tweets),
+                        'language': language,
+                        'image_path': str(image_path) if image_path else None,
+                        'accounts': {name: list(posted) for name, posted in progress.items()}
+                    })
+        
+        def post(account):
+            try:
+                client = self.client(account)
+            except Exception as e:
+                logger.error("Cannot post to %s: %s", account, e)
+                return False
+            return client.post_thread(
+                tweets, language, image_path,
+                posted_ids=progress[account],
+                on_progress=lambda ids: save(account, ids)
+            )
+        
+        if len(progress) == 1:
+            return post(next(iter(progress)))
+        
+        with ThreadPoolExecutor(max_workers=len(progress), thread_name_prefix='fanout') as executor:
+            # Each account's thread sees the job's context (cancellation)
+            futures = [executor.submit(contextvars.copy_context().run, post, account) for account in progress]
+            results = [future.result() for future in futures]
+        
+        logger.info("Thread fanned out to %s/%s accounts", sum(results), len(results))
+        return all(results)
+
+# Global Twitter client pool and the default account's client
+twitter_pool = TwitterClientPool(config.TWITTER_ACCOUNTS)
+twitter_client = twitter_pool.client('default')
 